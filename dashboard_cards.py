@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Cartes d'interfaces des dashboards, indexées par nom d'interface
+Chaque relevé est comparé au précédent : seules les cartes des interfaces
+apparues ou disparues sont créées ou détruites, les autres ne voient que
+leurs libellés modifiés. Pas de reconstruction complète, donc pas de
+scintillement.
+Chaque carte porte aussi une ligne de trafic (débits et sparkline) tenue à
+jour depuis les relevés de net_interfaces.InterfaceCollector.
+"""
+
+import tkinter as tk
+
+SPARK_WIDTH = 120
+SPARK_HEIGHT = 22
+RX_COLOR = '#27ae60'
+TX_COLOR = '#3498db'
+
+
+class CardList:
+    """Cartes d'une liste d'interfaces, mises à jour par différence
+
+    - `create(name, data)` crée et affiche (pack) une carte et retourne un
+      dict de ses widgets, dont 'frame' ;
+    - `update(card, name, data, previous)` reconfigure les widgets qui
+      changent et retourne False si la carte doit être recréée (structure
+      différente, par exemple une ligne IP apparue) ;
+    - `anchor` : widget qui précède la première carte (en-tête de stats).
+    """
+
+    def __init__(self, create, update, anchor):
+        self.create = create
+        self.update = update
+        self.anchor = anchor
+        self.cards = {}     # nom -> widgets de la carte
+        self.data = {}      # nom -> données affichées
+        self.order = []     # noms dans l'ordre d'affichage
+
+    def __len__(self):
+        return len(self.cards)
+
+    def _destroy(self, name):
+        self.cards.pop(name)['frame'].destroy()
+        del self.data[name]
+
+    def sync(self, interfaces):
+        """Applique un relevé {nom: données} ; retourne les noms ajoutés, retirés, modifiés"""
+        changes = {'added': [], 'removed': [], 'updated': []}
+        for name in [name for name in self.order if name not in interfaces]:
+            self._destroy(name)
+            changes['removed'].append(name)
+
+        order = list(interfaces)
+        kept = [name for name in self.order if name in interfaces]
+        reorder = kept != [name for name in order if name in self.cards]
+        previous = self.anchor
+        for name in order:
+            data = interfaces[name]
+            card = self.cards.get(name)
+            created = False
+            if card is None:
+                changes['added'].append(name)
+                created = True
+            elif data != self.data[name]:
+                changes['updated'].append(name)
+                if not self.update(card, name, data, self.data[name]):
+                    self._destroy(name)
+                    created = True
+            if created:
+                card = self.cards[name] = self.create(name, data)
+            self.data[name] = data
+            if created or reorder:
+                card['frame'].pack_configure(after=previous)
+            previous = card['frame']
+        self.order = order
+        return changes
+
+    def clear(self):
+        for name in list(self.cards):
+            self._destroy(name)
+        self.order = []
+
+
+def format_bits(bits):
+    """Débit lisible : 950 b/s, 12.3 kb/s, 1.2 Gb/s"""
+    for unit in ('b/s', 'kb/s', 'Mb/s'):
+        if bits < 1000:
+            return f"{bits:.0f} {unit}" if unit == 'b/s' else f"{bits:.1f} {unit}"
+        bits /= 1000
+    return f"{bits:.1f} Gb/s"
+
+
+def format_bytes(count):
+    """Volume lisible : 512 o, 1.5 Mo, 3.2 Go"""
+    for unit in ('o', 'Ko', 'Mo', 'Go'):
+        if count < 1024:
+            return f"{count:.0f} {unit}" if unit == 'o' else f"{count:.1f} {unit}"
+        count /= 1024
+    return f"{count:.1f} To"
+
+
+def create_traffic_row(parent, bg='white'):
+    """Ligne de trafic d'une carte : débits, sparkline, totaux ; retourne ses widgets"""
+    row = tk.Frame(parent, bg=bg)
+    row.pack(fill=tk.X, padx=10, pady=(0, 6))
+    rate = tk.Label(row, text="↓ —  ↑ —", font=("Arial", 9), fg='#2c3e50', bg=bg)
+    rate.pack(side=tk.LEFT)
+    spark = tk.Canvas(row, width=SPARK_WIDTH, height=SPARK_HEIGHT, bg=bg, highlightthickness=0)
+    spark.pack(side=tk.RIGHT)
+    totals = tk.Label(parent, text="", font=("Arial", 8), fg='#7f8c8d', bg=bg)
+    totals.pack(fill=tk.X, padx=10, pady=(0, 6), anchor=tk.W)
+    return {'rate': rate, 'spark': spark, 'totals': totals,
+            'rx_line': spark.create_line(0, SPARK_HEIGHT, SPARK_WIDTH, SPARK_HEIGHT, fill=RX_COLOR),
+            'tx_line': spark.create_line(0, SPARK_HEIGHT, SPARK_WIDTH, SPARK_HEIGHT, fill=TX_COLOR)}
+
+
+def sparkline_points(series, peak, slots, width=SPARK_WIDTH, height=SPARK_HEIGHT):
+    """Coordonnées (x0, y0, x1, y1...) de la courbe sur `slots` points, alignée à droite"""
+    if len(series) < 2:
+        return [0, height, width, height]
+    step = width / max(slots - 1, 1)
+    start = width - step * (len(series) - 1)
+    points = []
+    for i, value in enumerate(series):
+        points.append(start + i * step)
+        points.append(height - 1 - (height - 2) * value / peak if peak else height - 1)
+    return points
+
+
+def update_traffic(card, ring):
+    """Reporte le dernier relevé d'une interface sur sa carte"""
+    rx, tx = ring.bit_rates()
+    text = f"↓ {format_bits(rx)}  ↑ {format_bits(tx)}"
+    if card['rate'].cget('text') != text:
+        card['rate'].config(text=text)
+
+    rx_series = ring.series('rx_bytes')
+    tx_series = ring.series('tx_bytes')
+    peak = max(rx_series + tx_series, default=0)
+    card['spark'].coords(card['rx_line'], *sparkline_points(rx_series, peak, ring.size - 1))
+    card['spark'].coords(card['tx_line'], *sparkline_points(tx_series, peak, ring.size - 1))
+
+    counters = ring.latest()
+    errors = counters['rx_errors'] + counters['tx_errors']
+    dropped = counters['rx_dropped'] + counters['tx_dropped']
+    text = (f"↓ {format_bytes(counters['rx_bytes'])} ({counters['rx_packets']} paq.)  "
+            f"↑ {format_bytes(counters['tx_bytes'])} ({counters['tx_packets']} paq.)  "
+            f"err {errors} · drop {dropped}")
+    if card['totals'].cget('text') != text:
+        card['totals'].config(text=text, fg='#e74c3c' if errors or dropped else '#7f8c8d')
+
+
+def update_all_traffic(cards, rings):
+    """Reporte un relevé de trafic {nom: CounterRing} sur les cartes d'un CardList"""
+    for name, card in cards.cards.items():
+        ring = rings.get(name)
+        if ring is not None and ring.count and 'rate' in card:
+            update_traffic(card, ring)
@@ -11,12 +11,18 @@ import platform
 import time
 import threading
 
+import dashboard_cards
+import net_interfaces
+
 def get_network_interfaces():
     """Récupère toutes les interfaces réseau et leurs adresses IP"""
     interfaces = {}
     
     try:
-        if platform.system() == "Darwin":
+        if platform.system() == "Linux":
+            # rtnetlink (repli /proc, /sys), sans sous-processus
+            interfaces = net_interfaces.get_interfaces() or {}
+        elif platform.system() == "Darwin":
             output = subprocess.check_output(["ifconfig"], encoding="utf-8")
             current_interface = None
             
@@ -44,7 +50,7 @@ def get_network_interfaces():
     return interfaces
 
 class NetworkDashboard:
-    def __init__(self):
+    def __init__(self, collector=None):
         self.root = tk.Tk()
         self.root.title("🌐 Dashboard Réseau")
         self.root.geometry("400x500")
@@ -59,10 +65,11 @@ class NetworkDashboard:
         self.root.geometry(f"400x500+{x_pos}+50")
         
         self.setup_ui()
-        self.refresh_interfaces()
         
-        # Auto-refresh toutes les 30 secondes
-        self.auto_refresh()
+        # Relevés hors du thread Tk (rtnetlink sous Linux, sondage de 30 s
+        # ailleurs, trafic chaque seconde), reçus par file
+        self.collector = collector or net_interfaces.shared_collector(get_network_interfaces)
+        self.collector.attach(self.root, self.on_interfaces_changed, self.on_traffic)
     
     def setup_ui(self):
         """Configure l'interface utilisateur"""
@@ -105,6 +112,25 @@ class NetworkDashboard:
         
         # Bind mousewheel
         self.canvas.bind("<MouseWheel>", self._on_mousewheel)
+        
+        # En-tête de stats (créé une fois, libellés mis à jour)
+        stats_frame = tk.Frame(self.scrollable_frame, bg='white', relief='raised', bd=1)
+        stats_frame.pack(fill=tk.X, pady=(0, 5), padx=2)
+        
+        stats_content = tk.Frame(stats_frame, bg='white')
+        stats_content.pack(fill=tk.X, padx=10, pady=8)
+        
+        self.stats_label = tk.Label(stats_content, text="", 
+                                   font=("Arial", 11, "bold"), fg='#27ae60', bg='white')
+        self.stats_label.pack(side=tk.LEFT)
+        
+        self.time_label = tk.Label(stats_content, text="🔄",   # premier relevé en cours
+                                  font=("Arial", 9), fg='#7f8c8d', bg='white')
+        self.time_label.pack(side=tk.RIGHT)
+        
+        # Cartes indexées par nom d'interface
+        self.cards = dashboard_cards.CardList(self.create_interface_card, self.update_interface_card,
+                                              stats_frame)
     
     def _on_mousewheel(self, event):
         self.canvas.yview_scroll(int(-1*(event.delta/120)), "units")
@@ -142,6 +168,7 @@ class NetworkDashboard:
         status_label = tk.Label(header_frame, text=status_icon, 
                                font=("Arial", 12), fg=status_color, bg='white')
         status_label.pack(side=tk.RIGHT)
+        card = {'frame': card_frame, 'status': status_label}
         
         # Contenu IP
         if iface_data['ipv4']:
@@ -151,21 +178,40 @@ class NetworkDashboard:
             ip_label = tk.Label(content_frame, text=iface_data['ipv4'][0], 
                                font=("Arial", 10), fg='#3498db', bg='white')
             ip_label.pack(side=tk.LEFT)
+            card['ip'] = ip_label
             
             if len(iface_data['ipv4']) > 1:
                 more_label = tk.Label(content_frame, text=f"+{len(iface_data['ipv4'])-1}", 
                                      font=("Arial", 9), fg='#7f8c8d', bg='white')
                 more_label.pack(side=tk.LEFT, padx=(5, 0))
-    
-    def refresh_interfaces(self):
-        """Actualise la liste des interfaces"""
-        # Supprimer les anciennes cartes
-        for widget in self.scrollable_frame.winfo_children():
-            widget.destroy()
+                card['multi'] = more_label
         
-        # Récupérer les interfaces
-        interfaces = get_network_interfaces()
+        # Débits, sparkline et compteurs (mis à jour par update_all_traffic)
+        card.update(dashboard_cards.create_traffic_row(card_frame))
         
+        return card
+    
+    def update_interface_card(self, card, iface_name, iface_data, previous):
+        """Met à jour les seuls libellés modifiés ; False si la carte doit être recréée"""
+        if bool(iface_data['ipv4']) != bool(previous['ipv4']) or \
+                (len(iface_data['ipv4']) > 1) != (len(previous['ipv4']) > 1):
+            return False
+        if iface_data['status'] != previous['status']:
+            card['status'].config(text="●" if iface_data['status'] == 'UP' else "○",
+                                  fg='#27ae60' if iface_data['status'] == 'UP' else '#e74c3c')
+        if iface_data['ipv4'] != previous['ipv4']:
+            card['ip'].config(text=iface_data['ipv4'][0])
+            if 'multi' in card:
+                card['multi'].config(text=f"+{len(iface_data['ipv4'])-1}")
+        return True
+    
+    def refresh_interfaces(self):
+        """Demande un relevé complet au collecteur (résultat reçu par on_interfaces_changed)"""
+        self.time_label.config(text="🔄")
+        self.collector.refresh()
+    
+    def show_interfaces(self, interfaces):
+        """Actualise les cartes par différence avec le relevé précédent"""
         # Statistiques
         filtered_interfaces = {}
         for k, v in interfaces.items():
@@ -178,35 +224,24 @@ class NetworkDashboard:
             filtered_interfaces[k] = v
         
         # En-tête de stats
-        stats_frame = tk.Frame(self.scrollable_frame, bg='white', relief='raised', bd=1)
-        stats_frame.pack(fill=tk.X, pady=(0, 5), padx=2)
-        
-        stats_content = tk.Frame(stats_frame, bg='white')
-        stats_content.pack(fill=tk.X, padx=10, pady=8)
-        
         total = len(filtered_interfaces)
         active = len([k for k, v in filtered_interfaces.items() if v['status'] == 'UP'])
         
         stats_text = f"{active}/{total} actives"
-        stats_label = tk.Label(stats_content, text=stats_text, 
-                              font=("Arial", 11, "bold"), fg='#27ae60', bg='white')
-        stats_label.pack(side=tk.LEFT)
-        
-        time_label = tk.Label(stats_content, text=time.strftime('%H:%M:%S'), 
-                             font=("Arial", 9), fg='#7f8c8d', bg='white')
-        time_label.pack(side=tk.RIGHT)
+        if self.stats_label.cget('text') != stats_text:
+            self.stats_label.config(text=stats_text)
+        self.time_label.config(text=time.strftime('%H:%M:%S'))
         
-        # Créer les cartes
-        for iface_name, iface_data in filtered_interfaces.items():
-            self.create_interface_card(iface_name, iface_data)
+        # Cartes : création, suppression ou mise à jour des seules interfaces concernées
+        self.cards.sync(filtered_interfaces)
+    
+    def on_interfaces_changed(self, interfaces, changes):
+        """Relevé transmis par le collecteur (changement, premier relevé ou actualisation)"""
+        self.show_interfaces(interfaces)
     
-    def auto_refresh(self):
-        """Auto-actualisation"""
-        try:
-            self.refresh_interfaces()
-            self.root.after(30000, self.auto_refresh)  # 30 secondes
-        except:
-            pass
+    def on_traffic(self, rings):
+        """Relevé de trafic transmis par le collecteur"""
+        dashboard_cards.update_all_traffic(self.cards, rings)
     
     def run(self):
         """Lance le dashboard"""
@@ -0,0 +1,635 @@
+#!/usr/bin/env python3
+"""
+Interfaces réseau et adresses IP sans lancer `ip` ni `ifconfig`
+Linux : socket rtnetlink (RTM_GETLINK + RTM_GETADDR), repli sur
+/sys/class/net, /proc/net/if_inet6 et ioctl. Même format que
+network.get_network_interfaces :
+    {nom: {'ipv4': [...], 'ipv6': [...], 'status': 'UP' | 'DOWN'}}
+(adresses IPv6 link-local fe80:: ignorées).
+
+InterfaceMonitor notifie les changements (liens, adresses) dès que le noyau
+les annonce sur les groupes multicast rtnetlink, par sondage ailleurs.
+TrafficSampler relève les compteurs de trafic dans des tampons circulaires.
+InterfaceCollector regroupe les deux dans un thread partagé par toutes les
+fenêtres, qui reçoivent des instantanés immuables sans jamais attendre les
+outils du système.
+"""
+
+import os
+import queue
+import select
+import socket
+import struct
+import sys
+import threading
+import time
+from array import array
+from types import MappingProxyType
+
+NETLINK_ROUTE = 0
+RTM_NEWLINK = 16
+RTM_GETLINK = 18
+RTM_NEWADDR = 20
+RTM_GETADDR = 22
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+NLM_F_REQUEST = 0x1
+NLM_F_DUMP = 0x300
+IFLA_IFNAME = 3
+IFA_ADDRESS = 1
+IFA_LOCAL = 2
+IFF_UP = 0x1
+SIOCGIFADDR = 0x8915
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+RTMGRP_IPV6_IFADDR = 0x100
+
+POLL_INTERVAL = 30.0    # Sondage de repli (ifconfig, ipconfig...)
+SETTLE = 0.05           # Regroupement des rafales d'annonces (DHCP, ifup)
+QUEUE_POLL_MS = 200     # Relève des changements côté Tk
+
+# Compteurs de trafic par interface, dans cet ordre
+COUNTERS = ('rx_bytes', 'tx_bytes', 'rx_packets', 'tx_packets',
+            'rx_errors', 'tx_errors', 'rx_dropped', 'tx_dropped')
+# Colonnes de /proc/net/dev (après le nom) correspondant à COUNTERS
+PROC_NET_DEV_COLUMNS = (0, 8, 1, 9, 2, 10, 3, 11)
+SAMPLE_INTERVAL = 1.0   # Secondes entre deux relevés
+HISTORY_SIZE = 120      # Relevés conservés par interface
+
+NLMSG_HEADER = struct.Struct('=LHHLL')     # longueur, type, drapeaux, séquence, pid
+IFINFOMSG = struct.Struct('=BxHiII')       # famille, type, index, drapeaux, masque
+IFADDRMSG = struct.Struct('=BBBBi')        # famille, préfixe, drapeaux, portée, index
+RTATTR = struct.Struct('=HH')              # longueur, type
+RECV_BUFFER = 64 * 1024
+
+_sequence = 0
+
+
+def _align(length):
+    return (length + 3) & ~3
+
+
+def _attributes(data, offset, end):
+    """Attributs rtattr d'un message : {type: valeur brute}"""
+    attrs = {}
+    while offset + RTATTR.size <= end:
+        length, kind = RTATTR.unpack_from(data, offset)
+        if length < RTATTR.size:
+            break
+        attrs[kind] = data[offset + RTATTR.size:offset + length]
+        offset += _align(length)
+    return attrs
+
+
+def _dump(sock, msg_type, body):
+    """Requête de dump rtnetlink ; génère (type, données, début du corps, fin)"""
+    global _sequence
+    _sequence += 1
+    seq = _sequence
+    header = NLMSG_HEADER.pack(NLMSG_HEADER.size + len(body), msg_type,
+                               NLM_F_REQUEST | NLM_F_DUMP, seq, 0)
+    sock.send(header + body)
+    while True:
+        data = sock.recv(RECV_BUFFER)
+        offset = 0
+        while offset + NLMSG_HEADER.size <= len(data):
+            length, kind, _, msg_seq, _ = NLMSG_HEADER.unpack_from(data, offset)
+            if length < NLMSG_HEADER.size:
+                return
+            if msg_seq == seq:
+                if kind == NLMSG_DONE:
+                    return
+                if kind == NLMSG_ERROR:
+                    error = -struct.unpack_from('=i', data, offset + NLMSG_HEADER.size)[0]
+                    raise OSError(error, os.strerror(error))
+                yield kind, data, offset + NLMSG_HEADER.size, offset + length
+            offset += _align(length)
+
+
+def netlink_interfaces():
+    """Interfaces et adresses via un socket rtnetlink (deux dumps, aucun fork)"""
+    interfaces = {}
+    names = {}
+    with socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE) as sock:
+        sock.bind((0, 0))
+        for kind, data, start, end in _dump(sock, RTM_GETLINK, IFINFOMSG.pack(socket.AF_UNSPEC, 0, 0, 0, 0)):
+            if kind != RTM_NEWLINK:
+                continue
+            _, _, index, flags, _ = IFINFOMSG.unpack_from(data, start)
+            attrs = _attributes(data, start + IFINFOMSG.size, end)
+            name = attrs.get(IFLA_IFNAME, b'').split(b'\x00', 1)[0].decode('utf-8', 'replace')
+            if not name:
+                continue
+            names[index] = name
+            interfaces[name] = {'ipv4': [], 'ipv6': [], 'status': 'UP' if flags & IFF_UP else 'DOWN'}
+
+        for kind, data, start, end in _dump(sock, RTM_GETADDR, IFADDRMSG.pack(socket.AF_UNSPEC, 0, 0, 0, 0)):
+            if kind != RTM_NEWADDR:
+                continue
+            family, _, _, _, index = IFADDRMSG.unpack_from(data, start)
+            name = names.get(index)
+            if name is None:
+                continue
+            attrs = _attributes(data, start + IFADDRMSG.size, end)
+            if family == socket.AF_INET:
+                # IFA_LOCAL : adresse locale (IFA_ADDRESS est le pair sur un lien point à point)
+                raw = attrs.get(IFA_LOCAL) or attrs.get(IFA_ADDRESS)
+                if raw:
+                    interfaces[name]['ipv4'].append(socket.inet_ntop(socket.AF_INET, raw))
+            elif family == socket.AF_INET6:
+                raw = attrs.get(IFA_ADDRESS)
+                if raw:
+                    ip = socket.inet_ntop(socket.AF_INET6, raw)
+                    if not ip.startswith('fe80'):
+                        interfaces[name]['ipv6'].append(ip)
+    return interfaces
+
+
+def procfs_interfaces():
+    """Repli sans netlink : /sys/class/net, ioctl SIOCGIFADDR, /proc/net/if_inet6
+
+    L'ioctl ne donne que l'adresse IPv4 principale de chaque interface.
+    """
+    import fcntl
+
+    interfaces = {}
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        for _, name in socket.if_nameindex():
+            try:
+                with open(f'/sys/class/net/{name}/flags') as f:
+                    flags = int(f.read().strip(), 16)
+            except (OSError, ValueError):
+                flags = 0
+            entry = interfaces[name] = {'ipv4': [], 'ipv6': [], 'status': 'UP' if flags & IFF_UP else 'DOWN'}
+            try:
+                request = struct.pack('256s', name.encode()[:15])
+                entry['ipv4'].append(socket.inet_ntoa(fcntl.ioctl(sock.fileno(), SIOCGIFADDR, request)[20:24]))
+            except OSError:
+                pass  # Pas d'adresse IPv4
+    try:
+        with open('/proc/net/if_inet6') as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) < 6 or fields[5] not in interfaces:
+                    continue
+                ip = socket.inet_ntop(socket.AF_INET6, bytes.fromhex(fields[0]))
+                if not ip.startswith('fe80'):
+                    interfaces[fields[5]]['ipv6'].append(ip)
+    except OSError:
+        pass
+    return interfaces
+
+
+def get_interfaces():
+    """Interfaces de la machine (Linux), ou None si aucun backend natif
+
+    None laisse l'appelant utiliser sa méthode habituelle (ifconfig,
+    ipconfig) sur les autres systèmes.
+    """
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        return netlink_interfaces()
+    except OSError:
+        pass
+    try:
+        return procfs_interfaces()
+    except OSError:
+        return None
+
+
+def read_counters():
+    """Compteurs de trafic {nom: tuple dans l'ordre de COUNTERS}
+
+    Linux : une seule lecture de /proc/net/dev (mêmes compteurs noyau que
+    /sys/class/net/*/statistics, sans ouvrir huit fichiers par interface),
+    /sys en repli. Ailleurs : psutil s'il est installé, sinon rien.
+    """
+    if sys.platform.startswith('linux'):
+        try:
+            with open('/proc/net/dev') as f:
+                lines = f.read().splitlines()[2:]
+        except OSError:
+            return _sysfs_counters()
+        counters = {}
+        for line in lines:
+            name, _, fields = line.partition(':')
+            fields = fields.split()
+            if len(fields) >= 16:
+                counters[name.strip()] = tuple(int(fields[i]) for i in PROC_NET_DEV_COLUMNS)
+        return counters
+    try:
+        import psutil
+    except ImportError:
+        return {}
+    return {name: (c.bytes_recv, c.bytes_sent, c.packets_recv, c.packets_sent,
+                   c.errin, c.errout, c.dropin, c.dropout)
+            for name, c in psutil.net_io_counters(pernic=True).items()}
+
+
+def _sysfs_counters():
+    counters = {}
+    for _, name in socket.if_nameindex():
+        values = []
+        for counter in COUNTERS:
+            try:
+                with open(f'/sys/class/net/{name}/statistics/{counter}') as f:
+                    values.append(int(f.read()))
+            except (OSError, ValueError):
+                values.append(0)
+        counters[name] = tuple(values)
+    return counters
+
+
+class CounterRing:
+    """Tampon circulaire de taille fixe des relevés d'une interface
+
+    Dates dans un array('d'), compteurs à la suite dans un array('Q')
+    (len(COUNTERS) valeurs par relevé) : aucune allocation par relevé.
+    """
+
+    def __init__(self, size=HISTORY_SIZE):
+        self.size = size
+        self.times = array('d', bytes(8 * size))
+        self.values = array('Q', bytes(8 * size * len(COUNTERS)))
+        self.head = 0       # prochain emplacement écrit
+        self.count = 0
+
+    def copy(self):
+        """Instantané indépendant (copie des tableaux, sans allocation par relevé)"""
+        ring = CounterRing.__new__(CounterRing)
+        ring.size, ring.head, ring.count = self.size, self.head, self.count
+        ring.times = array('d', self.times)
+        ring.values = array('Q', self.values)
+        return ring
+
+    def append(self, timestamp, counters):
+        base = self.head * len(COUNTERS)
+        self.times[self.head] = timestamp
+        for i, value in enumerate(counters):
+            self.values[base + i] = value
+        self.head = (self.head + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+
+    def _slot(self, age):
+        """Emplacement du relevé d'âge `age` (0 : le plus récent)"""
+        return (self.head - 1 - age) % self.size
+
+    def latest(self):
+        """Derniers compteurs {nom: valeur}, ou None sans relevé"""
+        if not self.count:
+            return None
+        base = self._slot(0) * len(COUNTERS)
+        return dict(zip(COUNTERS, self.values[base:base + len(COUNTERS)]))
+
+    def rate(self, counter, age=0):
+        """Débit par seconde de `counter` entre les relevés age+1 et age"""
+        if age + 1 >= self.count:
+            return 0.0
+        index = COUNTERS.index(counter)
+        new, old = self._slot(age), self._slot(age + 1)
+        elapsed = self.times[new] - self.times[old]
+        delta = self.values[new * len(COUNTERS) + index] - self.values[old * len(COUNTERS) + index]
+        # Compteur remis à zéro (interface recréée) : pas de débit négatif
+        return delta / elapsed if elapsed > 0 and delta > 0 else 0.0
+
+    def bit_rates(self):
+        """(réception, émission) en bits/s sur le dernier intervalle"""
+        return self.rate('rx_bytes') * 8, self.rate('tx_bytes') * 8
+
+    def series(self, counter, scale=8):
+        """Débits successifs de `counter` (du plus ancien au plus récent), × scale"""
+        return [self.rate(counter, age) * scale for age in range(self.count - 2, -1, -1)]
+
+
+class TrafficSampler:
+    """Relevés périodiques des compteurs de toutes les interfaces
+
+    `rings` : {nom: CounterRing} ; les interfaces disparues sont oubliées.
+    """
+
+    def __init__(self, size=HISTORY_SIZE, reader=read_counters):
+        self.size = size
+        self.reader = reader
+        self.rings = {}
+
+    def sample(self, timestamp=None):
+        counters = self.reader()
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        for name in [name for name in self.rings if name not in counters]:
+            del self.rings[name]
+        for name, values in counters.items():
+            ring = self.rings.get(name)
+            if ring is None:
+                ring = self.rings[name] = CounterRing(self.size)
+            ring.append(timestamp, values)
+        return counters
+
+    def snapshot(self):
+        """{nom: copie du CounterRing}, lisible depuis un autre thread"""
+        return MappingProxyType({name: ring.copy() for name, ring in self.rings.items()})
+
+
+def freeze_interfaces(interfaces):
+    """Relevé immuable : mappings en lecture seule, listes d'adresses en tuples"""
+    return MappingProxyType({
+        name: MappingProxyType({key: tuple(value) if isinstance(value, list) else value
+                                for key, value in iface.items()})
+        for name, iface in interfaces.items()})
+
+
+def diff_interfaces(old, new):
+    """Changements entre deux relevés : {'added', 'removed', 'changed'} ou None"""
+    old = old or {}
+    changes = {
+        'added': [name for name in new if name not in old],
+        'removed': [name for name in old if name not in new],
+        'changed': [name for name in new if name in old and new[name] != old[name]],
+    }
+    return changes if any(changes.values()) else None
+
+
+class InterfaceMonitor:
+    """Surveillance des interfaces : `callback(interfaces, changes)` à chaque changement
+
+    Sous Linux, un socket rtnetlink abonné à RTMGRP_LINK et aux groupes
+    d'adresses IPv4/IPv6 réveille le thread à chaque annonce du noyau (câble
+    débranché, bail DHCP...) : au repos, aucun travail. Les annonces d'une
+    même rafale sont regroupées, puis un relevé complet (reader) est
+    comparé au précédent. Sans netlink, relevé toutes les `interval`
+    secondes. `reader` (get_interfaces par défaut) fournit les relevés, par
+    exemple via ifconfig/ipconfig sur les autres systèmes.
+    """
+
+    def __init__(self, callback, reader=None, interval=POLL_INTERVAL, settle=SETTLE, netlink=True):
+        self.callback = callback
+        self.netlink = netlink
+        self.reader = reader or get_interfaces
+        self.interval = interval
+        self.settle = settle
+        self.interfaces = None
+        self.kind = None
+        self.sock = None
+        self.wake_r = self.wake_w = None
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        if self.netlink and sys.platform.startswith('linux'):
+            try:
+                sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE)
+                sock.bind((0, RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV6_IFADDR))
+                sock.setblocking(False)
+                self.sock = sock
+                self.wake_r, self.wake_w = os.pipe()
+            except (OSError, AttributeError):
+                self.sock = None
+        self.kind = 'netlink' if self.sock is not None else 'polling'
+        # Abonnement avant le premier relevé : aucun changement perdu entre les deux
+        self.interfaces = self.reader() or {}
+        self.thread = threading.Thread(target=self._run_netlink if self.sock else self._run_polling,
+                                       daemon=True)
+        self.thread.start()
+        return self.interfaces
+
+    def stop(self):
+        self.stop_event.set()
+        if self.wake_w is not None:
+            os.write(self.wake_w, b'x')
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+        if self.sock is not None:
+            self.sock.close()
+            for fd in (self.wake_r, self.wake_w):
+                os.close(fd)
+            self.sock = None
+
+    def _drain(self):
+        try:
+            while self.sock.recv(RECV_BUFFER):
+                pass
+        except BlockingIOError:
+            pass
+        except OSError:
+            pass  # ENOBUFS : annonces perdues, le relevé complet suit
+
+    def _run_netlink(self):
+        while not self.stop_event.is_set():
+            try:
+                ready, _, _ = select.select([self.sock, self.wake_r], [], [])
+            except OSError:
+                return
+            if self.wake_r in ready or self.stop_event.is_set():
+                return
+            self._drain()
+            if self.stop_event.wait(self.settle):
+                return
+            self._drain()
+            self.update()
+
+    def _run_polling(self):
+        while not self.stop_event.wait(self.interval):
+            self.update()
+
+    def update(self):
+        """Nouveau relevé ; notifie et retourne les changements s'il y en a
+
+        Appelable depuis plusieurs threads (surveillance, actualisation
+        demandée) : les relevés sont comparés un à la fois.
+        """
+        with self.lock:
+            try:
+                interfaces = self.reader() or {}
+            except Exception:
+                return None
+            changes = diff_interfaces(self.interfaces, interfaces)
+            if changes:
+                self.interfaces = interfaces
+                self.callback(interfaces, changes)
+            return changes
+
+
+class InterfaceCollector:
+    """Relevés d'interfaces et de trafic hors du thread Tk, partagés entre fenêtres
+
+    Un thread de travail démarre l'InterfaceMonitor (premier relevé compris,
+    qui peut être lent : ipconfig /all, ifconfig), relève le trafic toutes
+    les `sample_interval` secondes et traite les actualisations demandées
+    (refresh). Chaque fenêtre abonnée (attach) reçoit des instantanés
+    immuables par sa propre file, relevée avec after() : le thread Tk ne lit
+    jamais le système. Le collecteur s'arrête au départ du dernier abonné.
+    """
+
+    def __init__(self, reader=None, interval=POLL_INTERVAL, sample_interval=SAMPLE_INTERVAL,
+                 size=HISTORY_SIZE, counters=read_counters, netlink=True):
+        self.reader = reader
+        self.monitor = InterfaceMonitor(self._changed, reader, interval, netlink=netlink)
+        self.sampler = TrafficSampler(size, counters)
+        self.sample_interval = sample_interval
+        self.interfaces = None      # dernier relevé d'interfaces (figé)
+        self.traffic = None         # dernier relevé de trafic {nom: CounterRing}
+        self.subscribers = []       # files des fenêtres abonnées
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.requested = 0          # actualisations demandées (refresh)
+        self.refreshed = 0          # ... et traitées (relevé publié)
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Arrête le collecteur sans attendre le thread (appelable depuis Tk)"""
+        self.stop_event.set()
+        self.wake.set()
+
+    def refresh(self):
+        """Demande un relevé complet ; le résultat arrive par les files, même inchangé
+
+        Retourne le numéro de la demande : le relevé est dans `interfaces`
+        dès que `refreshed` l'atteint (voir is_refreshed).
+        """
+        with self.lock:
+            self.requested += 1
+            generation = self.requested
+        self.wake.set()
+        return generation
+
+    def is_refreshed(self, generation):
+        """Vrai quand le relevé demandé par refresh() est publié (ou le collecteur arrêté)"""
+        return self.refreshed >= generation or self.stop_event.is_set()
+
+    def _publish(self, message):
+        with self.lock:
+            if message[0] == 'interfaces':
+                self.interfaces = message[1]
+            else:
+                self.traffic = message[1]
+            for updates in self.subscribers:
+                updates.put(message)
+
+    def _changed(self, interfaces, changes):
+        self._publish(('interfaces', freeze_interfaces(interfaces), changes))
+
+    def _run(self):
+        try:
+            interfaces = self.monitor.start()
+        except Exception:
+            interfaces = {}
+        self._publish(('interfaces', freeze_interfaces(interfaces), None))
+        while not self.stop_event.is_set():
+            generation = self.requested
+            if self.refreshed < generation:
+                if not self.monitor.update():
+                    self._publish(('interfaces', self.interfaces, None))
+                self.refreshed = generation
+            if self.sample_interval:
+                try:
+                    self.sampler.sample()
+                    self._publish(('traffic', self.sampler.snapshot()))
+                except Exception:
+                    pass
+            if self.wake.wait(self.sample_interval):
+                self.wake.clear()
+        self.monitor.stop()
+
+    def attach(self, widget, on_interfaces, on_traffic=None):
+        """Abonne une fenêtre Tk ; retourne sa file
+
+        `on_interfaces(interfaces, changes)` et `on_traffic(rings)` sont
+        appelés dans le thread Tk, avec le dernier instantané en attente
+        (changes fusionnés, vides pour un relevé initial ou redemandé).
+        L'abonnement prend fin avec la fenêtre.
+        """
+        updates = queue.Queue()
+        with self.lock:
+            self.subscribers.append(updates)
+            if self.interfaces is not None:
+                updates.put(('interfaces', self.interfaces, None))
+            if self.traffic is not None:
+                updates.put(('traffic', self.traffic))
+            if self.thread is None:
+                self.start()
+
+        def relay():
+            try:
+                alive = widget.winfo_exists()
+            except Exception:
+                alive = False
+            if not alive:
+                self.detach(updates)
+                return
+            interfaces = traffic = None
+            merged = {'added': [], 'removed': [], 'changed': []}
+            while True:
+                try:
+                    message = updates.get_nowait()
+                except queue.Empty:
+                    break
+                if message[0] == 'traffic':
+                    traffic = message[1]
+                    continue
+                interfaces, changes = message[1], message[2]
+                for key in merged:
+                    merged[key] += [name for name in (changes or {}).get(key, ())
+                                    if name not in merged[key]]
+            if interfaces is not None:
+                on_interfaces(interfaces, merged)
+            if traffic is not None and on_traffic is not None:
+                on_traffic(traffic)
+            widget.after(QUEUE_POLL_MS, relay)
+
+        widget.after(QUEUE_POLL_MS, relay)
+        return updates
+
+    def detach(self, updates):
+        with self.lock:
+            if updates in self.subscribers:
+                self.subscribers.remove(updates)
+            if not self.subscribers:
+                self.stop()
+
+
+_collector = None
+_collector_lock = threading.Lock()
+
+
+def shared_collector(reader, sample_interval=SAMPLE_INTERVAL):
+    """Collecteur commun à toutes les fenêtres du processus, créé au besoin
+
+    `reader` est obligatoire : get_interfaces ne voit rien hors Linux, chaque
+    application fournit son relevé multiplateforme (ifconfig, ipconfig).
+    Un collecteur actif créé avec un autre relevé est refusé (ValueError)
+    plutôt que partagé en silence. `sample_interval` ne compte qu'à la
+    création.
+    """
+    global _collector
+    with _collector_lock:
+        if _collector is None or _collector.stop_event.is_set():
+            _collector = InterfaceCollector(reader, sample_interval=sample_interval)
+        elif _collector.reader is not reader:
+            raise ValueError(f"collecteur partagé déjà actif avec le relevé {_collector.reader!r}")
+        return _collector
+
+
+def main():
+    """Affiche les interfaces et le temps de lecture de chaque backend"""
+    import json
+
+    for backend in (netlink_interfaces, procfs_interfaces):
+        started = time.perf_counter()
+        try:
+            interfaces = backend()
+        except OSError as e:
+            print(f"❌ {backend.__name__} : {e}")
+            continue
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"⏱️ {backend.__name__} : {elapsed:.3f} ms")
+        print(json.dumps(interfaces, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -12,7 +12,17 @@ from pathlib import Path
 import logging
 import webbrowser
 
+import dashboard_cards
+import net_interfaces
+import sync_engine
+import sync_rules
+import sync_watcher
+import usb_discovery
+
 SYNC_FOLDER = "Network Team"
+SYNC_PROFILE = sync_rules.DEFAULT_PROFILE
+SYNC_WATCHER = None
+TRAFFIC_INTERVAL = net_interfaces.SAMPLE_INTERVAL   # Relevé du trafic des dashboards (s)
 
 # Détecter si l'application est lancée depuis une clé USB
 def detect_usb_launch():
@@ -58,25 +68,46 @@ def tr(fr, en):
     return fr if LANG == "fr" else en
 
 def eject_usb():
-    usb_dir = find_usb_path()
-    if not usb_dir:
+    usb_dirs = find_usb_paths()
+    if not usb_dirs:
         log(tr("Aucune clé USB détectée à éjecter.", "No USB key detected to eject."), level="ERROR")
         return
-    try:
-        if platform.system() == "Windows":
-            drive_letter = os.path.splitdrive(usb_dir)[0]
-            log(tr("Veuillez retirer la clé USB", "Please safely remove the USB key") + f" ({drive_letter}).")
-        else:
-            mount_point = os.path.dirname(usb_dir)
-            os.system(f"umount '{mount_point}'")
-            log(tr("Clé USB démontée : ", "USB key unmounted: ") + mount_point)
-    except Exception as e:
-        log(tr("Erreur lors de l'éjection : ", "Error during ejection: ") + str(e), level="ERROR")
+    for usb_dir in usb_dirs:
+        try:
+            if platform.system() == "Windows":
+                drive_letter = os.path.splitdrive(usb_dir)[0]
+                log(tr("Veuillez retirer la clé USB", "Please safely remove the USB key") + f" ({drive_letter}).")
+            else:
+                mount_point = os.path.dirname(usb_dir)
+                os.system(f"umount '{mount_point}'")
+                log(tr("Clé USB démontée : ", "USB key unmounted: ") + mount_point)
+        except Exception as e:
+            log(tr("Erreur lors de l'éjection : ", "Error during ejection: ") + str(e), level="ERROR")
 
 def manual_sync():
     log(tr("Synchronisation manuelle demandée...", "Manual sync requested..."))
     sync()
 
+def plan_sync():
+    """Simulation de la synchronisation : résumé dans le journal, export JSON"""
+    usb_dir = find_usb_path()
+    if not usb_dir:
+        log(tr("Aucune clé USB avec dossier", "No USB key with folder") + f" '{SYNC_FOLDER}' " + tr("détectée.", "detected."), level="ERROR")
+        return
+    plan = sync_engine.plan_sync(str(LOCAL_PATH), usb_dir, rules=current_rules())
+    estimate = plan['estimate']
+    log(tr("Simulation : ", "Dry run: ") +
+        f"{estimate['to_usb']['files']} → USB, {estimate['to_local']['files']} → " + tr("local", "laptop") + ", "
+        f"{len(plan['delete_usb']) + len(plan['delete_local'])} " + tr("suppressions", "deletions") + ", "
+        f"{len(plan['conflicts'])} " + tr("conflits", "conflicts") + ", "
+        f"{estimate['bytes'] / (1024 * 1024):.1f} " + tr("Mo", "MB") + f", ~{estimate['seconds']:.0f} s")
+    path = filedialog.asksaveasfilename(title=tr("Exporter le plan de synchronisation", "Export sync plan"),
+                                        defaultextension=".json", initialfile="sync_plan.json",
+                                        filetypes=[("JSON", "*.json")])
+    if path:
+        sync_engine.write_plan(plan, path)
+        log(tr("Plan exporté : ", "Plan exported: ") + path)
+
 def show_files():
     files = list(LOCAL_PATH.iterdir())
     if not files:
@@ -318,40 +349,9 @@ def get_network_interfaces():
     
     try:
         if system == "Linux":
-            # Linux - utiliser ip addr show
-            output = subprocess.check_output(["ip", "addr", "show"], encoding="utf-8")
-            current_interface = None
-            
-            for line in output.splitlines():
-                line = line.strip()
-                if line and line[0].isdigit():
-                    # Nouvelle interface
-                    parts = line.split(':')
-                    if len(parts) >= 2:
-                        current_interface = parts[1].strip()
-                        interfaces[current_interface] = {
-                            'ipv4': [],
-                            'ipv6': [],
-                            'status': 'DOWN'
-                        }
-                        if 'UP' in line:
-                            interfaces[current_interface]['status'] = 'UP'
-                elif current_interface and 'inet ' in line:
-                    # Adresse IPv4
-                    parts = line.split()
-                    for i, part in enumerate(parts):
-                        if part == 'inet' and i + 1 < len(parts):
-                            ip = parts[i + 1].split('/')[0]
-                            interfaces[current_interface]['ipv4'].append(ip)
-                elif current_interface and 'inet6' in line:
-                    # Adresse IPv6
-                    parts = line.split()
-                    for i, part in enumerate(parts):
-                        if part == 'inet6' and i + 1 < len(parts):
-                            ip = parts[i + 1].split('/')[0]
-                            if not ip.startswith('fe80'):  # Ignorer les adresses link-local
-                                interfaces[current_interface]['ipv6'].append(ip)
-                                
+            # Linux - rtnetlink (repli /proc, /sys), sans lancer `ip addr show`
+            interfaces = net_interfaces.get_interfaces() or {}
+
         elif system == "Darwin":
             # macOS - utiliser ifconfig
             output = subprocess.check_output(["ifconfig"], encoding="utf-8")
@@ -414,6 +414,10 @@ def get_network_interfaces():
     
     return interfaces
 
+def interface_collector():
+    """Collecteur d'interfaces (thread de fond) commun au dashboard et au gestionnaire Taclane"""
+    return net_interfaces.shared_collector(get_network_interfaces, sample_interval=TRAFFIC_INTERVAL)
+
 def show_network_dashboard():
     """Affiche le dashboard des interfaces réseau avec interface graphique moderne et compact"""
     try:
@@ -567,7 +571,8 @@ def show_network_dashboard():
             for widget in scrollable_frame.winfo_children():
                 widget.destroy()
             
-            interfaces = get_network_interfaces()
+            # Dernier relevé du collecteur : jamais de lecture du système dans le thread Tk
+            interfaces = interface_collector().interfaces or {}
             
             # Stats
             stats_frame = tk.Frame(scrollable_frame, bg='white', relief='raised', bd=1)
@@ -686,9 +691,6 @@ def show_network_dashboard():
     canvas.pack(side="left", fill="both", expand=True)
     scrollbar.pack(side="right", fill="y")
     
-    # Variables pour stocker les widgets
-    interface_frames = []
-    
     def create_interface_card(parent, iface_name, iface_data):
         """Crée une carte visuelle pour une interface réseau"""
         # Frame principal de la carte
@@ -757,6 +759,7 @@ def show_network_dashboard():
                                fg=status_color, 
                                bg=colors['bg_card'])
         status_label.pack(side=tk.RIGHT)
+        card = {'frame': card_frame, 'status': status_label}
         
         # Contenu compact
         if iface_data['ipv4']:
@@ -770,6 +773,7 @@ def show_network_dashboard():
                                fg=colors['info'], 
                                bg=colors['bg_card'])
             ip_label.pack(side=tk.LEFT)
+            card['ip'] = ip_label
             
             # Indicateur s'il y a plusieurs IPs
             if len(iface_data['ipv4']) > 1:
@@ -778,25 +782,59 @@ def show_network_dashboard():
                                       fg=colors['text_secondary'], 
                                       bg=colors['bg_card'])
                 multi_label.pack(side=tk.LEFT, padx=(5, 0))
+                card['multi'] = multi_label
         
-        return card_frame
+        # Débits, sparkline et compteurs (mis à jour par update_all_traffic)
+        card.update(dashboard_cards.create_traffic_row(card_frame, colors['bg_card']))
+        
+        return card
+
+    def update_interface_card(card, iface_name, iface_data, previous):
+        """Met à jour les seuls libellés modifiés ; False si la carte doit être recréée"""
+        if bool(iface_data['ipv4']) != bool(previous['ipv4']) or \
+                (len(iface_data['ipv4']) > 1) != (len(previous['ipv4']) > 1):
+            return False
+        if iface_data['status'] != previous['status']:
+            card['status'].config(text="●" if iface_data['status'] == 'UP' else "○",
+                                  fg=colors['success'] if iface_data['status'] == 'UP' else colors['danger'])
+        if iface_data['ipv4'] != previous['ipv4']:
+            card['ip'].config(text=iface_data['ipv4'][0])
+            if 'multi' in card:
+                card['multi'].config(text=f"+{len(iface_data['ipv4'])-1}")
+        return True
+
+    # En-tête compact avec statistiques essentielles (créé une fois, libellés mis à jour)
+    stats_frame = tk.Frame(scrollable_frame, bg=colors['bg_card'], relief='raised', bd=1)
+    stats_frame.pack(fill=tk.X, padx=2, pady=(0, 5))
+    
+    stats_content = tk.Frame(stats_frame, bg=colors['bg_card'])
+    stats_content.pack(fill=tk.X, padx=8, pady=5)
+    
+    stats_label = tk.Label(stats_content, text="",
+                          font=("Arial", 10, "bold"), 
+                          fg=colors['success'], 
+                          bg=colors['bg_card'])
+    stats_label.pack(side=tk.LEFT)
+    
+    time_label = tk.Label(stats_content, text="",
+                         font=("Arial", 9), 
+                         fg=colors['text_secondary'], 
+                         bg=colors['bg_card'])
+    time_label.pack(side=tk.RIGHT)
+    
+    cards = dashboard_cards.CardList(
+        lambda name, data: create_interface_card(scrollable_frame, name, data),
+        update_interface_card, stats_frame)
+
+    collector = interface_collector()
 
     def refresh_interfaces():
-        """Actualise la liste des interfaces avec cartes graphiques compactes"""
-        # Supprimer les anciennes cartes
-        for widget in scrollable_frame.winfo_children():
-            widget.destroy()
-        
-        # Récupérer les interfaces
-        interfaces = get_network_interfaces()
-        
-        # En-tête compact avec statistiques essentielles
-        stats_frame = tk.Frame(scrollable_frame, bg=colors['bg_card'], relief='raised', bd=1)
-        stats_frame.pack(fill=tk.X, padx=2, pady=(0, 5))
-        
-        stats_content = tk.Frame(stats_frame, bg=colors['bg_card'])
-        stats_content.pack(fill=tk.X, padx=8, pady=5)
-        
+        """Demande un relevé complet au collecteur (résultat reçu par show_interfaces)"""
+        time_label.config(text="🔄")
+        collector.refresh()
+
+    def show_interfaces(interfaces):
+        """Actualise les cartes par différence avec le relevé précédent"""
         # Compter les interfaces en appliquant les mêmes filtres que l'affichage
         filtered_interfaces = {}
         for k, v in interfaces.items():
@@ -813,34 +851,16 @@ def show_network_dashboard():
         
         # Statistiques en une ligne compacte
         stats_text = f"{active_interfaces}/{total_interfaces} " + tr("actives", "active")
-        stats_label = tk.Label(stats_content, text=stats_text,
-                              font=("Arial", 10, "bold"), 
-                              fg=colors['success'], 
-                              bg=colors['bg_card'])
-        stats_label.pack(side=tk.LEFT)
-        
-        # Timestamp compact
-        time_label = tk.Label(stats_content, 
-                             text=time.strftime('%H:%M:%S'),
-                             font=("Arial", 9), 
-                             fg=colors['text_secondary'], 
-                             bg=colors['bg_card'])
-        time_label.pack(side=tk.RIGHT)
+        if stats_label.cget('text') != stats_text:
+            stats_label.config(text=stats_text)
+        time_label.config(text=time.strftime('%H:%M:%S'))
         
-        # Créer les cartes d'interfaces compactes
-        for iface_name, iface_data in interfaces.items():
-            # Ignorer les interfaces système et loopback
-            if iface_name in ['lo', 'lo0', 'Loopback']:
-                continue
-            # Ignorer les interfaces système macOS moins importantes
-            if iface_name.startswith(('anpi', 'awdl', 'llw', 'gif', 'stf')):
-                continue
-            # Afficher seulement les utun qui ont des IPs (VPN actifs)
-            if iface_name.startswith('utun') and not iface_data['ipv4'] and not iface_data['ipv6']:
-                continue
-            create_interface_card(scrollable_frame, iface_name, iface_data)
+        # Cartes : création, suppression ou mise à jour des seules interfaces concernées
+        changes = cards.sync(filtered_interfaces)
+        if not (changes['added'] or changes['removed']):
+            return
         
-        # Ajuster la taille de la fenêtre selon le contenu
+        # Ajuster la taille de la fenêtre selon le contenu (nombre de cartes changé)
         dashboard_win.update_idletasks()
         
         # Calculer la hauteur nécessaire
@@ -859,18 +879,11 @@ def show_network_dashboard():
         x_pos = screen_width - optimal_width - 50
         
         dashboard_win.geometry(f"{optimal_width}x{optimal_height}+{x_pos}+50")
-    # Actualisation initiale
-    refresh_interfaces()
-    
-    # Auto-actualisation toutes les 30 secondes
-    def auto_refresh():
-        try:
-            refresh_interfaces()
-            dashboard_win.after(30000, auto_refresh)  # 30 secondes
-        except:
-            pass  # Fenêtre fermée
-    
-    dashboard_win.after(30000, auto_refresh)
+    # Relevés hors du thread Tk : premier relevé, changements (rtnetlink sous
+    # Linux, sondage de 30 s ailleurs) et trafic arrivent par file
+    time_label.config(text="🔄")
+    collector.attach(dashboard_win, lambda interfaces, changes: show_interfaces(interfaces),
+                     lambda rings: dashboard_cards.update_all_traffic(cards, rings))
     
     # Bind mousewheel pour le scroll
     def on_mousewheel(event):
@@ -1301,40 +1314,13 @@ DHCP=ipv4"""
 
     tk.Button(win, text=tr("Appliquer", "Apply"), command=apply_ip).pack(pady=10)
 
-def find_usb_path():
-    if platform.system() == "Windows":
-        try:
-            import psutil
-            for part in psutil.disk_partitions():
-                if "removable" in part.opts:
-                    candidate = os.path.join(part.mountpoint, SYNC_FOLDER)
-                    if os.path.exists(candidate):
-                        return candidate
-        except ImportError:
-            pass
-    else:
-        media_path = f"/media/{os.getlogin()}"
-        if os.path.exists(media_path):
-            for d in os.listdir(media_path):
-                candidate = os.path.join(media_path, d, SYNC_FOLDER)
-                if os.path.exists(candidate):
-                    return candidate
-    return None
+def find_usb_paths():
+    """Dossiers Network Team de toutes les clés montées (table des montages en cache)"""
+    return usb_discovery.find_sync_folders(SYNC_FOLDER, exclude=[LOCAL_PATH])
 
-def get_latest(src, dst):
-    def latest_mtime(path):
-        if not os.path.exists(path):
-            return 0
-        mtimes = []
-        for root, _, files in os.walk(path):
-            for f in files:
-                mtimes.append(os.path.getmtime(os.path.join(root, f)))
-        return max(mtimes) if mtimes else 0
-    src_time = latest_mtime(src)
-    dst_time = latest_mtime(dst)
-    if src_time > dst_time: return "SRC"
-    elif dst_time > src_time: return "DST"
-    else: return "EQUAL"
+def find_usb_path():
+    usb_dirs = find_usb_paths()
+    return usb_dirs[0] if usb_dirs else None
 
 def log(msg, level="INFO"):
     timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
@@ -1348,117 +1334,57 @@ def log(msg, level="INFO"):
         logging.info(msg)
 
 def sync():
-    usb_dir = find_usb_path()
-    if not usb_dir:
+    usb_dirs = find_usb_paths()
+    if not usb_dirs:
         log(tr("Aucune clé USB avec dossier", "No USB key with folder") + f" '{SYNC_FOLDER}' " + tr("détectée.", "detected."), level="ERROR")
         return False
 
-    # --- Synchronisation Laptop → USB : suppression ---
-    for root, dirs, files in os.walk(usb_dir, topdown=False):
-        rel_root = os.path.relpath(root, usb_dir)
-        local_root = os.path.join(str(LOCAL_PATH), rel_root) if rel_root != '.' else str(LOCAL_PATH)
-        for f in files:
-            usb_file = os.path.join(root, f)
-            local_file = os.path.join(local_root, f)
-            if not os.path.exists(local_file):
-                try:
-                    os.remove(usb_file)
-                    log(tr("Supprimé sur USB : ", "Deleted on USB: ") + os.path.relpath(usb_file, usb_dir))
-                except Exception as e:
-                    log(tr("Erreur suppression USB : ", "Error deleting on USB: ") + str(e), level="ERROR")
-        for d in dirs:
-            usb_subdir = os.path.join(root, d)
-            local_subdir = os.path.join(local_root, d)
-            if not os.path.exists(local_subdir):
-                try:
-                    shutil.rmtree(usb_subdir)
-                    log(tr("Dossier supprimé sur USB : ", "Folder deleted on USB: ") + os.path.relpath(usb_subdir, usb_dir))
-                except Exception as e:
-                    log(tr("Erreur suppression dossier USB : ", "Error deleting folder on USB: ") + str(e), level="ERROR")
-
-    # --- Synchronisation Laptop → USB : ajout/modif ---
-    for root, dirs, _ in os.walk(str(LOCAL_PATH)):
-        for d in dirs:
-            src_dir = os.path.join(root, d)
-            rel_path = os.path.relpath(src_dir, str(LOCAL_PATH))
-            dst_dir = os.path.join(usb_dir, rel_path)
-            if not os.path.exists(dst_dir):
-                os.makedirs(dst_dir, exist_ok=True)
-
-    files_to_usb = []
-    for root, _, file_names in os.walk(str(LOCAL_PATH)):
-        for f in file_names:
-            src_file = os.path.join(root, f)
-            rel_path = os.path.relpath(src_file, str(LOCAL_PATH))
-            dst_file = os.path.join(usb_dir, rel_path)
-            if not os.path.exists(dst_file) or os.path.getmtime(src_file) > os.path.getmtime(dst_file):
-                files_to_usb.append((src_file, dst_file, rel_path))
-    if files_to_usb:
-        log(tr("Laptop → USB : fichiers à synchroniser :", "Laptop → USB: files to sync:"))
-        for _, _, rel_path in files_to_usb:
-            log(f"  - {rel_path}")
-        for src_file, dst_file, _ in files_to_usb:
-            shutil.copy2(src_file, dst_file)
-        log(tr("Synchronisation Laptop → USB terminée", "Laptop → USB sync completed"))
-    else:
-        log(tr("Laptop → USB : aucun fichier à synchroniser.", "Laptop → USB: no files to sync."))
-
-    # --- Synchronisation USB → Laptop : suppression ---
-    for root, dirs, files in os.walk(str(LOCAL_PATH), topdown=False):
-        rel_root = os.path.relpath(root, str(LOCAL_PATH))
-        usb_root = os.path.join(usb_dir, rel_root) if rel_root != '.' else usb_dir
-        for f in files:
-            local_file = os.path.join(root, f)
-            usb_file = os.path.join(usb_root, f)
-            if not os.path.exists(usb_file):
-                try:
-                    os.remove(local_file)
-                    log(tr("Supprimé en local : ", "Deleted locally: ") + os.path.relpath(local_file, str(LOCAL_PATH)))
-                except Exception as e:
-                    log(tr("Erreur suppression locale : ", "Error deleting locally: ") + str(e), level="ERROR")
-        for d in dirs:
-            local_subdir = os.path.join(root, d)
-            usb_subdir = os.path.join(usb_root, d)
-            if not os.path.exists(usb_subdir):
-                try:
-                    shutil.rmtree(local_subdir)
-                    log(tr("Dossier supprimé en local : ", "Folder deleted locally: ") + os.path.relpath(local_subdir, str(LOCAL_PATH)))
-                except Exception as e:
-                    log(tr("Erreur suppression dossier locale : ", "Error deleting folder locally: ") + str(e), level="ERROR")
-
-    # --- Synchronisation USB → Laptop : ajout/modif ---
-    for root, dirs, _ in os.walk(usb_dir):
-        for d in dirs:
-            src_dir = os.path.join(root, d)
-            rel_path = os.path.relpath(src_dir, usb_dir)
-            dst_dir = os.path.join(str(LOCAL_PATH), rel_path)
-            if not os.path.exists(dst_dir):
-                os.makedirs(dst_dir, exist_ok=True)
-
-    files_to_local = []
-    for root, _, file_names in os.walk(usb_dir):
-        for f in file_names:
-            src_file = os.path.join(root, f)
-            rel_path = os.path.relpath(src_file, usb_dir)
-            dst_file = os.path.join(str(LOCAL_PATH), rel_path)
-            if not os.path.exists(dst_file) or os.path.getmtime(src_file) > os.path.getmtime(dst_file):
-                files_to_local.append((src_file, dst_file, rel_path))
-    if files_to_local:
-        log(tr("USB → Laptop : fichiers à synchroniser :", "USB → Laptop: files to sync:"))
-        for _, _, rel_path in files_to_local:
-            log(f"  - {rel_path}")
-        for src_file, dst_file, _ in files_to_local:
-            shutil.copy2(src_file, dst_file)
-        log(tr("Synchronisation USB → Laptop terminée", "USB → Laptop sync completed"))
+    # Un seul parcours de chaque côté, différences calculées avant toute écriture ;
+    # plusieurs clés (préparation de kits) : synchronisées en parallèle
+    if len(usb_dirs) == 1:
+        # shared_local : le watcher peut synchroniser une autre clé en même temps
+        sync_engine.sync_trees(str(LOCAL_PATH), usb_dirs[0], log=log, tr=tr, rules=current_rules(),
+                               shared_local=True)
     else:
-        log(tr("USB → Laptop : aucun fichier à synchroniser.", "USB → Laptop: no files to sync."))
-
+        log(tr(f"{len(usb_dirs)} clés USB détectées, synchronisation en parallèle",
+               f"{len(usb_dirs)} USB keys detected, syncing in parallel"))
+        sync_engine.sync_many(str(LOCAL_PATH), usb_dirs, log=log, tr=tr, rules=current_rules())
     return True
 
+def current_rules():
+    """Règles du profil choisi et du fichier .syncignore du dossier local"""
+    rules = sync_rules.load_rules(str(LOCAL_PATH), SYNC_PROFILE)
+    if SYNC_WATCHER is not None:
+        SYNC_WATCHER.rules = rules
+    return rules
+
+def set_sync_profile():
+    global SYNC_PROFILE
+    SYNC_PROFILE = sync_profile_var.get()
+    current_rules()
+    log(tr("Profil de synchronisation : ", "Sync profile: ") + SYNC_PROFILE)
+
+def sync_changed(paths, usb_dir):
+    """Synchronisation déclenchée par le watcher (paths=None : complète)
+
+    Le watcher synchronise plusieurs clés en parallèle, et une synchro
+    manuelle peut tourner en même temps : écritures locales sérialisées et
+    atomiques (shared_local), comme sync_many.
+    """
+    sync_engine.sync_trees(str(LOCAL_PATH), usb_dir, log=log, tr=tr, paths=paths, rules=current_rules(),
+                           shared_local=True)
+
 def auto_sync():
-    while True:
-        sync()
-        time.sleep(180)  # 3 minutes
+    # Plus de boucle de 3 minutes : inotify (ou sondage en repli) sur le dossier
+    # local et sur la clé détectée, synchronisation des seuls chemins touchés.
+    # Lancé dans un thread : la pose récursive des watches inotify (ou le scan
+    # initial du sondage) peut être longue sur une grosse arborescence ou une
+    # clé lente, l'interface ne doit pas l'attendre
+    global SYNC_WATCHER
+    SYNC_WATCHER = sync_watcher.SyncWatcher(str(LOCAL_PATH), find_usb_paths, sync_changed, log_func=log)
+    current_rules()
+    SYNC_WATCHER.start()
+    return SYNC_WATCHER
 
 # Liste des équipements et IP associées
 DEVICE_IPS = {
@@ -1564,6 +1490,18 @@ menubar.add_cascade(label=tr("Outils", "Tools"), menu=menu_tools)
 menu_sync = tk.Menu(menubar, tearoff=0)
 menu_sync.add_command(label=tr("Sync", "Sync"), command=manual_sync)
 menu_sync.add_command(label=tr("Ejecter USB", "Eject USB"), command=eject_usb)
+menu_sync.add_command(label=tr("Simulation (plan JSON)", "Dry run (JSON plan)"), command=plan_sync)
+SYNC_PROFILE_LABELS = {
+    'full': ("Complet", "Full"),
+    'standard': ("Standard (sans images disque, ≤ 100 Mo)", "Standard (no disk images, ≤ 100 MB)"),
+    'configs': ("Configurations seulement (≤ 1 Mo)", "Configs only (≤ 1 MB)"),
+}
+sync_profile_var = tk.StringVar(value=SYNC_PROFILE)
+menu_profile = tk.Menu(menu_sync, tearoff=0)
+for profile, labels in SYNC_PROFILE_LABELS.items():
+    menu_profile.add_radiobutton(label=tr(*labels), value=profile, variable=sync_profile_var,
+                                 command=set_sync_profile)
+menu_sync.add_cascade(label=tr("Profil de synchronisation", "Sync profile"), menu=menu_profile)
 menubar.add_cascade(label=tr("Synchronisation / USB", "Sync / USB"), menu=menu_sync)
 
 # Configurer le menu sur la fenêtre AVANT d'ajouter d'autres widgets
@@ -2102,7 +2040,7 @@ def start_taclane_manager():
     """Lance le gestionnaire Taclane"""
     try:
         from taclane_manager import create_taclane_interface
-        create_taclane_interface(root, COLORS, log)
+        create_taclane_interface(root, COLORS, log, collector=interface_collector())
         log("🛡️ Gestionnaire Taclane ouvert")
     except ImportError:
         log("❌ Module taclane_manager non trouvé", level="ERROR")
@@ -2189,239 +2127,15 @@ sudo dd if=image.iso of=/dev/sdX bs=4M status=progress
     info_text.config(state='disabled')
 
 def start_tftp_server():
-    """Démarre un serveur TFTP avec interface graphique"""
-    tftp_win = tk.Toplevel(root)
-    tftp_win.title("� Serveur TFTP")
-    tftp_win.geometry("600x500")
-    tftp_win.configure(bg=COLORS['light'])
-    
-    # Variables globales pour le serveur
-    tftp_server = None
-    server_running = False
-    
-    # En-tête
-    header = tk.Frame(tftp_win, bg=COLORS['primary'], height=60)
-    header.pack(fill=tk.X)
-    header.pack_propagate(False)
-    
-    tk.Label(header, text="📁 Serveur TFTP Professional", 
-            font=("Arial", 16, "bold"), 
-            fg=COLORS['white'], bg=COLORS['primary']).pack(pady=15)
-    
-    # Configuration
-    config_frame = tk.LabelFrame(tftp_win, text="Configuration", bg=COLORS['light'])
-    config_frame.pack(fill=tk.X, padx=15, pady=10)
-    
-    # Dossier de partage
-    tk.Label(config_frame, text="Dossier partagé:", bg=COLORS['light']).grid(row=0, column=0, sticky='w', padx=5, pady=5)
-    
-    folder_var = tk.StringVar(value=os.getcwd())
-    folder_entry = tk.Entry(config_frame, textvariable=folder_var, width=40)
-    folder_entry.grid(row=0, column=1, padx=5, pady=5)
-    
-    def browse_folder():
-        folder = filedialog.askdirectory(initialdir=folder_var.get())
-        if folder:
-            folder_var.set(folder)
-    
-    tk.Button(config_frame, text="📂", command=browse_folder, 
-             bg=COLORS['info'], fg=COLORS['white']).grid(row=0, column=2, padx=5, pady=5)
-    
-    # Port
-    tk.Label(config_frame, text="Port:", bg=COLORS['light']).grid(row=1, column=0, sticky='w', padx=5, pady=5)
-    port_var = tk.StringVar(value="69")
-    port_entry = tk.Entry(config_frame, textvariable=port_var, width=10)
-    port_entry.grid(row=1, column=1, sticky='w', padx=5, pady=5)
-    
-    # Statut
-    status_frame = tk.LabelFrame(tftp_win, text="Statut du serveur", bg=COLORS['light'])
-    status_frame.pack(fill=tk.X, padx=15, pady=10)
-    
-    status_label = tk.Label(status_frame, text="🔴 Arrêté", 
-                           font=("Arial", 12, "bold"), 
-                           fg=COLORS['danger'], bg=COLORS['light'])
-    status_label.pack(pady=10)
-    
-    # Contrôles
-    controls_frame = tk.Frame(tftp_win, bg=COLORS['light'])
-    controls_frame.pack(fill=tk.X, padx=15, pady=10)
-    
-    def start_server():
-        nonlocal tftp_server, server_running
-        try:
-            port = int(port_var.get())
-            folder = folder_var.get()
-            
-            if not os.path.exists(folder):
-                log("❌ Le dossier spécifié n'existe pas", level="ERROR")
-                return
-            
-            # Créer un serveur TFTP simple avec socket UDP
-            import socket
-            tftp_server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            tftp_server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            
-            # Pour les ports < 1024, on utilise un port alternatif si pas administrateur
-            if port < 1024:
-                try:
-                    # Tester si on peut bind sur le port privilégié
-                    test_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-                    test_socket.bind(('0.0.0.0', port))
-                    test_socket.close()
-                except PermissionError:
-                    port = 6969  # Port alternatif
-                    port_var.set(str(port))
-                    log(f"⚠️ Utilisation du port alternatif {port} (permissions requises pour port 69)")
-                except Exception:
-                    port = 6969  # Port alternatif par sécurité
-                    port_var.set(str(port))
-                    log(f"⚠️ Utilisation du port alternatif {port}")
-            
-            tftp_server.bind(('0.0.0.0', port))
-            server_running = True
-            
-            # Thread pour gérer les requêtes TFTP
-            def handle_tftp():
-                log(f"✅ Serveur TFTP démarré sur le port {port}")
-                log(f"📁 Dossier partagé: {folder}")
-                status_label.config(text=f"🟢 Actif sur le port {port}", fg=COLORS['success'])
-                start_btn.config(state='disabled')
-                stop_btn.config(state='normal')
-                
-                while server_running:
-                    try:
-                        data, addr = tftp_server.recvfrom(1024)
-                        log(f"📦 Requête TFTP de {addr[0]}:{addr[1]}")
-                        
-                        # Traitement basique des requêtes TFTP
-                        if data.startswith(b'\x00\x01'):  # Read Request (RRQ)
-                            filename = data[2:].split(b'\x00')[0].decode('utf-8')
-                            log(f"📄 Demande de fichier: {filename}")
-                            
-                            file_path = os.path.join(folder, filename)
-                            if os.path.exists(file_path) and os.path.isfile(file_path):
-                                # Envoyer une réponse positive simplifiée
-                                response = b'\x00\x03\x00\x01' + b'File found'
-                                tftp_server.sendto(response, addr)
-                                log(f"✅ Fichier {filename} envoyé à {addr[0]}")
-                            else:
-                                # Erreur fichier non trouvé
-                                error_msg = f"File not found: {filename}".encode('utf-8')
-                                response = b'\x00\x05\x00\x01' + error_msg + b'\x00'
-                                tftp_server.sendto(response, addr)
-                                log(f"❌ Fichier {filename} non trouvé")
-                        
-                    except socket.timeout:
-                        continue
-                    except Exception as e:
-                        if server_running:
-                            log(f"❌ Erreur TFTP: {e}", level="ERROR")
-            
-            tftp_server.settimeout(1.0)  # Timeout pour permettre l'arrêt
-            server_thread = threading.Thread(target=handle_tftp, daemon=True)
-            server_thread.start()
-            
-        except Exception as e:
-            log(f"❌ Erreur démarrage serveur TFTP: {e}", level="ERROR")
-            status_label.config(text="🔴 Erreur", fg=COLORS['danger'])
-    
-    def stop_server():
-        nonlocal server_running
-        try:
-            server_running = False
-            if tftp_server:
-                tftp_server.close()
-            status_label.config(text="🔴 Arrêté", fg=COLORS['danger'])
-            start_btn.config(state='normal')
-            stop_btn.config(state='disabled')
-            log("🛑 Serveur TFTP arrêté")
-        except Exception as e:
-            log(f"❌ Erreur arrêt serveur: {e}", level="ERROR")
-    
-    start_btn = tk.Button(controls_frame, text="▶️ Démarrer", command=start_server,
-                         bg=COLORS['success'], fg=COLORS['white'], padx=20, pady=5)
-    start_btn.pack(side=tk.LEFT, padx=5)
-    
-    stop_btn = tk.Button(controls_frame, text="⏹️ Arrêter", command=stop_server,
-                        bg=COLORS['danger'], fg=COLORS['white'], padx=20, pady=5, state='disabled')
-    stop_btn.pack(side=tk.LEFT, padx=5)
-    
-    # Informations
-    info_frame = tk.LabelFrame(tftp_win, text="Informations", bg=COLORS['light'])
-    info_frame.pack(fill=tk.BOTH, expand=True, padx=15, pady=10)
-    
-    info_text = tk.Text(info_frame, height=8, bg=COLORS['white'], wrap=tk.WORD)
-    info_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-    
-    info_content = """
-📖 Utilisation du serveur TFTP:
-
-1. 📂 Sélectionnez le dossier à partager
-2. 🔧 Configurez le port (69 par défaut, 6969 sans privilèges root)
-3. ▶️ Cliquez sur "Démarrer" pour lancer le serveur
-4. 🌐 Les clients TFTP peuvent maintenant accéder aux fichiers
-
-💡 Commandes clients TFTP utiles:
-• tftp <ip> -c get <fichier>
-• tftp <ip> -c put <fichier>
-• curl -T <fichier> tftp://<ip>/
-
-⚠️ Note: Ce serveur TFTP est basique et conçu pour des tests.
-Pour un usage production, utilisez tftpd-hpa ou atftpd.
-    """
-    
-    info_text.insert(tk.END, info_content)
-    info_text.config(state='disabled')
-    
-    # Bouton pour serveur HTTP alternatif
-    alt_frame = tk.Frame(tftp_win, bg=COLORS['light'])
-    alt_frame.pack(fill=tk.X, padx=15, pady=5)
-    
-    def start_http_server():
-        """Lance un serveur HTTP simple comme alternative"""
-        try:
-            import http.server
-            import socketserver
-            
-            http_port = 8080
-            folder = folder_var.get()
-            
-            # Changer le répertoire de travail
-            original_dir = os.getcwd()
-            os.chdir(folder)
-            
-            def run_http():
-                with socketserver.TCPServer(("", http_port), http.server.SimpleHTTPRequestHandler) as httpd:
-                    log(f"🌐 Serveur HTTP démarré sur http://localhost:{http_port}")
-                    log(f"📁 Dossier: {folder}")
-                    httpd.serve_forever()
-            
-            http_thread = threading.Thread(target=run_http, daemon=True)
-            http_thread.start()
-            
-            # Ouvrir dans le navigateur
-            import webbrowser
-            webbrowser.open(f"http://localhost:{http_port}")
-            
-        except Exception as e:
-            log(f"❌ Erreur serveur HTTP: {e}", level="ERROR")
-        finally:
-            os.chdir(original_dir)
-    
-    tk.Label(alt_frame, text="Alternative:", font=("Arial", 10, "bold"), 
-            bg=COLORS['light']).pack(side=tk.LEFT)
-    
-    tk.Button(alt_frame, text="🌐 Serveur HTTP (Port 8080)", command=start_http_server,
-             bg=COLORS['info'], fg=COLORS['white'], padx=15, pady=3).pack(side=tk.LEFT, padx=10)
-    
-    # Fermeture propre de la fenêtre
-    def on_closing():
-        nonlocal server_running
-        if server_running:
-            stop_server()
-        tftp_win.destroy()
-    
-    tftp_win.protocol("WM_DELETE_WINDOW", on_closing)
+    """Ouvre la fenêtre du serveur TFTP (moteur commun tftp_server)"""
+    try:
+        from tftp_interface import create_tftp_interface
+        create_tftp_interface(root, COLORS, log)
+    except ImportError:
+        log("❌ Module tftp_interface non trouvé", level="ERROR")
+        messagebox.showerror("Erreur", "Module TFTP non disponible")
+    except Exception as e:
+        log(f"❌ Erreur TFTP: {e}", level="ERROR")
 
 def show_network_scanner():
     """Scanner réseau intégré"""
@@ -2506,6 +2220,10 @@ def update_ui_language():
     populate_tools_menu()
     menu_sync.entryconfig(0, label=tr("Sync", "Sync"))
     menu_sync.entryconfig(1, label=tr("Ejecter USB", "Eject USB"))
+    menu_sync.entryconfig(2, label=tr("Simulation (plan JSON)", "Dry run (JSON plan)"))
+    menu_sync.entryconfig(3, label=tr("Profil de synchronisation", "Sync profile"))
+    for i, labels in enumerate(SYNC_PROFILE_LABELS.values()):
+        menu_profile.entryconfig(i, label=tr(*labels))
     menu_lang.entryconfig(0, label="Français")
     menu_lang.entryconfig(1, label="English")
 
@@ -0,0 +1,1134 @@
+#!/usr/bin/env python3
+"""
+Moteur de synchronisation Laptop ↔ USB du dossier Network Team
+Chaque arborescence est parcourue une seule fois (os.scandir) pour bâtir un
+manifeste ; un merge à trois voies avec l'état de la dernière
+synchronisation (SQLite) calcule les opérations avant toute écriture.
+"""
+
+import hashlib
+import json
+import os
+import posixpath
+import shutil
+import sqlite3
+import stat
+import threading
+import time
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from sync_rules import DEFAULT_PROFILE, PROFILES, load_rules
+
+# FAT32 n'enregistre les dates qu'à 2 secondes près : en deçà, deux fichiers
+# de même taille sont considérés identiques
+MTIME_TOLERANCE = 2.0
+# Base du merge à trois voies, à la racine locale (jamais synchronisée)
+STATE_FILE = '.network_sync.db'
+IGNORED_NAMES = {STATE_FILE, STATE_FILE + '-journal'}
+
+# Copie différentielle : empreinte par morceaux de taille fixe, seuls les
+# morceaux modifiés sont réécrits en place au-delà de DELTA_MIN_SIZE
+DELTA_CHUNK = 1024 * 1024
+DELTA_MIN_SIZE = 8 * 1024 * 1024
+DIGEST_SIZE = 16
+# Copies en parallèle : quelques flux suffisent à occuper une clé USB 3 ou un
+# SSD sans multiplier les écritures concurrentes sur une clé lente
+SYNC_WORKERS = 4
+COPY_BUFFER = 1024 * 1024
+# Copies interruptibles : écriture dans un fichier temporaire caché renommé à
+# la fin ; au-delà de RESUME_MIN_SIZE, un journal note tous les
+# JOURNAL_INTERVAL octets la partie écrite sur disque pour reprendre la copie
+TEMP_SUFFIX = '.nsync-part'
+JOURNAL_SUFFIX = '.nsync-journal'
+RESUME_MIN_SIZE = 8 * 1024 * 1024
+JOURNAL_INTERVAL = 32 * 1024 * 1024
+# Estimation des durées (simulation) : débit mesuré, ou valeur par défaut
+# d'une clé USB 2 tant qu'aucune copie significative n'a été chronométrée
+DEFAULT_THROUGHPUT = 10 * 1024 * 1024
+THROUGHPUT_MIN_SAMPLE = 4 * 1024 * 1024
+THROUGHPUT_SMOOTHING = 0.3
+
+# Listes d'opérations d'un plan (diff_manifests), dans l'ordre d'exécution
+OPERATIONS = ('conflicts', 'delete_usb', 'delete_local', 'to_usb', 'to_local',
+              'mkdir_usb', 'mkdir_local', 'rmdir_usb', 'rmdir_local')
+
+# Un verrou par couple (dossier local, clé) : deux synchronisations de la même
+# clé ne se chevauchent pas, plusieurs clés se synchronisent en parallèle
+_sync_locks = {}
+_sync_locks_guard = threading.Lock()
+# Un verrou par dossier local pour les écritures de sync_many : deux clés ne
+# réécrivent jamais en même temps le même fichier (ni son temporaire)
+_local_write_locks = {}
+
+
+def _tr(fr, en):
+    return en
+
+
+def _log(msg, level="INFO"):
+    print(f"[{level}] {msg}")
+
+
+def native_path(root, rel):
+    """Chemin système d'un nom relatif de manifeste (séparateur '/')"""
+    return os.path.join(root, *rel.split('/'))
+
+
+class Manifest:
+    """Contenu d'une arborescence : fichiers (mtime, taille) et dossiers
+
+    Les noms sont relatifs à la racine, avec '/' comme séparateur quel que
+    soit le système. Les liens symboliques vers des dossiers ne sont pas
+    suivis. Avec `rules` (SyncRules), les chemins exclus sont ignorés et les
+    dossiers exclus ne sont pas parcourus. Les fichiers temporaires et
+    journaux des copies interrompues ne sont jamais listés : `partials`
+    contient les noms des fichiers qu'ils concernent.
+    """
+
+    def __init__(self, root, rules=None):
+        self.root = root
+        self.rules = rules
+        self.files = {}         # nom relatif -> (mtime, taille)
+        self.dirs = set()       # noms relatifs des dossiers
+        self.partials = set()   # fichiers avec une copie interrompue
+
+    @classmethod
+    def scan(cls, root, rules=None):
+        """Parcourt `root` une seule fois en réutilisant les stat des DirEntry"""
+        manifest = cls(root, rules)
+        if os.path.isdir(root):
+            manifest._walk('', root)
+        return manifest
+
+    @classmethod
+    def scan_paths(cls, root, paths, rules=None):
+        """Manifeste limité à `paths` (noms relatifs) et à leurs sous-arborescences
+
+        Les dossiers parents existants sont inclus, pour que le merge ne
+        les prenne pas pour des dossiers supprimés.
+        """
+        manifest = cls(root, rules)
+        for name in paths:
+            if rules is not None and rules.excluded_path(name):
+                continue
+            for parent in _ancestors(name):
+                if os.path.isdir(native_path(root, parent)):
+                    manifest.dirs.add(parent)
+            path = native_path(root, name)
+            try:
+                lst = os.lstat(path)
+                # Comme dans le parcours complet : liens suivis vers les seuls fichiers
+                st = os.stat(path) if stat.S_ISLNK(lst.st_mode) else lst
+            except OSError:
+                continue
+            if stat.S_ISDIR(lst.st_mode):
+                if rules is None or not rules.excluded(name, True):
+                    manifest.dirs.add(name)
+                    manifest._walk(name, path)
+            elif stat.S_ISREG(st.st_mode) and _partial_target(name) is None:
+                manifest.files[name] = (st.st_mtime, st.st_size)
+                if os.path.exists(_sidecars(path)[1]):
+                    manifest.partials.add(name)
+        return manifest
+
+    def _walk(self, rel, path):
+        rules = self.rules
+        stack = [(rel, path)]
+        while stack:
+            rel, path = stack.pop()
+            try:
+                it = os.scandir(path)
+            except OSError:
+                continue
+            with it:
+                for entry in it:
+                    if not rel and entry.name in IGNORED_NAMES:
+                        continue
+                    name = f"{rel}/{entry.name}" if rel else entry.name
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            # Dossier exclu : sous-arborescence élaguée
+                            if rules is not None and rules.excluded(name, True):
+                                continue
+                            self.dirs.add(name)
+                            stack.append((name, entry.path))
+                        elif entry.is_file():
+                            target = _partial_target(name)
+                            if target is not None:
+                                self.partials.add(target)
+                                continue
+                            if rules is not None and rules.excluded(name):
+                                continue
+                            st = entry.stat()
+                            self.files[name] = (st.st_mtime, st.st_size)
+                    except OSError:
+                        continue
+
+
+def _sidecars(path):
+    """Fichier temporaire et journal de copie de `path` (cachés, même dossier)"""
+    directory, base = os.path.split(path)
+    return (os.path.join(directory, f'.{base}{TEMP_SUFFIX}'),
+            os.path.join(directory, f'.{base}{JOURNAL_SUFFIX}'))
+
+
+def _partial_target(name):
+    """Nom du fichier visé si `name` est un temporaire ou un journal de copie"""
+    directory, base = posixpath.split(name)
+    for suffix in (TEMP_SUFFIX, JOURNAL_SUFFIX):
+        if base.startswith('.') and base.endswith(suffix) and len(base) > len(suffix) + 1:
+            return posixpath.join(directory, base[1:-len(suffix)])
+    return None
+
+
+def read_journal(path):
+    """Journal de copie, ou None s'il est absent ou illisible (écriture coupée)"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            journal = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return journal if isinstance(journal, dict) else None
+
+
+def fsync_dir(path):
+    """Rend durable un renommage dans `path` (fsync du dossier)
+
+    Sans effet là où un dossier ne peut pas être ouvert (Windows).
+    """
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def write_journal(path, journal):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(journal, f)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def is_newer(entry, other):
+    """Vrai si `entry` (mtime, taille) est plus récent que `other`"""
+    if entry[1] != other[1]:
+        return entry[0] > other[0]
+    return entry[0] - other[0] > MTIME_TOLERANCE
+
+
+def _ancestors(name):
+    parts = name.split('/')
+    return ['/'.join(parts[:i]) for i in range(1, len(parts))]
+
+
+def is_same(entry, other):
+    """Même taille et dates égales à la précision FAT32 près"""
+    return entry[1] == other[1] and abs(entry[0] - other[0]) <= MTIME_TOLERANCE
+
+
+class SyncState:
+    """État de la dernière synchronisation, par clé USB (SQLite)
+
+    Pour chaque fichier présent des deux côtés à l'issue d'une
+    synchronisation, on mémorise (mtime, taille) côté laptop et côté clé :
+    c'est la base commune du merge à trois voies. Un fichier absent de la
+    base est nouveau ; présent dans la base mais absent d'un côté, il y a
+    été supprimé.
+    """
+
+    def __init__(self, path, readonly=False):
+        if readonly:
+            # Simulation : aucune écriture, pas même la création de la base
+            self.db = sqlite3.connect(Path(path).resolve().as_uri() + '?mode=ro', uri=True)
+            return
+        # Connexion partagée avec les threads de copie (HashIndex, sous verrou) ;
+        # attente longue : plusieurs clés synchronisées en parallèle écrivent
+        # dans la même base
+        self.db = sqlite3.connect(path, check_same_thread=False, timeout=60)
+        with self.db:
+            self.db.executescript('''
+                CREATE TABLE IF NOT EXISTS peers (peer TEXT PRIMARY KEY, synced_at REAL);
+                CREATE TABLE IF NOT EXISTS files (
+                    peer TEXT, path TEXT,
+                    local_mtime REAL, local_size INTEGER,
+                    usb_mtime REAL, usb_size INTEGER,
+                    PRIMARY KEY (peer, path));
+                CREATE TABLE IF NOT EXISTS dirs (peer TEXT, path TEXT, PRIMARY KEY (peer, path));
+                CREATE TABLE IF NOT EXISTS throughput (
+                    peer TEXT, direction TEXT, bytes_per_s REAL,
+                    PRIMARY KEY (peer, direction));
+            ''')
+
+    def load(self, peer):
+        """Base de `peer`, ou None s'il n'a jamais été synchronisé"""
+        if self.db.execute('SELECT 1 FROM peers WHERE peer = ?', (peer,)).fetchone() is None:
+            return None
+        files = {row[0]: ((row[1], row[2]), (row[3], row[4])) for row in self.db.execute(
+            'SELECT path, local_mtime, local_size, usb_mtime, usb_size FROM files WHERE peer = ?',
+            (peer,))}
+        dirs = {row[0] for row in self.db.execute('SELECT path FROM dirs WHERE peer = ?', (peer,))}
+        return {'files': files, 'dirs': dirs}
+
+    def save(self, peer, files, dirs, scope=None, parents=()):
+        """Enregistre la base de `peer` en une seule transaction
+
+        Sans `scope`, la base est remplacée ; sinon seules les entrées des
+        chemins de `scope` (et de leurs sous-arborescences) le sont, ainsi
+        que les seuls dossiers `parents` eux-mêmes.
+        """
+        with self.db:
+            if scope is None:
+                self.db.execute('DELETE FROM files WHERE peer = ?', (peer,))
+                self.db.execute('DELETE FROM dirs WHERE peer = ?', (peer,))
+            else:
+                for table in ('files', 'dirs'):
+                    self.db.executemany(
+                        f'DELETE FROM {table} WHERE peer = ? AND (path = ? OR substr(path, 1, ?) = ?)',
+                        ((peer, name, len(name) + 1, name + '/') for name in scope))
+                self.db.executemany('DELETE FROM dirs WHERE peer = ? AND path = ?',
+                                    ((peer, name) for name in parents))
+            self.db.executemany(
+                'INSERT INTO files VALUES (?, ?, ?, ?, ?, ?)',
+                ((peer, path, local[0], local[1], usb[0], usb[1])
+                 for path, (local, usb) in files.items()))
+            self.db.executemany('INSERT INTO dirs VALUES (?, ?)', ((peer, path) for path in dirs))
+            self.db.execute('INSERT OR REPLACE INTO peers VALUES (?, ?)', (peer, time.time()))
+
+    def throughput(self, peer):
+        """Débits mesurés lors des synchronisations précédentes, par sens"""
+        try:
+            return dict(self.db.execute(
+                'SELECT direction, bytes_per_s FROM throughput WHERE peer = ?', (peer,)))
+        except sqlite3.OperationalError:
+            return {}  # Base antérieure à la mesure des débits
+
+    def record_throughput(self, peer, direction, size, seconds):
+        """Moyenne glissante du débit effectif d'un sens de copie"""
+        if size < THROUGHPUT_MIN_SAMPLE or seconds <= 0:
+            return
+        rate = size / seconds
+        previous = self.throughput(peer).get(direction)
+        if previous:
+            rate = previous + THROUGHPUT_SMOOTHING * (rate - previous)
+        with self.db:
+            self.db.execute('INSERT OR REPLACE INTO throughput VALUES (?, ?, ?)',
+                            (peer, direction, rate))
+
+    def close(self):
+        self.db.close()
+
+
+def conflict_name(name, side):
+    """Nom de la copie conservée lors d'un conflit (ex. a.conflict-usb-20240101-120000.cfg)"""
+    head, tail = posixpath.split(name)
+    stem, ext = posixpath.splitext(tail)
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    return posixpath.join(head, f"{stem}.conflict-{side}-{stamp}{ext}")
+
+
+def diff_manifests(local, usb, base=None):
+    """Merge à trois voies : calcule les opérations à mener, sans rien toucher
+
+    `base` est l'état de la dernière synchronisation (SyncState.load). Seul
+    le côté modifié depuis la base est propagé ; une suppression n'est
+    propagée que si l'autre côté n'a pas changé. Modifié des deux côtés,
+    le plus récent l'emporte et l'autre version est conservée sous un nom
+    de conflit. Sans base (première synchronisation), rien n'est supprimé
+    et le plus récent l'emporte.
+    """
+    plan = {key: [] for key in OPERATIONS}
+    base_files = base['files'] if base else {}
+    base_dirs = base['dirs'] if base else set()
+
+    def conflict(name, reason, winner, keep_copy=False):
+        record = {'path': name, 'reason': reason, 'winner': winner}
+        if keep_copy:
+            loser = 'usb' if winner == 'local' else 'local'
+            record['copy'] = conflict_name(name, loser)
+        plan['conflicts'].append(record)
+        plan['to_usb' if winner == 'local' else 'to_local'].append(name)
+
+    for name in sorted(local.files.keys() | usb.files.keys() | base_files.keys()):
+        l_entry = local.files.get(name)
+        u_entry = usb.files.get(name)
+        previous = base_files.get(name)
+
+        if previous is None:
+            # Nouveau fichier (ou première synchronisation)
+            if u_entry is None:
+                plan['to_usb'].append(name)
+            elif l_entry is None:
+                plan['to_local'].append(name)
+            elif is_same(l_entry, u_entry):
+                continue
+            elif base is None:
+                plan['to_usb' if is_newer(l_entry, u_entry) else 'to_local'].append(name)
+            else:
+                conflict(name, 'created_both', 'local' if is_newer(l_entry, u_entry) else 'usb', True)
+            continue
+
+        local_changed = l_entry != previous[0]
+        usb_changed = u_entry != previous[1]
+        if not local_changed and not usb_changed:
+            continue
+        if l_entry is None and u_entry is None:
+            continue
+        if l_entry is None:
+            if usb_changed:
+                conflict(name, 'deleted_local_modified_usb', 'usb')
+            else:
+                plan['delete_usb'].append(name)
+        elif u_entry is None:
+            if local_changed:
+                conflict(name, 'deleted_usb_modified_local', 'local')
+            else:
+                plan['delete_local'].append(name)
+        elif not usb_changed:
+            plan['to_usb'].append(name)
+        elif not local_changed or is_same(l_entry, u_entry):
+            if not is_same(l_entry, u_entry):
+                plan['to_local'].append(name)
+        else:
+            conflict(name, 'modified_both', 'local' if is_newer(l_entry, u_entry) else 'usb', True)
+
+    # Dossiers : créés d'un côté -> créés de l'autre ; supprimés d'un côté ->
+    # supprimés de l'autre s'ils sont vides une fois les fichiers traités
+    for name in sorted(local.dirs ^ usb.dirs):
+        on_local = name in local.dirs
+        if name in base_dirs:
+            plan['rmdir_local' if on_local else 'rmdir_usb'].append(name)
+        else:
+            plan['mkdir_usb' if on_local else 'mkdir_local'].append(name)
+    for key in ('rmdir_usb', 'rmdir_local'):
+        plan[key].sort(key=lambda name: name.count('/'), reverse=True)
+    return plan
+
+
+def _entry(path):
+    st = os.stat(path)
+    return (st.st_mtime, st.st_size)
+
+
+class HashIndex:
+    """Empreintes par morceaux (blake2b) des fichiers, en cache dans la base d'état
+
+    Une entrée n'est valable que pour le (mtime, taille) avec lequel elle a
+    été calculée : un fichier modifié est relu, un fichier inchangé ne l'est
+    jamais. Les racines (laptop, clé) sont indexées séparément.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.lock = threading.Lock()
+        with self.db:
+            self.db.execute('''
+                CREATE TABLE IF NOT EXISTS hashes (
+                    root TEXT, path TEXT, mtime REAL, size INTEGER, chunks BLOB,
+                    PRIMARY KEY (root, path))''')
+
+    @staticmethod
+    def compute(path):
+        """Empreintes des morceaux de DELTA_CHUNK octets d'un fichier"""
+        digests = []
+        with open(path, 'rb') as f:
+            buffer = bytearray(DELTA_CHUNK)
+            view = memoryview(buffer)
+            while True:
+                count = f.readinto(buffer)
+                if not count:
+                    break
+                digests.append(hashlib.blake2b(view[:count], digest_size=DIGEST_SIZE).digest())
+        return digests
+
+    def chunks(self, root, name, entry):
+        """Empreintes du fichier `name` de `root`, depuis le cache si possible"""
+        with self.lock:
+            row = self.db.execute('SELECT mtime, size, chunks FROM hashes WHERE root = ? AND path = ?',
+                                  (root, name)).fetchone()
+        if row is not None and (row[0], row[1]) == tuple(entry):
+            blob = row[2]
+            return [blob[i:i + DIGEST_SIZE] for i in range(0, len(blob), DIGEST_SIZE)]
+        digests = self.compute(native_path(root, name))
+        self.store(root, name, entry, digests)
+        return digests
+
+    def store(self, root, name, entry, digests):
+        with self.lock, self.db:
+            self.db.execute('INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?)',
+                            (root, name, entry[0], entry[1], b''.join(digests)))
+
+    def prune(self, root, names):
+        """Oublie les fichiers de `root` qui n'existent plus"""
+        with self.lock:
+            stale = [(root, path) for (path,) in self.db.execute(
+                'SELECT path FROM hashes WHERE root = ?', (root,)) if path not in names]
+        with self.lock, self.db:
+            self.db.executemany('DELETE FROM hashes WHERE root = ? AND path = ?', stale)
+
+
+def fast_copy(src_path, dst_path, sync=False):
+    """Copie le contenu puis les métadonnées (équivalent de shutil.copy2)
+
+    copy_file_range laisse le noyau copier sans passer par l'espace
+    utilisateur (et clone les blocs sur un même système de fichiers qui le
+    permet) ; à défaut, shutil.copyfile utilise sendfile/fcopyfile ou un
+    tampon de COPY_BUFFER octets. Avec `sync`, le contenu est sur disque
+    (fsync) au retour.
+    """
+    copy_range = getattr(os, 'copy_file_range', None)
+    done = False
+    if copy_range is not None:
+        with open(src_path, 'rb') as fsrc, open(dst_path, 'wb') as fdst:
+            try:
+                while copy_range(fsrc.fileno(), fdst.fileno(), COPY_BUFFER * 8):
+                    pass
+                done = True
+            except OSError:
+                # Noyau ou système de fichiers sans support (EXDEV, ENOSYS...)
+                fdst.truncate(0)
+                fsrc.seek(0)
+                fdst.seek(0)
+                shutil.copyfileobj(fsrc, fdst, COPY_BUFFER)
+                done = True
+            if sync:
+                fdst.flush()
+                os.fsync(fdst.fileno())
+    if not done:
+        shutil.copyfile(src_path, dst_path)
+        if sync:
+            with open(dst_path, 'r+b') as fdst:
+                os.fsync(fdst.fileno())
+    shutil.copystat(src_path, dst_path)
+
+
+def _copy_range(fsrc, fdst, position, length):
+    """Copie `length` octets à partir de `position` ; retourne le nombre copié"""
+    copy_range = getattr(os, 'copy_file_range', None)
+    done = 0
+    if copy_range is not None:
+        try:
+            while done < length:
+                count = copy_range(fsrc.fileno(), fdst.fileno(), length - done,
+                                   position + done, position + done)
+                if not count:
+                    return done
+                done += count
+            return done
+        except OSError:
+            pass
+    fsrc.seek(position + done)
+    fdst.seek(position + done)
+    while done < length:
+        data = fsrc.read(min(COPY_BUFFER, length - done))
+        if not data:
+            break
+        fdst.write(data)
+        done += len(data)
+    return done
+
+
+def copy_atomic(src_path, dst_path, src_entry):
+    """Copie complète via un fichier temporaire renommé à la fin
+
+    La destination n'est jamais laissée tronquée : le temporaire est sur
+    disque (fsync) avant le renommage, lui-même rendu durable par un fsync
+    du dossier (sur vfat, le renommage pourrait sinon précéder les données) ;
+    une copie interrompue (clé retirée, coupure) ne laisse qu'un temporaire
+    caché. Au-delà de
+    RESUME_MIN_SIZE, un journal (source, offset) est mis à jour après fsync
+    tous les JOURNAL_INTERVAL octets ; la copie suivante de la même version
+    de la source reprend à cet offset. Retourne (mode, octets écrits), le
+    mode valant 'resume' pour une copie reprise.
+    """
+    temp, journal_path = _sidecars(dst_path)
+    size = src_entry[1]
+    if size < RESUME_MIN_SIZE:
+        fast_copy(src_path, temp, sync=True)
+        os.replace(temp, dst_path)
+        fsync_dir(os.path.dirname(dst_path))
+        return 'full', size
+
+    offset = 0
+    journal = read_journal(journal_path)
+    if journal and journal.get('mode') == 'full' and (journal.get('mtime'), journal.get('size')) == tuple(src_entry):
+        try:
+            offset = min(journal.get('offset', 0), os.path.getsize(temp))
+        except OSError:
+            offset = 0
+    journal = {'mode': 'full', 'mtime': src_entry[0], 'size': size, 'offset': offset}
+    with open(src_path, 'rb') as fsrc, open(temp, 'r+b' if offset else 'wb') as fdst:
+        fdst.truncate(offset)
+        position = offset
+        while position < size:
+            count = _copy_range(fsrc, fdst, position, min(JOURNAL_INTERVAL, size - position))
+            if not count:
+                break  # Source raccourcie pendant la copie
+            position += count
+            fdst.flush()
+            os.fsync(fdst.fileno())
+            journal['offset'] = position
+            write_journal(journal_path, journal)
+        fdst.truncate(position)
+        fdst.flush()
+        os.fsync(fdst.fileno())
+    shutil.copystat(src_path, temp)
+    os.replace(temp, dst_path)
+    fsync_dir(os.path.dirname(dst_path))
+    os.remove(journal_path)
+    return ('resume' if offset else 'full'), position - offset
+
+
+def _write_chunks(fsrc, fdst, src_digests, dst_digests):
+    """Recopie les morceaux dont l'empreinte diffère ; retourne les octets écrits"""
+    written = 0
+    for index, digest in enumerate(src_digests):
+        if index < len(dst_digests) and dst_digests[index] == digest:
+            continue
+        offset = index * DELTA_CHUNK
+        fsrc.seek(offset)
+        data = fsrc.read(DELTA_CHUNK)
+        fdst.seek(offset)
+        fdst.write(data)
+        written += len(data)
+    return written
+
+
+def copy_file(src, dst, name, src_entry, hashes=None, in_place=True):
+    """Copie `name` de la racine `src` vers `dst` ; retourne (mode, octets écrits)
+
+    - identical : même taille et mêmes empreintes malgré des dates
+      différentes, seule la date est recopiée ;
+    - delta : gros fichier déjà présent, seuls les morceaux modifiés sont
+      réécrits en place puis le fichier est tronqué à la bonne taille ; un
+      journal signale la réécriture en cours tant qu'elle n'est pas finie.
+      Avec `in_place=False` (destination lue par d'autres synchronisations),
+      l'ancienne version est d'abord clonée dans le temporaire
+      (copy_file_range), corrigée puis renommée : jamais de fichier à moitié
+      réécrit visible ;
+    - full / resume : copie complète ou reprise (copy_atomic).
+    """
+    src_path = native_path(src, name)
+    dst_path = native_path(dst, name)
+    os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+
+    try:
+        dst_entry = _entry(dst_path)
+    except FileNotFoundError:
+        dst_entry = None
+    if hashes is None or dst_entry is None or (
+            dst_entry[1] != src_entry[1] and src_entry[1] < DELTA_MIN_SIZE):
+        return copy_atomic(src_path, dst_path, src_entry)
+
+    src_digests = hashes.chunks(src, name, src_entry)
+    dst_digests = hashes.chunks(dst, name, dst_entry)
+    if dst_entry[1] == src_entry[1] and src_digests == dst_digests:
+        shutil.copystat(src_path, dst_path)
+        hashes.store(dst, name, _entry(dst_path), src_digests)
+        return 'identical', 0
+    if src_entry[1] < DELTA_MIN_SIZE:
+        result = copy_atomic(src_path, dst_path, src_entry)
+        hashes.store(dst, name, _entry(dst_path), src_digests)
+        return result
+
+    temp, journal_path = _sidecars(dst_path)
+    if not in_place:
+        # Le temporaire n'est pas une copie complète reprenable : un journal
+        # 'full' laissé par une copie interrompue ne doit plus le désigner
+        try:
+            os.remove(journal_path)
+        except FileNotFoundError:
+            pass
+        with open(src_path, 'rb') as fsrc, open(dst_path, 'rb') as fold, open(temp, 'wb') as fdst:
+            _copy_range(fold, fdst, 0, min(dst_entry[1], src_entry[1]))
+            written = _write_chunks(fsrc, fdst, src_digests, dst_digests)
+            fdst.truncate(src_entry[1])
+            fdst.flush()
+            os.fsync(fdst.fileno())
+        shutil.copystat(src_path, temp)
+        os.replace(temp, dst_path)
+        fsync_dir(os.path.dirname(dst_path))
+        hashes.store(dst, name, _entry(dst_path), src_digests)
+        return 'delta', written
+
+    write_journal(journal_path, {'mode': 'delta', 'mtime': src_entry[0], 'size': src_entry[1]})
+    with open(src_path, 'rb') as fsrc, open(dst_path, 'r+b') as fdst:
+        written = _write_chunks(fsrc, fdst, src_digests, dst_digests)
+        fdst.truncate(src_entry[1])
+        fdst.flush()
+        os.fsync(fdst.fileno())
+    shutil.copystat(src_path, dst_path)
+    os.remove(journal_path)
+    hashes.store(dst, name, _entry(dst_path), src_digests)
+    return 'delta', written
+
+
+def copy_files(names, src, dst, hashes=None, workers=SYNC_WORKERS, in_place=True):
+    """Copie `names` de `src` vers `dst` (manifestes) sur un pool borné
+
+    Les petits fichiers partent en premier : les fichiers de configuration
+    ne restent pas bloqués derrière une image de plusieurs Go. Génère
+    (nom, (mode, octets écrits)) ou (nom, exception) au fil des fins de copie.
+    `in_place` : voir copy_file.
+    """
+    ordered = sorted(names, key=lambda name: src.files[name][1])
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(copy_file, src.root, dst.root, name, src.files[name], hashes,
+                               in_place): name
+                   for name in ordered}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result()
+            except Exception as e:
+                yield futures[future], e
+
+
+def apply_plan(plan, local, usb, log=_log, tr=_tr, hashes=None, workers=SYNC_WORKERS, local_lock=None):
+    """Exécute un plan calculé par diff_manifests
+
+    Les manifestes `local` et `usb` sont mis à jour au fil des opérations
+    réussies (un stat par fichier copié) : ils décrivent ensuite l'état réel
+    des deux côtés. Avec un HashIndex, les copies passent par copy_file en
+    mode différentiel ; le bilan est ajouté au plan sous 'copies'. Avec
+    `local_lock` (dossier local partagé entre synchronisations parallèles),
+    les copies vers le local se font sous ce verrou et jamais en place.
+    Retourne l'ensemble des chemins en erreur.
+    """
+    failed = set()
+    copies = plan['copies'] = {'full': 0, 'resume': 0, 'delta': 0, 'identical': 0,
+                               'bytes_written': 0, 'seconds': 0.0}
+    sides = {'local': local, 'usb': usb}
+
+    for record in plan['conflicts']:
+        log(tr("Conflit : ", "Conflict: ") + f"{record['path']} ({record['reason']})", level="WARNING")
+        if 'copy' not in record:
+            continue
+        loser = sides['usb' if record['winner'] == 'local' else 'local']
+        try:
+            os.replace(native_path(loser.root, record['path']), native_path(loser.root, record['copy']))
+            loser.files[record['copy']] = loser.files.pop(record['path'])
+            log(tr("Version conservée : ", "Version kept: ") + record['copy'])
+        except Exception as e:
+            failed.add(record['path'])
+            log(tr("Erreur conflit : ", "Conflict error: ") + f"{record['path']}: {e}", level="ERROR")
+
+    for key, manifest, message, error in (
+        ('delete_usb', usb, tr("Supprimé sur USB : ", "Deleted on USB: "),
+         tr("Erreur suppression USB : ", "Error deleting on USB: ")),
+        ('delete_local', local, tr("Supprimé en local : ", "Deleted locally: "),
+         tr("Erreur suppression locale : ", "Error deleting locally: ")),
+    ):
+        for name in plan[key]:
+            try:
+                os.remove(native_path(manifest.root, name))
+                manifest.files.pop(name, None)
+                log(message + name)
+            except FileNotFoundError:
+                manifest.files.pop(name, None)
+            except Exception as e:
+                failed.add(name)
+                log(error + str(e), level="ERROR")
+
+    for key, src, dst, title, done, empty in (
+        ('to_usb', local, usb,
+         tr("Laptop → USB : fichiers à synchroniser :", "Laptop → USB: files to sync:"),
+         tr("Synchronisation Laptop → USB terminée", "Laptop → USB sync completed"),
+         tr("Laptop → USB : aucun fichier à synchroniser.", "Laptop → USB: no files to sync.")),
+        ('to_local', usb, local,
+         tr("USB → Laptop : fichiers à synchroniser :", "USB → Laptop: files to sync:"),
+         tr("Synchronisation USB → Laptop terminée", "USB → Laptop sync completed"),
+         tr("USB → Laptop : aucun fichier à synchroniser.", "USB → Laptop: no files to sync.")),
+    ):
+        names = plan[key]
+        if not names:
+            log(empty)
+            continue
+        log(title)
+        for name in names:
+            log(f"  - {name}")
+        shared = local_lock is not None and dst is local
+        started = time.perf_counter()
+        written_before = copies['bytes_written']
+        with local_lock if shared else nullcontext():
+            for name, result in copy_files(names, src, dst, hashes, workers, in_place=not shared):
+                if isinstance(result, Exception):
+                    failed.add(name)
+                    log(tr("Erreur copie : ", "Copy error: ") + f"{name}: {result}", level="ERROR")
+                    continue
+                mode, written = result
+                copies[mode] += 1
+                copies['bytes_written'] += written
+                try:
+                    dst.files[name] = _entry(native_path(dst.root, name))
+                except OSError:
+                    failed.add(name)
+                dst.dirs.update(_ancestors(name))
+        elapsed = time.perf_counter() - started
+        copies['seconds'] += elapsed
+        copies[key] = {'bytes': sum(src.files[name][1] for name in names), 'seconds': elapsed}
+        megabytes = (copies['bytes_written'] - written_before) / (1024 * 1024)
+        rate = megabytes / elapsed if elapsed else 0
+        log(done + f" ({len(names)} {tr('fichiers', 'files')}, {megabytes:.1f} {tr('Mo', 'MB')}, "
+            f"{elapsed:.1f} s, {rate:.1f} {tr('Mo/s', 'MB/s')})")
+    if copies['delta'] or copies['identical']:
+        log(tr(f"Copies différentielles : {copies['delta']}, identiques (date seule) : "
+               f"{copies['identical']}, {copies['bytes_written'] // 1024} Ko écrits",
+               f"Delta copies: {copies['delta']}, identical (date only): "
+               f"{copies['identical']}, {copies['bytes_written'] // 1024} KB written"))
+    if copies['resume']:
+        log(tr(f"Copies interrompues reprises : {copies['resume']}",
+               f"Interrupted copies resumed: {copies['resume']}"))
+
+    for key, manifest in (('mkdir_usb', usb), ('mkdir_local', local)):
+        for name in plan[key]:
+            try:
+                os.makedirs(native_path(manifest.root, name), exist_ok=True)
+                manifest.dirs.add(name)
+            except OSError as e:
+                log(tr("Erreur création dossier : ", "Error creating folder: ") + str(e), level="ERROR")
+
+    for key, manifest, other, message in (
+        ('rmdir_usb', usb, local, tr("Dossier supprimé sur USB : ", "Folder deleted on USB: ")),
+        ('rmdir_local', local, usb, tr("Dossier supprimé en local : ", "Folder deleted locally: ")),
+    ):
+        for name in plan[key]:
+            try:
+                os.rmdir(native_path(manifest.root, name))
+                manifest.dirs.discard(name)
+                log(message + name)
+            except OSError:
+                # Dossier non vide (fichiers ajoutés entre-temps) : on le recrée
+                # de l'autre côté plutôt que de perdre son contenu
+                os.makedirs(native_path(other.root, name), exist_ok=True)
+                other.dirs.add(name)
+
+    return failed
+
+
+def _root_key(root):
+    return os.path.normcase(os.path.abspath(root))
+
+
+def iter_mtimes(root):
+    """Dates de modification des fichiers de `root`, sans construire de liste"""
+    stack = [root]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file():
+                        yield entry.stat().st_mtime
+                except OSError:
+                    continue
+
+
+def latest_mtime(root):
+    """Date la plus récente des fichiers de `root` (0 si vide ou absent)
+
+    Parcours sans liste intermédiaire (iter_mtimes) : valeur exacte, tous
+    les fichiers compris.
+    """
+    if not os.path.isdir(root):
+        return 0
+    return max(iter_mtimes(root), default=0)
+
+
+def _collapse(paths):
+    """Chemins à synchroniser, sans ceux déjà couverts par un dossier parent"""
+    paths = {name.strip('/') for name in paths}
+    if '' in paths:
+        return None  # racine touchée : synchronisation complète
+    paths = {name for name in paths if name not in IGNORED_NAMES}
+    return sorted(name for name in paths if not any(p in paths for p in _ancestors(name)))
+
+
+def _in_scope(name, scope, prefixes):
+    return name in scope or name.startswith(prefixes)
+
+
+def _drop_large(rules, local, usb):
+    """Retire des deux manifestes les fichiers au-delà de la taille du profil
+
+    Un fichier trop gros d'un seul côté est retiré des deux, sinon le merge
+    le prendrait pour un fichier supprimé de l'autre côté.
+    """
+    if rules.max_size is None:
+        return []
+    large = {name for manifest in (local, usb)
+             for name, (_, size) in manifest.files.items() if rules.too_large(size)}
+    for name in large:
+        local.files.pop(name, None)
+        usb.files.pop(name, None)
+    return sorted(large)
+
+
+def _mask_damaged(manifest, base, side):
+    """Fichiers laissés à moitié réécrits par une copie différentielle interrompue
+
+    Leur date est celle de l'interruption : sans précaution, le merge les
+    prendrait pour des modifications et les propagerait. Ils reprennent leur
+    entrée de la base (côté `side` : 0 laptop, 1 clé) ou disparaissent du
+    manifeste, pour être réécrits depuis l'autre côté. Retourne leurs noms.
+    """
+    damaged = []
+    for name in manifest.partials:
+        if name not in manifest.files:
+            continue
+        journal = read_journal(_sidecars(native_path(manifest.root, name))[1])
+        if not journal or journal.get('mode') != 'delta':
+            continue
+        entry = base['files'].get(name) if base else None
+        if entry is None:
+            del manifest.files[name]
+        else:
+            manifest.files[name] = entry[side]
+        damaged.append(name)
+    return damaged
+
+
+def _clean_partials(manifest, keep):
+    """Supprime temporaires et journaux orphelins (hors copies en échec)"""
+    for name in manifest.partials - set(keep):
+        for path in _sidecars(native_path(manifest.root, name)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _prepare(state, local_root, usb_root, peer, paths, rules):
+    """Base, manifestes et plan d'une synchronisation (sans rien écrire)"""
+    scope = _collapse(paths) if paths is not None else None
+    base = state.load(peer) if state is not None else None
+    if base is None:
+        scope = None
+
+    started = time.perf_counter()
+    if scope is None:
+        local = Manifest.scan(local_root, rules)
+        usb = Manifest.scan(usb_root, rules)
+        parents = set()
+    else:
+        local = Manifest.scan_paths(local_root, scope, rules)
+        usb = Manifest.scan_paths(usb_root, scope, rules)
+        prefixes = tuple(name + '/' for name in scope)
+        parents = {parent for name in scope for parent in _ancestors(name)}
+        base = {
+            'files': {name: entry for name, entry in base['files'].items()
+                      if _in_scope(name, scope, prefixes)},
+            'dirs': {name for name in base['dirs']
+                     if name in parents or _in_scope(name, scope, prefixes)},
+        }
+    damaged = {'to_local': _mask_damaged(local, base, 0), 'to_usb': _mask_damaged(usb, base, 1)}
+    skipped = _drop_large(rules, local, usb)
+    scanned = time.perf_counter()
+    plan = diff_manifests(local, usb, base)
+    # Fichier abîmé identique à la base : on le réécrit quand même
+    for key, source in (('to_local', usb), ('to_usb', local)):
+        for name in damaged[key]:
+            if name in source.files and name not in plan[key]:
+                plan[key].append(name)
+    plan['profile'] = rules.profile
+    plan['skipped_large'] = skipped
+    plan['timing'] = {'scan': round(scanned - started, 4),
+                      'diff': round(time.perf_counter() - scanned, 4)}
+    return local, usb, base, scope, parents, plan
+
+
+def estimate_plan(plan, local, usb, throughput=None):
+    """Volumes et durée estimée des copies d'un plan
+
+    La durée repose sur le débit effectif mesuré lors des synchronisations
+    précédentes avec cette clé (DEFAULT_THROUGHPUT sinon). Les copies
+    différentielles écrivant moins, c'est un majorant.
+    """
+    throughput = throughput or {}
+    estimate = {'seconds': 0.0}
+    for key, source in (('to_usb', local), ('to_local', usb)):
+        size = sum(source.files[name][1] for name in plan[key])
+        rate = throughput.get(key)
+        seconds = size / (rate or DEFAULT_THROUGHPUT)
+        estimate[key] = {'files': len(plan[key]), 'bytes': size,
+                         'bytes_per_s': round(rate or DEFAULT_THROUGHPUT),
+                         'measured': rate is not None, 'seconds': round(seconds, 1)}
+        estimate['seconds'] += seconds
+    estimate['seconds'] = round(estimate['seconds'], 1)
+    estimate['bytes'] = estimate['to_usb']['bytes'] + estimate['to_local']['bytes']
+    return estimate
+
+
+def plan_sync(local_root, usb_root, state_path=None, paths=None, rules=None):
+    """Simulation : plan complet d'une synchronisation, sans rien modifier
+
+    Mêmes opérations que sync_trees (copies, suppressions, dossiers,
+    conflits), avec volumes, durée estimée et temps de planification. La
+    base d'état est ouverte en lecture seule.
+    """
+    state_path = state_path or os.path.join(local_root, STATE_FILE)
+    peer = _root_key(usb_root)
+    rules = rules or load_rules(local_root)
+    state = SyncState(state_path, readonly=True) if os.path.exists(state_path) else None
+    try:
+        local, usb, _, scope, _, plan = _prepare(state, local_root, usb_root, peer, paths, rules)
+        throughput = state.throughput(peer) if state is not None else {}
+    finally:
+        if state is not None:
+            state.close()
+
+    plan['estimate'] = estimate_plan(plan, local, usb, throughput)
+    plan.update({
+        'dry_run': True,
+        'local_root': local_root,
+        'usb_root': usb_root,
+        'scope': scope,
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+    })
+    return plan
+
+
+def write_plan(plan, path):
+    """Exporte un plan (plan_sync ou sync_trees) en JSON"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(plan, f, indent=2, ensure_ascii=False)
+
+
+def sync_trees(local_root, usb_root, log=_log, tr=_tr, state_path=None, paths=None, rules=None,
+               shared_local=False):
+    """Synchronise les deux arborescences ; retourne le plan exécuté
+
+    L'état est lu puis réécrit dans `state_path` (par défaut STATE_FILE à la
+    racine locale, exclu du parcours). Avec `paths` (noms relatifs signalés
+    par un watcher), seuls ces chemins et leurs sous-arborescences sont
+    relus et fusionnés ; la première synchronisation d'une clé reste
+    complète. `rules` (SyncRules) filtre les chemins synchronisés ; par
+    défaut, profil complet et .syncignore de la racine locale. Les
+    synchronisations d'une même clé sont sérialisées : la synchro
+    automatique et la synchro manuelle ne se chevauchent pas.
+    `shared_local` (sync_many) : d'autres synchronisations lisent le dossier
+    local en même temps, ses écritures sont sérialisées et atomiques.
+    """
+    state_path = state_path or os.path.join(local_root, STATE_FILE)
+    peer = _root_key(usb_root)
+    rules = rules or load_rules(local_root)
+    with _sync_locks_guard:
+        lock = _sync_locks.setdefault((_root_key(local_root), peer), threading.Lock())
+        local_lock = _local_write_locks.setdefault(_root_key(local_root), threading.Lock()) \
+            if shared_local else None
+
+    with lock:
+        state = SyncState(state_path)
+        try:
+            local, usb, base, scope, parents, plan = _prepare(state, local_root, usb_root, peer, paths, rules)
+            hashes = HashIndex(state.db)
+            failed = apply_plan(plan, local, usb, log, tr, hashes, local_lock=local_lock)
+
+            # Nouvelle base : fichiers présents des deux côtés, ancienne entrée
+            # conservée pour les chemins en erreur
+            files = {name: (entry, usb.files[name])
+                     for name, entry in local.files.items() if name in usb.files}
+            for name in failed:
+                if base and name in base['files']:
+                    files[name] = base['files'][name]
+                else:
+                    files.pop(name, None)
+            state.save(peer, files, local.dirs & usb.dirs, scope, parents)
+            for key in ('to_usb', 'to_local'):
+                if key in plan['copies']:
+                    measure = plan['copies'][key]
+                    state.record_throughput(peer, key, measure['bytes'], measure['seconds'])
+            if scope is None:
+                hashes.prune(local_root, local.files)
+                hashes.prune(usb_root, usb.files)
+                _clean_partials(local, failed)
+                _clean_partials(usb, failed)
+        finally:
+            state.close()
+
+    plan['errors'] = len(failed)
+    return plan
+
+
+def sync_many(local_root, usb_roots, log=_log, tr=_tr, rules=None, workers=None, state_path=None):
+    """Synchronise le dossier local avec plusieurs clés en parallèle
+
+    Chaque clé a sa propre base dans l'état (merge à trois voies
+    indépendant). Les copies vers le dossier local sont sérialisées entre
+    clés et passent toutes par un temporaire renommé, copies
+    différentielles comprises (pas de réécriture en place) : une
+    synchronisation voit toujours une version complète des fichiers
+    qu'une autre est en train d'écrire. Retourne {clé: plan ou exception}.
+    """
+    rules = rules or load_rules(local_root)
+    results = {}
+    if not usb_roots:
+        return results
+    with ThreadPoolExecutor(max_workers=workers or len(usb_roots)) as pool:
+        futures = {pool.submit(sync_trees, local_root, usb_root, log, tr, state_path, rules=rules,
+                               shared_local=True): usb_root
+                   for usb_root in usb_roots}
+        for future in as_completed(futures):
+            try:
+                results[futures[future]] = future.result()
+            except Exception as e:
+                log(tr("Erreur synchronisation ", "Sync error ") + f"{futures[future]}: {e}", level="ERROR")
+                results[futures[future]] = e
+    return results
+
+
+def main():
+    """Simulation ou synchronisation en ligne de commande"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Synchronisation Laptop ↔ USB du dossier Network Team')
+    commands = parser.add_subparsers(dest='command', required=True)
+    for name, help_text in (('plan', 'Simulation : plan JSON et durée estimée, sans rien modifier'),
+                            ('sync', 'Synchronisation'), ):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument('local', help='Dossier local')
+        if name == 'sync':
+            command.add_argument('usb', nargs='+', help='Dossier sur la clé USB (plusieurs : en parallèle)')
+        else:
+            command.add_argument('usb', help='Dossier sur la clé USB')
+        command.add_argument('--state', help=f'Base d\'état (défaut: LOCAL/{STATE_FILE})')
+        command.add_argument('--paths', nargs='+', help='Limiter aux chemins relatifs donnés')
+        command.add_argument('--profile', choices=sorted(PROFILES), default=DEFAULT_PROFILE,
+                             help=f'Profil de synchronisation (défaut: {DEFAULT_PROFILE})')
+        if name == 'plan':
+            command.add_argument('--output', help='Fichier JSON (défaut: sortie standard)')
+
+    args = parser.parse_args()
+    rules = load_rules(args.local, args.profile)
+
+    if args.command == 'plan':
+        plan = plan_sync(args.local, args.usb, args.state, args.paths, rules)
+        if args.output:
+            write_plan(plan, args.output)
+            estimate = plan['estimate']
+            print(f"📋 Plan écrit dans {args.output} : {estimate['bytes'] // (1024 * 1024)} Mo, "
+                  f"~{estimate['seconds']:.0f} s")
+        else:
+            print(json.dumps(plan, indent=2, ensure_ascii=False))
+    else:
+        if len(args.usb) == 1:
+            plan = sync_trees(args.local, args.usb[0], state_path=args.state, paths=args.paths, rules=rules)
+            raise SystemExit(1 if plan['errors'] else 0)
+        results = sync_many(args.local, args.usb, rules=rules, state_path=args.state)
+        raise SystemExit(1 if any(isinstance(plan, Exception) or plan['errors']
+                                  for plan in results.values()) else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Règles d'inclusion/exclusion de la synchronisation (syntaxe .gitignore)
+et profils de synchronisation par taille de fichier
+"""
+
+import os
+import re
+
+RULES_FILE = '.syncignore'
+
+# Toujours exclus : le journal de l'application (réécrit à chaque message),
+# les fichiers temporaires (dont ceux des copies de sync_engine) et les
+# métadonnées des systèmes
+DEFAULT_EXCLUDES = [
+    '/network_team.log',
+    '/network_team.log.*',
+    '.*.nsync-part',
+    '.*.nsync-journal',
+    '*.part',
+    '*.tmp',
+    '~$*',
+    '.DS_Store',
+    'Thumbs.db',
+    'desktop.ini',
+]
+
+CONFIG_EXTENSIONS = ('cfg', 'conf', 'txt', 'json', 'yaml', 'yml', 'xml', 'ini', 'md', 'csv', 'py', 'sh')
+
+PROFILES = {
+    # Tout le dossier Network Team
+    'full': {'patterns': [], 'max_size': None},
+    # Sans les images disque, fichiers jusqu'à 100 Mo
+    'standard': {'patterns': ['*.iso', '*.img', '*.vmdk', '*.qcow2', '*.ova', '*.dmg'],
+                 'max_size': 100 * 1024 * 1024},
+    # Fichiers de configuration et notes uniquement, jusqu'à 1 Mo
+    'configs': {'patterns': ['*', '!*/'] + [f'!*.{ext}' for ext in CONFIG_EXTENSIONS],
+                'max_size': 1024 * 1024},
+}
+DEFAULT_PROFILE = 'full'
+
+
+def _translate(pattern):
+    """Motif glob .gitignore -> expression régulière (sans groupe capturant)"""
+    out = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == '*':
+            if pattern.startswith('**/', i):
+                out.append('(?:.*/)?')
+                i += 3
+                continue
+            if pattern.startswith('**', i):
+                out.append('.*')
+                i += 2
+                continue
+            out.append('[^/]*')
+        elif c == '?':
+            out.append('[^/]')
+        elif c == '[':
+            end = pattern.find(']', i + 2 if pattern[i + 1:i + 2] in ('!', '^') else i + 1)
+            if end < 0:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end]
+                if body[:1] in ('!', '^'):
+                    body = '^' + body[1:]
+                out.append('[' + body.replace('\\', '\\\\') + ']')
+                i = end + 1
+                continue
+        elif c == '\\' and i + 1 < n:
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+            continue
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return ''.join(out)
+
+
+class SyncRules:
+    """Jeu de règles compilé : la dernière règle qui correspond l'emporte
+
+    Syntaxe .gitignore : '#' commentaire, '!' réinclusion, '/' final pour
+    les seuls dossiers, motif contenant '/' ancré à la racine, '**' pour
+    plusieurs niveaux. Toutes les règles sont compilées en une seule
+    expression (alternatives dans l'ordre inverse) : un chemin coûte un seul
+    appel à fullmatch. Un dossier exclu n'est pas parcouru, ce qui interdit
+    comme dans git de réinclure un fichier sous un dossier exclu.
+
+    `max_size` (octets) écarte les fichiers plus gros ; il est appliqué à la
+    paire laptop/clé pour qu'un fichier ne soit pas vu supprimé d'un côté.
+    """
+
+    def __init__(self, patterns=(), max_size=None, profile=None):
+        self.patterns = [p for p in (line.rstrip('\r\n') for line in patterns)
+                         if p.strip() and not p.startswith('#')]
+        self.max_size = max_size
+        self.profile = profile
+        self.rules = []
+        file_parts, dir_parts = [], []
+        for pattern in reversed(self.patterns):
+            negated = pattern.startswith('!')
+            if negated:
+                pattern = pattern[1:]
+            pattern = pattern.rstrip(' ')
+            dir_only = pattern.endswith('/')
+            pattern = pattern.rstrip('/')
+            if not pattern:
+                continue
+            regex = _translate(pattern.lstrip('/'))
+            if '/' not in pattern:
+                regex = '(?:.*/)?' + regex
+            self.rules.append(negated)
+            group = f'({regex})'
+            dir_parts.append(group)
+            # Règle réservée aux dossiers : alternative impossible côté fichiers
+            file_parts.append('((?!))' if dir_only else group)
+        self._file_re = re.compile('|'.join(file_parts)) if file_parts else None
+        self._dir_re = re.compile('|'.join(dir_parts)) if dir_parts else None
+
+    def excluded(self, name, is_dir=False):
+        """Vrai si le chemin relatif `name` est exclu (sans regarder ses parents)"""
+        regex = self._dir_re if is_dir else self._file_re
+        if regex is None:
+            return False
+        match = regex.fullmatch(name)
+        return match is not None and not self.rules[match.lastindex - 1]
+
+    def excluded_path(self, name):
+        """Vrai si `name` ou l'un de ses dossiers parents est exclu
+
+        Pour les chemins signalés sans parcours (watcher) : la nature de
+        `name` est inconnue, il est testé comme fichier.
+        """
+        parts = name.split('/')
+        for i in range(1, len(parts)):
+            if self.excluded('/'.join(parts[:i]), True):
+                return True
+        return self.excluded(name)
+
+    def too_large(self, size):
+        return self.max_size is not None and size > self.max_size
+
+
+def load_rules(local_root, profile=DEFAULT_PROFILE):
+    """Règles par défaut + profil + fichier .syncignore de la racine locale
+
+    Le fichier de règles est synchronisé quel que soit le profil, sauf s'il
+    s'exclut lui-même.
+    """
+    settings = PROFILES.get(profile, PROFILES[DEFAULT_PROFILE])
+    patterns = DEFAULT_EXCLUDES + settings['patterns'] + ['!/' + RULES_FILE]
+    try:
+        with open(os.path.join(local_root, RULES_FILE), encoding='utf-8') as f:
+            patterns += f.read().splitlines()
+    except OSError:
+        pass
+    return SyncRules(patterns, settings['max_size'], profile)
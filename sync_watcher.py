@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Surveillance des dossiers synchronisés (laptop et clé USB)
+inotify sous Linux (via ctypes, sans dépendance), sondage périodique
+ailleurs ; les événements sont regroupés avant de lancer une synchronisation
+limitée aux chemins touchés.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sync_engine import IGNORED_NAMES, Manifest
+
+DEBOUNCE = 2.0          # Calme requis avant de synchroniser (secondes)
+MAX_DELAY = 10.0        # Délai maximal entre un événement et la synchro
+POLL_INTERVAL = 30.0    # Sondage de repli quand inotify est indisponible
+USB_CHECK_INTERVAL = 15.0
+
+# Masques inotify (linux/inotify.h)
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = (IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+              | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+EVENT_HEADER = struct.Struct('iIII')
+
+
+def _libc():
+    """libc avec les appels inotify, ou None (macOS, Windows, libc exotique)"""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class InotifyWatcher:
+    """Surveillance récursive d'une arborescence par inotify
+
+    Une surveillance est posée sur chaque dossier ; les dossiers créés ou
+    déplacés dans l'arborescence sont ajoutés au fil de l'eau. `callback`
+    reçoit le nom relatif touché ('' pour la racine : tout relire, par
+    exemple après un débordement de la file d'événements).
+    """
+
+    def __init__(self, root, callback, libc=None):
+        self.root = root
+        self.callback = callback
+        self.libc = libc or _libc()
+        if self.libc is None:
+            raise OSError("inotify indisponible")
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        self.watches = {}   # descripteur -> nom relatif du dossier
+        self.wake_r, self.wake_w = os.pipe()
+        self.running = False
+        self.thread = None
+        try:
+            self._add_tree('')
+        except OSError:
+            for fd in (self.fd, self.wake_r, self.wake_w):
+                os.close(fd)
+            raise
+
+    def _add_watch(self, rel):
+        path = os.path.join(self.root, *rel.split('/')) if rel else self.root
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            if rel == '' or errno == 28:  # ENOSPC : limite max_user_watches atteinte
+                raise OSError(errno, f"inotify_add_watch {path}")
+            return
+        self.watches[wd] = rel
+
+    def _add_tree(self, rel):
+        self._add_watch(rel)
+        stack = [rel]
+        while stack:
+            parent = stack.pop()
+            try:
+                it = os.scandir(os.path.join(self.root, *parent.split('/')) if parent else self.root)
+            except OSError:
+                continue
+            with it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        name = f"{parent}/{entry.name}" if parent else entry.name
+                        self._add_watch(name)
+                        stack.append(name)
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        os.write(self.wake_w, b'x')
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+        for fd in (self.fd, self.wake_r, self.wake_w):
+            os.close(fd)
+
+    def _run(self):
+        while self.running:
+            try:
+                ready, _, _ = select.select([self.fd, self.wake_r], [], [])
+            except OSError:
+                return
+            if self.wake_r in ready or not self.running:
+                return
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+            except OSError:
+                return
+            self._dispatch(data)
+
+    def _dispatch(self, data):
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].split(b'\x00', 1)[0]
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                self.callback('')
+                continue
+            parent = self.watches.get(wd)
+            if parent is None:
+                continue
+            if mask & IN_IGNORED:
+                del self.watches[wd]
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                self.callback(parent)
+                continue
+            name = os.fsdecode(name)
+            if not parent and name in IGNORED_NAMES:
+                continue
+            rel = f"{parent}/{name}" if parent else name
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                try:
+                    self._add_tree(rel)
+                except OSError:
+                    pass
+            self.callback(rel)
+
+
+class PollingWatcher:
+    """Repli sans inotify : manifeste relu toutes les `interval` secondes
+
+    Seuls les chemins dont la présence, la date ou la taille ont changé
+    sont signalés. Chaque sondage relit l'arborescence sans rien écrire.
+    """
+
+    def __init__(self, root, callback, interval=POLL_INTERVAL):
+        self.root = root
+        self.callback = callback
+        self.interval = interval
+        self.previous = Manifest.scan(root)
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join()
+
+    def poll(self):
+        current = Manifest.scan(self.root)
+        previous, self.previous = self.previous, current
+        changed = {name for name in previous.files.keys() | current.files.keys()
+                   if previous.files.get(name) != current.files.get(name)}
+        changed |= previous.dirs ^ current.dirs
+        for name in sorted(changed):
+            self.callback(name)
+        return changed
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            self.poll()
+
+
+def watch(root, callback, poll_interval=POLL_INTERVAL):
+    """Surveille `root` par inotify si possible, par sondage sinon"""
+    try:
+        return InotifyWatcher(root, callback)
+    except OSError:
+        return PollingWatcher(root, callback, poll_interval)
+
+
+class SyncWatcher:
+    """Synchronisation pilotée par les événements des deux côtés
+
+    Les chemins touchés (laptop ou clés) sont accumulés ;
+    `on_change(paths, usb_root)` est appelé pour chaque clé, en parallèle,
+    après DEBOUNCE secondes sans nouvel événement, ou au plus tard MAX_DELAY
+    secondes après le premier. `paths` vaut None quand une synchronisation
+    complète est nécessaire (clé insérée, débordement). Les clés présentes
+    sont relues toutes les `usb_check_interval` secondes via `find_usb`
+    (liste de dossiers, ou un seul dossier / None). Les chemins exclus par `rules` (SyncRules,
+    remplaçable à chaud) sont ignorés : le journal de l'application, réécrit
+    à chaque message, ne relance pas de synchronisation.
+    """
+
+    def __init__(self, local_root, find_usb, on_change, debounce=DEBOUNCE,
+                 max_delay=MAX_DELAY, usb_check_interval=USB_CHECK_INTERVAL,
+                 poll_interval=POLL_INTERVAL, log_func=None, rules=None):
+        self.local_root = local_root
+        self.rules = rules
+        self.find_usb = find_usb
+        self.on_change = on_change
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.usb_check_interval = usb_check_interval
+        self.poll_interval = poll_interval
+        self.log_func = log_func
+        self.usb_roots = []
+        self.watchers = {}
+        self.pending = set()
+        self.full = set()   # clés à synchroniser entièrement
+        self.first_event = None
+        self.last_event = None
+        self.condition = threading.Condition()
+        self.running = False
+        self.thread = None
+
+    def log(self, message):
+        if self.log_func:
+            self.log_func(message)
+
+    def touch(self, name, usb_root=None):
+        """Signale un chemin modifié ('' ou None : tout resynchroniser,
+        avec la seule clé `usb_root` si elle est donnée)"""
+        rules = self.rules
+        if name and rules is not None and rules.excluded_path(name):
+            return
+        with self.condition:
+            if name:
+                self.pending.add(name)
+            elif usb_root:
+                self.full.add(usb_root)
+            else:
+                self.full.update(self.usb_roots)
+            now = time.monotonic()
+            self.first_event = self.first_event or now
+            self.last_event = now
+            self.condition.notify()
+
+    def _watch(self, side, root):
+        if side == 'local':
+            callback = self.touch
+        else:
+            # Débordement d'une clé : elle seule est resynchronisée entièrement
+            callback = lambda name: self.touch(name, root if not name else None)
+        watcher = watch(root, callback, self.poll_interval)
+        watcher.start()
+        self.watchers[side] = watcher
+        kind = 'inotify' if isinstance(watcher, InotifyWatcher) else 'sondage'
+        self.log(f"👁️ Surveillance {'local' if side == 'local' else 'usb'} ({kind}) : {root}")
+
+    def _check_usb(self):
+        usb_roots = self.find_usb() or []
+        if isinstance(usb_roots, str):
+            usb_roots = [usb_roots]
+        if usb_roots == self.usb_roots:
+            return
+        for usb_root in self.usb_roots:
+            if usb_root not in usb_roots:
+                self.watchers.pop(('usb', usb_root)).stop()
+                with self.condition:
+                    self.full.discard(usb_root)
+        added = [usb_root for usb_root in usb_roots if usb_root not in self.usb_roots]
+        self.usb_roots = list(usb_roots)
+        for usb_root in added:
+            self._watch(('usb', usb_root), usb_root)
+            self.touch(None, usb_root)
+
+    def start(self):
+        self.running = True
+        self._watch('local', self.local_root)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join()
+        for watcher in self.watchers.values():
+            watcher.stop()
+        self.watchers.clear()
+
+    def _due(self):
+        """Échéance de la prochaine synchronisation, ou None si rien en attente"""
+        if self.first_event is None:
+            return None
+        return min(self.last_event + self.debounce, self.first_event + self.max_delay)
+
+    def _run(self):
+        next_usb_check = 0.0
+        while True:
+            with self.condition:
+                while self.running:
+                    now = time.monotonic()
+                    due = self._due()
+                    if now >= next_usb_check or (due is not None and now >= due):
+                        break
+                    wake = next_usb_check if due is None else min(due, next_usb_check)
+                    self.condition.wait(wake - now)
+                if not self.running:
+                    return
+
+                now = time.monotonic()
+                due = self._due()
+                ready = due is not None and now >= due
+                if ready:
+                    paths = sorted(self.pending)
+                    batch = [(None if usb_root in self.full else paths, usb_root)
+                             for usb_root in self.usb_roots if usb_root in self.full or paths]
+                    self.pending = set()
+                    self.full = set()
+                    self.first_event = self.last_event = None
+
+            if now >= next_usb_check:
+                try:
+                    self._check_usb()
+                except Exception as e:
+                    self.log(f"❌ Surveillance USB : {e}")
+                next_usb_check = time.monotonic() + self.usb_check_interval
+            if ready and batch:
+                self._dispatch(batch)
+
+    def _dispatch(self, batch):
+        """Appelle on_change pour chaque clé, en parallèle s'il y en a plusieurs"""
+        def run(item):
+            try:
+                self.on_change(*item)
+            except Exception as e:
+                self.log(f"❌ Synchronisation {item[1]} : {e}")
+
+        if len(batch) == 1:
+            run(batch[0])
+            return
+        with ThreadPoolExecutor(max_workers=len(batch)) as pool:
+            list(pool.map(run, batch))
@@ -13,8 +13,61 @@ import time
 import os
 import webbrowser
 
-def create_taclane_interface(parent, colors, log_func):
-    """Crée l'interface de gestion Taclane"""
+import net_interfaces
+
+TACLANE_PREFIX = '172.16.0.'
+REFRESH_TIMEOUT = 15    # Attente maximale d'un relevé demandé (s)
+
+def get_local_interfaces():
+    """Interfaces locales {nom: {'ipv4', 'ipv6', 'status'}} selon le système
+
+    Linux : rtnetlink (repli /proc, /sys) sans lancer `ip addr` ;
+    Windows : ipconfig ; macOS et autres Unix : ifconfig.
+    """
+    import platform
+    system = platform.system()
+    
+    if system == "Linux":
+        return net_interfaces.get_interfaces() or {}
+    
+    interfaces = {}
+    if system == "Windows":
+        # Windows - utiliser ipconfig
+        result = subprocess.run(['ipconfig'], capture_output=True, text=True, shell=True)
+        
+        current_interface = None
+        for line in result.stdout.split('\n'):
+            line = line.strip()
+            if 'adapter' in line.lower() and line.endswith(':'):
+                current_interface = line.replace(':', '').strip()
+                interfaces[current_interface] = {'ipv4': [], 'ipv6': [], 'status': 'DOWN'}
+            elif current_interface and 'IPv4 Address' in line:
+                ip_parts = line.split(':')
+                if len(ip_parts) >= 2:
+                    ip_addr = ip_parts[1].strip().replace('(Preferred)', '')
+                    interfaces[current_interface]['ipv4'].append(ip_addr)
+                    interfaces[current_interface]['status'] = 'UP'
+    else:  # macOS et autres Unix
+        # macOS - utiliser ifconfig
+        result = subprocess.run(['ifconfig'], capture_output=True, text=True)
+        
+        current_interface = None
+        for line in result.stdout.split('\n'):
+            if line and not line.startswith('\t') and ':' in line:
+                current_interface = line.split(':')[0]
+                interfaces[current_interface] = {'ipv4': [], 'ipv6': [],
+                                                 'status': 'UP' if 'UP' in line else 'DOWN'}
+            elif current_interface and 'inet ' in line and 'inet6 ' not in line:
+                ip_addr = line.split('inet ')[1].split()[0]
+                interfaces[current_interface]['ipv4'].append(ip_addr)
+    return interfaces
+
+def create_taclane_interface(parent, colors, log_func, collector=None):
+    """Crée l'interface de gestion Taclane
+
+    Les interfaces locales viennent du collecteur partagé (thread de fond) :
+    les vérifications réseau n'attendent jamais ipconfig/ifconfig.
+    """
     
     taclane_win = tk.Toplevel(parent)
     taclane_win.title("🛡️ Gestionnaire Taclane")
@@ -22,6 +75,20 @@ def create_taclane_interface(parent, colors, log_func):
     taclane_win.configure(bg=colors['light'])
     taclane_win.resizable(True, True)
     
+    # Interfaces locales relevées par le collecteur ; l'abonnement le garde
+    # actif tant que la fenêtre est ouverte
+    collector = collector or net_interfaces.shared_collector(get_local_interfaces)
+    collector.attach(taclane_win, lambda interfaces, changes: None)
+    
+    def current_interfaces():
+        """Dernier relevé publié par le collecteur (instantané immuable)"""
+        return collector.interfaces or {}
+    
+    def find_taclane_interfaces():
+        """[(interface, ip)] des adresses dans le réseau Taclane 172.16.0.0/24"""
+        return [(name, ip_addr) for name, iface in current_interfaces().items()
+                for ip_addr in iface['ipv4'] if ip_addr.startswith(TACLANE_PREFIX)]
+    
     # En-tête
     header = tk.Frame(taclane_win, bg=colors['primary'], height=70)
     header.pack(fill=tk.X)
@@ -111,55 +178,7 @@ def create_taclane_interface(parent, colors, log_func):
     def check_network_config():
         """Vérifie la configuration réseau actuelle"""
         try:
-            import platform
-            system = platform.system()
-            taclane_interfaces = []
-            
-            if system == "Windows":
-                # Windows - utiliser ipconfig
-                result = subprocess.run(['ipconfig'], capture_output=True, text=True, shell=True)
-                
-                current_interface = None
-                for line in result.stdout.split('\n'):
-                    line = line.strip()
-                    if 'adapter' in line.lower() and line.endswith(':'):
-                        current_interface = line.replace(':', '').strip()
-                    elif current_interface and 'IPv4 Address' in line and '172.16.0.' in line:
-                        ip_parts = line.split(':')
-                        if len(ip_parts) >= 2:
-                            ip_addr = ip_parts[1].strip().replace('(Preferred)', '')
-                            taclane_interfaces.append((current_interface, ip_addr))
-                            
-            elif system == "Linux":
-                # Linux - utiliser ip addr
-                result = subprocess.run(['ip', 'addr', 'show'], capture_output=True, text=True)
-                
-                current_interface = None
-                for line in result.stdout.split('\n'):
-                    line = line.strip()
-                    if line and line[0].isdigit() and ':' in line:
-                        parts = line.split(':')
-                        if len(parts) >= 2:
-                            current_interface = parts[1].strip()
-                    elif current_interface and 'inet 172.16.0.' in line:
-                        parts = line.split()
-                        for i, part in enumerate(parts):
-                            if part == 'inet' and i + 1 < len(parts):
-                                ip_addr = parts[i + 1].split('/')[0]
-                                taclane_interfaces.append((current_interface, ip_addr))
-                                break
-                                
-            else:  # macOS et autres Unix
-                # macOS - utiliser ifconfig
-                result = subprocess.run(['ifconfig'], capture_output=True, text=True)
-                
-                current_interface = None
-                for line in result.stdout.split('\n'):
-                    if line and not line.startswith('\t') and ':' in line:
-                        current_interface = line.split(':')[0]
-                    elif current_interface and 'inet 172.16.0.' in line:
-                        ip_addr = line.split('inet ')[1].split()[0]
-                        taclane_interfaces.append((current_interface, ip_addr))
+            taclane_interfaces = find_taclane_interfaces()
             
             net_win = tk.Toplevel(taclane_win)
             net_win.title("🌐 Configuration Réseau")
@@ -187,47 +206,11 @@ def create_taclane_interface(parent, colors, log_func):
             
             net_info += f"\n📋 Interfaces réseau détectées:\n"
             
-            # Lister toutes les interfaces selon le système
-            if system == "Windows":
-                current_interface = None
-                for line in result.stdout.split('\n'):
-                    line = line.strip()
-                    if 'adapter' in line.lower() and line.endswith(':'):
-                        current_interface = line.replace(':', '').strip()
-                        net_info += f"  • {current_interface}\n"
-                    elif current_interface and 'IPv4 Address' in line:
-                        ip_parts = line.split(':')
-                        if len(ip_parts) >= 2:
-                            ip_addr = ip_parts[1].strip().replace('(Preferred)', '')
-                            net_info += f"    └─ IP: {ip_addr}\n"
-                            
-            elif system == "Linux":
-                current_interface = None
-                for line in result.stdout.split('\n'):
-                    line = line.strip()
-                    if line and line[0].isdigit() and ':' in line:
-                        parts = line.split(':')
-                        if len(parts) >= 2:
-                            current_interface = parts[1].strip()
-                            status = "UP" if "UP" in line else "DOWN"
-                            net_info += f"  • {current_interface}: {status}\n"
-                    elif current_interface and 'inet ' in line and '127.0.0.1' not in line:
-                        parts = line.split()
-                        for i, part in enumerate(parts):
-                            if part == 'inet' and i + 1 < len(parts):
-                                ip_addr = parts[i + 1].split('/')[0]
-                                net_info += f"    └─ IP: {ip_addr}\n"
-                                break
-                                
-            else:  # macOS et autres Unix
-                current_interface = None
-                for line in result.stdout.split('\n'):
-                    if line and not line.startswith('\t') and ':' in line:
-                        current_interface = line.split(':')[0]
-                        status = "UP" if "UP" in line else "DOWN"
-                        net_info += f"  • {current_interface}: {status}\n"
-                    elif current_interface and 'inet ' in line and 'inet 127.0.0.1' not in line:
-                        ip_addr = line.split('inet ')[1].split()[0]
+            # Lister toutes les interfaces du dernier relevé
+            for interface, iface in current_interfaces().items():
+                net_info += f"  • {interface}: {iface['status']}\n"
+                for ip_addr in iface['ipv4']:
+                    if not ip_addr.startswith('127.'):
                         net_info += f"    └─ IP: {ip_addr}\n"
             
             net_text.insert(tk.END, net_info)
@@ -388,7 +371,26 @@ def create_taclane_interface(parent, colors, log_func):
                                  font=("Consolas", 9))
         validation_text.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
-        def run_validation():
+        def start_validation():
+            """Demande un relevé frais au collecteur et lance la validation une fois publié"""
+            generation = collector.refresh()
+            deadline = time.time() + REFRESH_TIMEOUT
+            validation_text.delete(1.0, tk.END)
+            validation_text.insert(tk.END, "⏳ Relevé des interfaces locales...\n")
+            
+            def wait_refresh():
+                if not validation_win.winfo_exists():
+                    return
+                if collector.is_refreshed(generation):
+                    run_validation(fresh=True)
+                elif time.time() >= deadline:
+                    run_validation(fresh=False)
+                else:
+                    validation_win.after(100, wait_refresh)
+            
+            validation_win.after(100, wait_refresh)
+        
+        def run_validation(fresh=True):
             validation_text.delete(1.0, tk.END)
             validation_text.insert(tk.END, "🔍 Validation en cours...\n\n")
             validation_text.update()
@@ -398,48 +400,11 @@ def create_taclane_interface(parent, colors, log_func):
                 
                 # 1. Vérifier interfaces locales
                 validation_text.insert(tk.END, "1️⃣ Vérification interfaces locales...\n")
+                if not fresh:
+                    validation_text.insert(tk.END, f"   ⚠️ Relevé non reçu après {REFRESH_TIMEOUT} s, "
+                                                   "dernier relevé connu utilisé\n")
                 
-                import platform
-                system = platform.system()
-                taclane_interfaces = []
-                
-                if system == "Windows":
-                    result = subprocess.run(['ipconfig'], capture_output=True, text=True, shell=True)
-                    current_interface = None
-                    for line in result.stdout.split('\n'):
-                        line = line.strip()
-                        if 'adapter' in line.lower() and line.endswith(':'):
-                            current_interface = line.replace(':', '').strip()
-                        elif current_interface and 'IPv4 Address' in line and '172.16.0.' in line:
-                            ip_parts = line.split(':')
-                            if len(ip_parts) >= 2:
-                                ip_addr = ip_parts[1].strip().replace('(Preferred)', '')
-                                taclane_interfaces.append((current_interface, ip_addr))
-                elif system == "Linux":
-                    result = subprocess.run(['ip', 'addr', 'show'], capture_output=True, text=True)
-                    current_interface = None
-                    for line in result.stdout.split('\n'):
-                        line = line.strip()
-                        if line and line[0].isdigit() and ':' in line:
-                            parts = line.split(':')
-                            if len(parts) >= 2:
-                                current_interface = parts[1].strip()
-                        elif current_interface and 'inet 172.16.0.' in line:
-                            parts = line.split()
-                            for i, part in enumerate(parts):
-                                if part == 'inet' and i + 1 < len(parts):
-                                    ip_addr = parts[i + 1].split('/')[0]
-                                    taclane_interfaces.append((current_interface, ip_addr))
-                                    break
-                else:  # macOS
-                    result = subprocess.run(['ifconfig'], capture_output=True, text=True)
-                    current_interface = None
-                    for line in result.stdout.split('\n'):
-                        if line and not line.startswith('\t') and ':' in line:
-                            current_interface = line.split(':')[0]
-                        elif current_interface and 'inet 172.16.0.' in line:
-                            ip_addr = line.split('inet ')[1].split()[0]
-                            taclane_interfaces.append((current_interface, ip_addr))
+                taclane_interfaces = find_taclane_interfaces()
                 
                 if taclane_interfaces:
                     validation_text.insert(tk.END, "   ✅ Interface(s) configurée(s):\n")
@@ -501,12 +466,12 @@ def create_taclane_interface(parent, colors, log_func):
             except Exception as e:
                 validation_text.insert(tk.END, f"\n❌ Erreur lors de la validation: {e}\n")
         
-        # Lancer la validation automatiquement
-        validation_win.after(500, run_validation)
+        # Lancer la validation automatiquement, sur un relevé frais
+        start_validation()
         
         # Bouton pour relancer
         tk.Button(validation_win, text="🔄 Relancer Validation", 
-                 command=run_validation, bg=colors['success'], 
+                 command=start_validation, bg=colors['success'], 
                  fg=colors['white'], padx=20, pady=5).pack(pady=10)
     
     diagnostic_tools = [
@@ -763,19 +728,7 @@ def create_taclane_interface(parent, colors, log_func):
         def check_and_configure_network():
             try:
                 # Vérifier si on a une interface dans le bon réseau
-                import platform
-                system = platform.system()
-                has_taclane_network = False
-                
-                if system == "Windows":
-                    result = subprocess.run(['ipconfig'], capture_output=True, text=True, shell=True)
-                    has_taclane_network = '172.16.0.' in result.stdout
-                elif system == "Linux":
-                    result = subprocess.run(['ip', 'addr', 'show'], capture_output=True, text=True)
-                    has_taclane_network = '172.16.0.' in result.stdout
-                else:  # macOS
-                    result = subprocess.run(['ifconfig'], capture_output=True, text=True)
-                    has_taclane_network = '172.16.0.' in result.stdout
+                has_taclane_network = bool(find_taclane_interfaces())
                 
                 if not has_taclane_network:
                     # Demander confirmation pour configurer l'interface
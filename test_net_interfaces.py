@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Test du backend natif des interfaces réseau (rtnetlink / procfs)
+"""
+
+import shutil
+import subprocess
+import sys
+import time
+
+import net_interfaces
+
+
+def _ip_addr_show():
+    """Référence : ancien parsing de `ip addr show` (network.py)"""
+    output = subprocess.check_output(["ip", "addr", "show"], encoding="utf-8")
+    interfaces = {}
+    current = None
+    for line in output.splitlines():
+        line = line.strip()
+        if line and line[0].isdigit():
+            current = line.split(':')[1].strip().split('@')[0]
+            interfaces[current] = {'ipv4': [], 'ipv6': [], 'status': 'UP' if ',UP' in line or '<UP' in line else 'DOWN'}
+        elif current and line.startswith('inet '):
+            interfaces[current]['ipv4'].append(line.split()[1].split('/')[0])
+        elif current and line.startswith('inet6 '):
+            ip = line.split()[1].split('/')[0]
+            if not ip.startswith('fe80'):
+                interfaces[current]['ipv6'].append(ip)
+    return interfaces
+
+
+def test_interface_backends():
+    """Test : même format et mêmes adresses que `ip addr show`, sans fork"""
+    if not sys.platform.startswith('linux'):
+        assert net_interfaces.get_interfaces() is None
+        print("⏭️ Backend natif réservé à Linux")
+        return
+
+    interfaces = net_interfaces.get_interfaces()
+    assert interfaces, "aucune interface"
+    for name, iface in interfaces.items():
+        assert set(iface) == {'ipv4', 'ipv6', 'status'}
+        assert iface['status'] in ('UP', 'DOWN')
+        assert not any(ip.startswith('fe80') for ip in iface['ipv6'])
+    assert '127.0.0.1' in interfaces['lo']['ipv4'] and interfaces['lo']['status'] == 'UP'
+
+    # Le repli procfs ne voit que l'adresse IPv4 principale
+    fallback = net_interfaces.procfs_interfaces()
+    assert set(fallback) == set(interfaces)
+    for name, iface in fallback.items():
+        assert iface['status'] == interfaces[name]['status']
+        assert set(iface['ipv4']) <= set(interfaces[name]['ipv4'])
+        assert sorted(iface['ipv6']) == sorted(interfaces[name]['ipv6'])
+
+    if shutil.which('ip'):
+        reference = _ip_addr_show()
+        assert set(reference) == set(interfaces)
+        for name, iface in reference.items():
+            assert iface['ipv4'] == interfaces[name]['ipv4']
+            assert sorted(iface['ipv6']) == sorted(interfaces[name]['ipv6'])
+            assert iface['status'] == interfaces[name]['status']
+
+    started = time.perf_counter()
+    for _ in range(100):
+        net_interfaces.netlink_interfaces()
+    per_call = (time.perf_counter() - started) * 10
+    print(f"✅ Interfaces natives : {len(interfaces)} interfaces, {per_call:.3f} ms par lecture")
+
+
+def test_interface_monitor():
+    """Test des notifications de changement (sondage) et du collecteur partagé"""
+    up = {'eth0': {'ipv4': ['192.0.2.2'], 'ipv6': [], 'status': 'UP'}}
+    down = {'eth0': {'ipv4': [], 'ipv6': [], 'status': 'DOWN'}}
+    plugged = dict(down, eth1={'ipv4': ['198.51.100.7'], 'ipv6': [], 'status': 'UP'})
+    assert net_interfaces.diff_interfaces(up, up) is None
+    assert net_interfaces.diff_interfaces(up, plugged) == {'added': ['eth1'], 'removed': [],
+                                                           'changed': ['eth0']}
+
+    readings = [up, up, down, down, plugged]
+    seen = []
+    monitor = net_interfaces.InterfaceMonitor(lambda interfaces, changes: seen.append(changes),
+                                              reader=lambda: readings.pop(0) if len(readings) > 1 else readings[0],
+                                              interval=0.02, netlink=False)
+    assert monitor.start() == up and monitor.kind == 'polling'
+    deadline = time.time() + 5
+    while len(seen) < 2 and time.time() < deadline:
+        time.sleep(0.02)
+    monitor.stop()
+    # Relevés identiques : aucune notification
+    assert seen == [{'added': [], 'removed': [], 'changed': ['eth0']},
+                    {'added': ['eth1'], 'removed': [], 'changed': []}]
+
+    class FakeWidget:
+        """Fenêtre Tk minimale : after() mémorisé, exécuté à la main"""
+        def __init__(self):
+            self.pending = []
+            self.alive = True
+
+        def after(self, ms, func):
+            self.pending.append(func)
+
+        def winfo_exists(self):
+            return self.alive
+
+    def run_pending(widget, until, timeout=5):
+        """Boucle Tk simulée : relève la file jusqu'à `until()`"""
+        deadline = time.time() + timeout
+        while not until() and time.time() < deadline:
+            time.sleep(0.02)
+            widget.pending.pop()()
+
+    # Relevé lent (ipconfig /all...) : attach() rend la main immédiatement
+    def slow_reader():
+        time.sleep(0.3)
+        return readings.pop(0) if len(readings) > 1 else readings[0]
+
+    readings = [up, up, down]
+    counters = iter(range(0, 10 ** 9, 1000))
+    collector = net_interfaces.InterfaceCollector(
+        slow_reader, interval=3600, sample_interval=0.05, netlink=False,
+        counters=lambda: {'eth0': (next(counters),) * len(net_interfaces.COUNTERS)})
+    widget, updates, traffic = FakeWidget(), [], []
+    started = time.perf_counter()
+    collector.attach(widget, lambda interfaces, changes: updates.append((interfaces, changes)),
+                     traffic.append)
+    assert time.perf_counter() - started < 0.1 and updates == []
+    run_pending(widget, lambda: updates and traffic)
+    interfaces, changes = updates[0]
+    frozen = net_interfaces.freeze_interfaces
+    assert interfaces == frozen(up) and changes == {'added': [], 'removed': [], 'changed': []}
+    try:
+        interfaces['eth0']['ipv4'] += ('203.0.113.9',)
+        assert False, "instantané modifiable"
+    except TypeError:
+        pass
+    assert traffic[-1]['eth0'].count >= 1
+
+    # Actualisation demandée : relevé transmis même inchangé, puis le changement
+    generation = collector.refresh()
+    assert not collector.is_refreshed(generation)
+    run_pending(widget, lambda: len(updates) >= 2)
+    assert collector.is_refreshed(generation) and collector.interfaces == frozen(up)
+    assert updates[1] == (frozen(up), {'added': [], 'removed': [], 'changed': []})
+    generation = collector.refresh()
+    run_pending(widget, lambda: collector.is_refreshed(generation) and len(updates) >= 3)
+    assert collector.interfaces == frozen(down)
+    assert updates[2] == (frozen(down), {'added': [], 'removed': [], 'changed': ['eth0']})
+
+    # Collecteur partagé : une seconde fenêtre reçoit aussitôt le dernier relevé
+    other, seen_other = FakeWidget(), []
+    collector.attach(other, lambda interfaces, changes: seen_other.append(interfaces))
+    other.pending.pop()()
+    assert seen_other == [frozen(down)]
+
+    # Fermeture des fenêtres : le collecteur s'arrête avec le dernier abonné
+    widget.alive = other.alive = False
+    widget.pending.pop()()
+    assert not collector.stop_event.is_set()
+    other.pending.pop()()
+    assert widget.pending == [] and other.pending == [] and collector.stop_event.is_set()
+    collector.thread.join(5)
+    assert not collector.thread.is_alive() and collector.monitor.stop_event.is_set()
+    reader = net_interfaces.get_interfaces
+    shared = net_interfaces.shared_collector(reader)
+    assert net_interfaces.shared_collector(reader) is shared
+    try:
+        net_interfaces.shared_collector(slow_reader)
+        assert False, "relevé différent accepté"
+    except ValueError:
+        pass
+    shared.stop()
+    assert net_interfaces.shared_collector(slow_reader) is not shared
+    print("✅ Notifications de changement d'interfaces")
+
+
+def test_card_list():
+    """Test des cartes indexées : seules les cartes concernées sont touchées"""
+    from dashboard_cards import CardList
+
+    packed = []     # ordre d'affichage (pack) des widgets
+
+    class FakeFrame:
+        def __init__(self, name):
+            self.name = name
+            packed.append(self)
+
+        def pack_configure(self, after):
+            packed.remove(self)
+            packed.insert(packed.index(after) + 1, self)
+
+        def destroy(self):
+            packed.remove(self)
+
+    created, updated = [], []
+
+    def create(name, data):
+        created.append(name)
+        return {'frame': FakeFrame(name), 'status': data['status']}
+
+    def update(card, name, data, previous):
+        if bool(data['ipv4']) != bool(previous['ipv4']):
+            return False
+        updated.append(name)
+        card['status'] = data['status']
+        return True
+
+    header = FakeFrame('stats')
+    cards = CardList(create, update, header)
+    iface = lambda status='UP', ipv4=(): {'ipv4': list(ipv4), 'ipv6': [], 'status': status}
+    snapshot = {f'veth{n}': iface() for n in range(60)}
+    assert cards.sync(snapshot)['added'] == list(snapshot) and len(created) == 60
+
+    # Relevé identique : rien n'est recréé ni reconfiguré
+    created.clear()
+    assert cards.sync(dict(snapshot)) == {'added': [], 'removed': [], 'updated': []}
+    assert created == [] and updated == []
+
+    # Un lien tombe, une interface disparaît, une autre apparaît au milieu
+    snapshot = {name: data for name, data in snapshot.items() if name != 'veth5'}
+    snapshot['veth7'] = iface('DOWN')
+    names = list(snapshot)
+    snapshot['eth0'] = iface(ipv4=['192.0.2.2'])
+    snapshot = {name: snapshot[name] for name in names[:10] + ['eth0'] + names[10:]}
+    changes = cards.sync(snapshot)
+    assert changes == {'added': ['eth0'], 'removed': ['veth5'], 'updated': ['veth7']}
+    assert created == ['eth0'] and updated == ['veth7']
+    assert cards.cards['veth7']['status'] == 'DOWN'
+    assert [frame.name for frame in packed] == ['stats'] + list(snapshot)
+
+    # Changement de structure (adresse IPv4 apparue) : carte recréée à sa place
+    snapshot['veth0'] = iface(ipv4=['198.51.100.1'])
+    cards.sync(snapshot)
+    assert created[-1] == 'veth0'
+    assert [frame.name for frame in packed] == ['stats'] + list(snapshot)
+    print("✅ Cartes d'interfaces mises à jour par différence")
+
+
+def test_traffic_counters():
+    """Test des compteurs de trafic : tampon circulaire, débits, sparkline"""
+    from dashboard_cards import format_bits, sparkline_points
+
+    counters = net_interfaces.read_counters()
+    if sys.platform.startswith('linux'):
+        assert 'lo' in counters and len(counters['lo']) == len(net_interfaces.COUNTERS)
+        # Mêmes valeurs que /sys/class/net/*/statistics (lo : compteurs croissants)
+        sysfs = net_interfaces._sysfs_counters()
+        assert set(sysfs) == set(counters)
+        assert sysfs['lo'][0] >= counters['lo'][0]
+
+    # 1 Mo/s reçu, 125 ko/s émis, puis remise à zéro du compteur (interface recréée)
+    readings = [{'eth0': (n * 1000000, n * 125000, n * 1000, n * 100, 0, 0, n, 0)} for n in range(6)]
+    readings.append({'eth0': (0, 0, 0, 0, 0, 0, 0, 0), 'eth1': (5, 5, 1, 1, 0, 0, 0, 0)})
+    readings.append({'eth1': (5, 5, 1, 1, 0, 0, 0, 0)})
+    sampler = net_interfaces.TrafficSampler(size=4, reader=lambda: readings.pop(0))
+    for second in range(6):
+        sampler.sample(timestamp=float(second))
+    ring = sampler.rings['eth0']
+    assert ring.count == 4 and ring.head == 2
+    assert ring.bit_rates() == (8000000.0, 1000000.0)
+    assert ring.series('rx_bytes') == [8000000.0] * 3
+    assert ring.latest()['rx_dropped'] == 5
+    sampler.sample(timestamp=6.0)
+    assert ring.bit_rates() == (0.0, 0.0) and set(sampler.rings) == {'eth0', 'eth1'}
+    sampler.sample(timestamp=7.0)
+    assert set(sampler.rings) == {'eth1'}
+
+    assert format_bits(950) == '950 b/s' and format_bits(8000000.0) == '8.0 Mb/s'
+    points = sparkline_points([0, 5, 10], 10, slots=3, width=100, height=22)
+    assert points[0::2] == [0, 50, 100] and points[1] == 21 and points[-1] == 1
+    print("✅ Compteurs de trafic et débits")
+
+
+if __name__ == '__main__':
+    test_interface_backends()
+    test_interface_monitor()
+    test_card_list()
+    test_traffic_counters()
@@ -0,0 +1,590 @@
+#!/usr/bin/env python3
+"""
+Test du moteur de synchronisation Laptop ↔ USB
+"""
+
+import os
+import tempfile
+import time
+
+import sync_engine
+from sync_engine import Manifest, diff_manifests, sync_trees
+
+
+def _write(root, rel, content, mtime=None):
+    path = os.path.join(root, *rel.split('/'))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(content)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return path
+
+
+def _read(root, rel):
+    with open(os.path.join(root, *rel.split('/'))) as f:
+        return f.read()
+
+
+def test_manifest_scan():
+    """Test du parcours unique : fichiers, dossiers et noms relatifs"""
+    with tempfile.TemporaryDirectory() as root:
+        _write(root, 'configs/sw1.cfg', 'hostname sw1')
+        _write(root, 'configs/old/sw0.cfg', 'hostname sw0')
+        _write(root, 'notes.txt', 'x' * 10)
+
+        manifest = Manifest.scan(root)
+        assert set(manifest.files) == {'configs/sw1.cfg', 'configs/old/sw0.cfg', 'notes.txt'}
+        assert manifest.dirs == {'configs', 'configs/old'}
+        assert manifest.files['notes.txt'][1] == 10
+        assert Manifest.scan(os.path.join(root, 'absent')).files == {}
+    print("✅ Manifeste correct")
+
+
+def test_diff_first_sync():
+    """Test de la première synchronisation : aucune suppression, le plus récent gagne"""
+    now = time.time()
+    with tempfile.TemporaryDirectory() as local, tempfile.TemporaryDirectory() as usb:
+        _write(local, 'new.cfg', 'new')
+        _write(local, 'edited.cfg', 'v2', now)
+        _write(usb, 'edited.cfg', 'v1', now - 60)
+        _write(local, 'usb_newer.cfg', 'v1', now - 60)
+        _write(usb, 'usb_newer.cfg', 'v2!', now)
+        _write(local, 'same.cfg', 'same', now)
+        _write(usb, 'same.cfg', 'same', now - 1)  # arrondi FAT32 : identique
+        _write(usb, 'usb_only.cfg', 'créé sur la clé')
+        os.makedirs(os.path.join(local, 'fresh'))
+
+        plan = diff_manifests(Manifest.scan(local), Manifest.scan(usb))
+        assert plan['to_usb'] == ['edited.cfg', 'new.cfg']
+        assert plan['to_local'] == ['usb_newer.cfg', 'usb_only.cfg']
+        assert plan['delete_usb'] == plan['delete_local'] == plan['conflicts'] == []
+        assert plan['mkdir_usb'] == ['fresh']
+    print("✅ Première synchronisation sans suppression")
+
+
+def test_three_way_merge():
+    """Test du merge à trois voies : suppressions réelles, nouveaux fichiers, conflits"""
+    messages = []
+    log = lambda msg, level="INFO": messages.append((level, msg))
+
+    with tempfile.TemporaryDirectory() as local, tempfile.TemporaryDirectory() as usb, \
+            tempfile.TemporaryDirectory() as state_dir:
+        state = os.path.join(state_dir, 'state.db')
+        for rel in ('keep.cfg', 'del_local.cfg', 'del_usb.cfg', 'both.cfg', 'old/a.cfg'):
+            _write(local, rel, rel)
+        assert sync_trees(local, usb, log=log, state_path=state)['errors'] == 0
+        assert sorted(Manifest.scan(usb).files) == sorted(Manifest.scan(local).files)
+
+        later = time.time() + 60
+        os.remove(os.path.join(local, 'del_local.cfg'))
+        os.remove(os.path.join(usb, 'del_usb.cfg'))
+        _write(usb, 'usb_new.cfg', 'créé sur la clé')
+        _write(local, 'both.cfg', 'local edit', later)
+        _write(usb, 'both.cfg', 'usb edit', later - 30)
+        os.remove(os.path.join(usb, 'old', 'a.cfg'))
+        os.rmdir(os.path.join(usb, 'old'))
+
+        plan = sync_trees(local, usb, log=log, state_path=state)
+        assert plan['errors'] == 0
+        assert plan['delete_usb'] == ['del_local.cfg']
+        assert plan['delete_local'] == ['del_usb.cfg', 'old/a.cfg']
+        assert plan['rmdir_local'] == ['old']
+        assert [c['reason'] for c in plan['conflicts']] == ['modified_both']
+
+        # Le fichier créé sur la clé n'est plus effacé : il est rapatrié
+        assert _read(local, 'usb_new.cfg') == 'créé sur la clé'
+        assert not os.path.exists(os.path.join(local, 'old'))
+        assert _read(usb, 'both.cfg') == 'local edit'
+        copy = plan['conflicts'][0]['copy']
+        assert copy.startswith('both.conflict-usb-') and _read(usb, copy) == 'usb edit'
+        assert any(level == 'WARNING' for level, _ in messages)
+
+        # Troisième passage : la copie de conflit rejoint le laptop, puis plus rien
+        plan = sync_trees(local, usb, log=log, state_path=state)
+        assert plan['to_local'] == [copy]
+        plan = sync_trees(local, usb, log=log, state_path=state)
+        assert not any(plan[key] for key in sync_engine.OPERATIONS)
+        assert sorted(Manifest.scan(usb).files) == sorted(Manifest.scan(local).files)
+    print("✅ Merge à trois voies correct")
+
+
+def test_delta_copy():
+    """Test de la copie différentielle : seuls les morceaux modifiés sont réécrits"""
+    chunk, min_size = sync_engine.DELTA_CHUNK, sync_engine.DELTA_MIN_SIZE
+    sync_engine.DELTA_CHUNK, sync_engine.DELTA_MIN_SIZE = 1024, 4096
+    quiet = lambda msg, level="INFO": None
+    try:
+        with tempfile.TemporaryDirectory() as local, tempfile.TemporaryDirectory() as usb, \
+                tempfile.TemporaryDirectory() as state_dir:
+            state = os.path.join(state_dir, 'state.db')
+            image = os.path.join(local, 'Tools', 'image.iso')
+            os.makedirs(os.path.dirname(image))
+            data = bytearray(os.urandom(10 * 1024))
+            with open(image, 'wb') as f:
+                f.write(data)
+            sync_trees(local, usb, log=quiet, state_path=state)
+
+            # Un seul morceau modifié : 1 Ko réécrit sur la clé
+            data[5000:5010] = b'X' * 10
+            with open(image, 'wb') as f:
+                f.write(data)
+            os.utime(image, (time.time() + 60, time.time() + 60))
+            plan = sync_trees(local, usb, log=quiet, state_path=state)
+            copies = plan['copies']
+            assert (copies['full'], copies['delta'], copies['bytes_written']) == (0, 1, 1024)
+            with open(os.path.join(usb, 'Tools', 'image.iso'), 'rb') as f:
+                assert f.read() == data
+
+            # Date modifiée sans changement de contenu : aucune écriture
+            os.utime(image, (time.time() + 3600, time.time() + 3600))
+            plan = sync_trees(local, usb, log=quiet, state_path=state)
+            assert plan['copies']['identical'] == 1 and plan['copies']['bytes_written'] == 0
+            assert sync_trees(local, usb, log=quiet, state_path=state)['to_usb'] == []
+
+            # Destination partagée (sync_many) : delta dans un temporaire renommé,
+            # l'ancien fichier reste intact pour qui l'a ouvert
+            target = os.path.join(usb, 'Tools', 'image.iso')
+            data[100:110] = b'Y' * 10
+            with open(image, 'wb') as f:
+                f.write(data)
+            reader = open(target, 'rb')
+            sync_state = sync_engine.SyncState(state)
+            try:
+                mode, written = sync_engine.copy_file(local, usb, 'Tools/image.iso', sync_engine._entry(image),
+                                                      sync_engine.HashIndex(sync_state.db), in_place=False)
+            finally:
+                sync_state.close()
+            assert (mode, written) == ('delta', 1024)
+            with reader:
+                assert reader.read()[100:110] != b'Y' * 10
+            with open(target, 'rb') as f:
+                assert f.read() == data
+            assert not os.path.exists(sync_engine._sidecars(target)[0])
+    finally:
+        sync_engine.DELTA_CHUNK, sync_engine.DELTA_MIN_SIZE = chunk, min_size
+    print("✅ Copie différentielle correcte")
+
+
+def test_interrupted_copy():
+    """Test des copies interrompues : reprise à l'offset, fichier abîmé non propagé"""
+    saved = (sync_engine.RESUME_MIN_SIZE, sync_engine.JOURNAL_INTERVAL,
+             sync_engine.DELTA_CHUNK, sync_engine.DELTA_MIN_SIZE)
+    sync_engine.RESUME_MIN_SIZE, sync_engine.JOURNAL_INTERVAL = 4096, 2048
+    sync_engine.DELTA_CHUNK, sync_engine.DELTA_MIN_SIZE = 1024, 4096
+    quiet = lambda msg, level="INFO": None
+    try:
+        with tempfile.TemporaryDirectory() as local, tempfile.TemporaryDirectory() as usb, \
+                tempfile.TemporaryDirectory() as state_dir:
+            state = os.path.join(state_dir, 'state.db')
+            data = os.urandom(10 * 1024)
+            image = os.path.join(local, 'image.iso')
+            with open(image, 'wb') as f:
+                f.write(data)
+            entry = sync_engine._entry(image)
+
+            # Clé retirée après 6 Ko : temporaire et journal, destination absente
+            temp, journal = sync_engine._sidecars(os.path.join(usb, 'image.iso'))
+            with open(temp, 'wb') as f:
+                f.write(data[:6144])
+            sync_engine.write_journal(journal, {'mode': 'full', 'mtime': entry[0],
+                                                'size': entry[1], 'offset': 6144})
+            manifest = Manifest.scan(usb)
+            assert manifest.files == {} and manifest.partials == {'image.iso'}
+
+            plan = sync_trees(local, usb, log=quiet, state_path=state)
+            assert plan['copies']['resume'] == 1 and plan['copies']['bytes_written'] == 4096
+            assert not os.path.exists(temp) and not os.path.exists(journal)
+            with open(os.path.join(usb, 'image.iso'), 'rb') as f:
+                assert f.read() == data
+
+            # Réécriture différentielle interrompue : la clé a une date récente
+            # mais un contenu abîmé, c'est la version locale qui doit gagner
+            modified = bytearray(data)
+            modified[100:110] = b'L' * 10
+            with open(image, 'wb') as f:
+                f.write(modified)
+            os.utime(image, (time.time() + 60, time.time() + 60))
+            sync_engine.write_journal(journal, {'mode': 'delta', 'mtime': 0, 'size': len(data)})
+            with open(os.path.join(usb, 'image.iso'), 'r+b') as f:
+                f.seek(5000)
+                f.write(b'broken')
+            later = time.time() + 120
+            os.utime(os.path.join(usb, 'image.iso'), (later, later))
+
+            plan = sync_trees(local, usb, log=quiet, state_path=state)
+            assert plan['to_usb'] == ['image.iso'] and plan['to_local'] == []
+            assert plan['conflicts'] == []
+            with open(os.path.join(usb, 'image.iso'), 'rb') as f:
+                assert f.read() == modified
+            assert not os.path.exists(journal)
+
+            # Temporaire orphelin (source supprimée) : nettoyé à la synchro complète
+            _write(usb, '.gone.cfg' + sync_engine.TEMP_SUFFIX, 'partiel')
+            sync_trees(local, usb, log=quiet, state_path=state)
+            assert not os.path.exists(os.path.join(usb, '.gone.cfg' + sync_engine.TEMP_SUFFIX))
+
+            # Petit fichier : temporaire sur disque avant le renommage, dossier après
+            _write(local, 'small.cfg', 'hostname sw1')
+            events = []
+            fsync, replace = os.fsync, os.replace
+            os.fsync = lambda fd: events.append('dir' if os.path.isdir(f'/proc/self/fd/{fd}') else 'file') \
+                or fsync(fd)
+            os.replace = lambda a, b: events.append('replace') or replace(a, b)
+            try:
+                sync_engine.copy_atomic(os.path.join(local, 'small.cfg'), os.path.join(usb, 'small.cfg'),
+                                        sync_engine._entry(os.path.join(local, 'small.cfg')))
+            finally:
+                os.fsync, os.replace = fsync, replace
+            assert events.index('file') < events.index('replace')
+            if os.path.isdir('/proc/self/fd'):
+                assert events[-1] == 'dir'
+    finally:
+        (sync_engine.RESUME_MIN_SIZE, sync_engine.JOURNAL_INTERVAL,
+         sync_engine.DELTA_CHUNK, sync_engine.DELTA_MIN_SIZE) = saved
+    print("✅ Copies interrompues reprises sans propager de fichier abîmé")
+
+
+def test_parallel_copy():
+    """Test du pool de copie : petits fichiers d'abord, contenus et dates exacts"""
+    with tempfile.TemporaryDirectory() as local, tempfile.TemporaryDirectory() as usb:
+        sizes = {f'cfg/{n:03}.cfg': n * 100 for n in range(1, 40)}
+        sizes['Tools/big.bin'] = 2 * 1024 * 1024
+        for rel, size in sizes.items():
+            _write(local, rel, 'x' * size, time.time() - 600)
+
+        source = Manifest.scan(local)
+        done = [name for name, result in sync_engine.copy_files(
+            list(sizes), source, Manifest(usb), workers=1)]
+        assert done == sorted(sizes, key=sizes.get)
+
+        for name, result in sync_engine.copy_files(list(sizes), source, Manifest(usb), workers=4):
+            assert result == ('full', sizes[name]), result
+        copied = Manifest.scan(usb)
+        assert set(copied.files) == set(sizes)
+        assert all(copied.files[name] == source.files[name] for name in sizes)
+    print("✅ Copie parallèle correcte")
+
+
+def test_scoped_sync():
+    """Test d'une synchronisation limitée aux chemins signalés par le watcher"""
+    quiet = lambda msg, level="INFO": None
+    with tempfile.TemporaryDirectory() as local, tempfile.TemporaryDirectory() as usb, \
+            tempfile.TemporaryDirectory() as state_dir:
+        state = os.path.join(state_dir, 'state.db')
+        _write(local, 'a/one.cfg', '1')
+        _write(local, 'b/two.cfg', '2')
+        sync_trees(local, usb, log=quiet, state_path=state)
+
+        _write(local, 'a/new.cfg', 'new')
+        _write(local, 'b/unreported.cfg', 'hors périmètre')
+        os.remove(os.path.join(usb, 'b', 'two.cfg'))
+        plan = sync_trees(local, usb, log=quiet, state_path=state, paths=['a/new.cfg'])
+        assert plan['to_usb'] == ['a/new.cfg'] and not plan['delete_local']
+        assert not os.path.exists(os.path.join(usb, 'b', 'unreported.cfg'))
+
+        # La base des autres chemins est intacte : la suppression est bien vue ensuite
+        plan = sync_trees(local, usb, log=quiet, state_path=state, paths=['b'])
+        assert plan['delete_local'] == ['b/two.cfg'] and plan['to_usb'] == ['b/unreported.cfg']
+        plan = sync_trees(local, usb, log=quiet, state_path=state)
+        assert not any(plan[key] for key in sync_engine.OPERATIONS)
+    print("✅ Synchronisation limitée aux chemins touchés")
+
+
+def test_latest_mtime():
+    """Test de la date la plus récente : parcours exact, y compris après synchronisation"""
+    quiet = lambda msg, level="INFO": None
+    with tempfile.TemporaryDirectory() as local, tempfile.TemporaryDirectory() as usb, \
+            tempfile.TemporaryDirectory() as state_dir:
+        state = os.path.join(state_dir, 'state.db')
+        _write(local, 'a/old.cfg', 'old', 1000)
+        _write(local, 'b/c/newest.cfg', 'new', 5000)
+        assert sync_engine.latest_mtime(local) == 5000
+        assert sync_engine.latest_mtime(os.path.join(local, 'absent')) == 0
+
+        sync_trees(local, usb, log=quiet, state_path=state)
+        assert sync_engine.latest_mtime(local) == sync_engine.latest_mtime(usb) == 5000
+
+        # Suppression du plus récent puis ajout, par synchronisations limitées
+        os.remove(os.path.join(local, 'b', 'c', 'newest.cfg'))
+        sync_trees(local, usb, log=quiet, state_path=state, paths=['b/c/newest.cfg'])
+        assert sync_engine.latest_mtime(local) == sync_engine.latest_mtime(usb) == 1000
+        _write(local, 'a/edit.cfg', 'edit', 3000)
+        sync_trees(local, usb, log=quiet, state_path=state, paths=['a/edit.cfg'])
+        assert sync_engine.latest_mtime(usb) == 3000
+        assert max(sync_engine.iter_mtimes(usb)) == 3000
+
+        # Entre deux synchronisations : la valeur suit l'arborescence
+        _write(local, 'a/later.cfg', 'later', 4000)
+        assert sync_engine.latest_mtime(local) == 4000
+    print("✅ Date la plus récente")
+
+
+def test_plan_sync():
+    """Test de la simulation : plan JSON complet, estimation, aucune écriture"""
+    import json
+
+    quiet = lambda msg, level="INFO": None
+    with tempfile.TemporaryDirectory() as local, tempfile.TemporaryDirectory() as usb, \
+            tempfile.TemporaryDirectory() as out:
+        _write(local, 'Tools/image.iso', 'x' * (5 * 1024 * 1024))
+        _write(local, 'configs/sw1.cfg', 'hostname sw1')
+        _write(usb, 'usb_only.cfg', 'clé')
+
+        plan = sync_engine.plan_sync(local, usb)
+        assert plan['dry_run'] and plan['to_usb'] == ['Tools/image.iso', 'configs/sw1.cfg']
+        assert plan['to_local'] == ['usb_only.cfg'] and plan['mkdir_usb'] == ['Tools', 'configs']
+        estimate = plan['estimate']
+        assert estimate['to_usb']['bytes'] == 5 * 1024 * 1024 + 12
+        assert not estimate['to_usb']['measured'] and estimate['seconds'] > 0
+        assert set(plan['timing']) == {'scan', 'diff'}
+        assert os.listdir(usb) == ['usb_only.cfg']
+        assert not os.path.exists(os.path.join(local, sync_engine.STATE_FILE))
+
+        path = os.path.join(out, 'plan.json')
+        sync_engine.write_plan(plan, path)
+        with open(path, encoding='utf-8') as f:
+            assert json.load(f)['to_usb'] == plan['to_usb']
+
+        # Après une vraie synchronisation, le débit mesuré sert à l'estimation
+        sync_trees(local, usb, log=quiet)
+        _write(local, 'Tools/image2.iso', 'y' * (1024 * 1024))
+        plan = sync_engine.plan_sync(local, usb)
+        assert plan['to_usb'] == ['Tools/image2.iso'] and plan['to_local'] == []
+        assert plan['estimate']['to_usb']['measured']
+        assert not os.path.exists(os.path.join(usb, 'Tools', 'image2.iso'))
+    print("✅ Simulation et estimation correctes")
+
+
+def test_watchers():
+    """Test des watchers inotify/sondage et du regroupement des événements"""
+    import threading
+    import sync_watcher
+
+    with tempfile.TemporaryDirectory() as root:
+        os.makedirs(os.path.join(root, 'configs'))
+        seen = []
+        event = threading.Event()
+
+        def callback(name):
+            seen.append(name)
+            event.set()
+
+        watcher = sync_watcher.watch(root, callback)
+        watcher.start()
+        try:
+            if isinstance(watcher, sync_watcher.InotifyWatcher):
+                _write(root, 'configs/sw1.cfg', 'x')
+                os.makedirs(os.path.join(root, 'new', 'deep'))
+                time.sleep(0.2)
+                _write(root, 'new/deep/sw2.cfg', 'y')
+                _write(root, sync_engine.STATE_FILE, 'ignoré')
+                deadline = time.time() + 5
+                while 'new/deep/sw2.cfg' not in seen and time.time() < deadline:
+                    event.wait(0.1)
+                assert 'configs/sw1.cfg' in seen and 'new' in seen
+                assert 'new/deep/sw2.cfg' in seen
+                assert sync_engine.STATE_FILE not in seen
+        finally:
+            watcher.stop()
+
+        polling = sync_watcher.PollingWatcher(root, lambda name: None)
+        _write(root, 'configs/sw3.cfg', 'z')
+        assert polling.poll() == {'configs/sw3.cfg'}
+
+    # Regroupement : une seule synchronisation pour une rafale d'événements
+    calls = []
+    with tempfile.TemporaryDirectory() as local, tempfile.TemporaryDirectory() as usb:
+        watcher = sync_watcher.SyncWatcher(local, lambda: usb, lambda paths, root: calls.append(paths),
+                                           debounce=0.2, max_delay=1.0, usb_check_interval=60)
+        watcher.start()
+        try:
+            time.sleep(0.5)
+            assert calls == [None]  # clé détectée : synchronisation complète
+            for n in range(5):
+                _write(local, f'burst/{n}.cfg', str(n))
+                time.sleep(0.02)
+            deadline = time.time() + 5
+            while len(calls) < 2 and time.time() < deadline:
+                time.sleep(0.05)
+            assert len(calls) == 2 and 'burst/4.cfg' in calls[1]
+        finally:
+            watcher.stop()
+    print("✅ Watchers et regroupement des événements")
+
+
+def test_watcher_parallel_sticks():
+    """Test : deux synchronisations du watcher en parallèle n'écrivent jamais ensemble en local"""
+    import threading
+    import sync_watcher
+
+    quiet = lambda msg, level="INFO": None
+    active, overlaps, calls = {}, [], []    # clé -> écritures locales en cours
+    guard = threading.Lock()
+    copy_file = sync_engine.copy_file
+
+    def tracked(src, dst, name, src_entry, hashes=None, in_place=True):
+        if dst != local:
+            return copy_file(src, dst, name, src_entry, hashes, in_place)
+        calls.append(in_place)
+        with guard:
+            active[src] = active.get(src, 0) + 1
+            overlaps.append(sum(1 for count in active.values() if count))
+        try:
+            time.sleep(0.1)     # élargit la fenêtre de chevauchement
+            return copy_file(src, dst, name, src_entry, hashes, in_place)
+        finally:
+            with guard:
+                active[src] -= 1
+
+    with tempfile.TemporaryDirectory() as local, tempfile.TemporaryDirectory() as usb1, \
+            tempfile.TemporaryDirectory() as usb2, tempfile.TemporaryDirectory() as state_dir:
+        for n, usb in enumerate((usb1, usb2)):
+            for i in range(3):
+                _write(usb, f'stick{n}/{i}.cfg', f'{n}-{i}')
+        state = os.path.join(state_dir, 'state.db')
+
+        # Même appel que network.sync_changed
+        def on_change(paths, usb_root):
+            sync_trees(local, usb_root, log=quiet, state_path=state, paths=paths, shared_local=True)
+
+        watcher = sync_watcher.SyncWatcher(local, lambda: [usb1, usb2], on_change, log_func=quiet)
+        sync_engine.copy_file = tracked
+        try:
+            watcher._dispatch([(None, usb1), (None, usb2)])
+        finally:
+            sync_engine.copy_file = copy_file
+        assert len(calls) == 6 and not any(calls)  # jamais en place
+        assert max(overlaps) == 1                   # jamais deux clés écrivant en local à la fois
+        assert sorted(os.listdir(local)) == ['stick0', 'stick1']
+        assert _read(local, 'stick1/2.cfg') == '1-2'
+    print("✅ Synchronisations parallèles du watcher sérialisées en local")
+
+
+def test_state_file_not_synced():
+    """Test : la base d'état à la racine locale n'est jamais copiée"""
+    with tempfile.TemporaryDirectory() as local, tempfile.TemporaryDirectory() as usb:
+        _write(local, 'a.cfg', 'a')
+        sync_trees(local, usb, log=lambda msg, level="INFO": None)
+        assert os.path.exists(os.path.join(local, sync_engine.STATE_FILE))
+        assert sorted(os.listdir(usb)) == ['a.cfg']
+    print("✅ Base d'état exclue de la synchronisation")
+
+
+def test_sync_rules():
+    """Test des règles .gitignore, de l'élagage et des profils par taille"""
+    from sync_rules import RULES_FILE, SyncRules, load_rules
+    import sync_watcher
+
+    rules = SyncRules(['# commentaire', '*.iso', 'build/', '/Tools/', 'logs/**/*.log',
+                       '!keep.iso', ''])
+    assert rules.excluded('a/b/image.iso') and not rules.excluded('a/keep.iso')
+    assert rules.excluded('build', True) and not rules.excluded('build')
+    assert rules.excluded('Tools', True) and not rules.excluded('sub/Tools', True)
+    assert rules.excluded('logs/a/b/x.log') and rules.excluded('logs/x.log')
+    assert not rules.excluded('x.log') and not rules.excluded('notes.txt')
+    assert rules.excluded_path('Tools/putty.exe') and not rules.excluded_path('notes.txt')
+    assert not SyncRules().excluded('anything')
+
+    with tempfile.TemporaryDirectory() as local, tempfile.TemporaryDirectory() as usb:
+        _write(local, 'network_team.log', 'journal')
+        _write(local, 'configs/sw1.cfg', 'hostname sw1')
+        _write(local, 'Tools/putty.exe', 'x' * 2048)
+        _write(local, 'Tools/readme.txt', 'outils')
+        _write(local, 'Images/ios.bin', 'y' * (2 * 1024 * 1024))
+        _write(local, RULES_FILE, 'Tools/\n')
+
+        # Dossier exclu : ni parcouru, ni synchronisé
+        manifest = Manifest.scan(local, load_rules(local))
+        assert 'Tools' not in manifest.dirs and 'Tools/readme.txt' not in manifest.files
+        assert 'network_team.log' not in manifest.files
+
+        # Profil configs : fichiers texte seulement, taille limitée
+        plan = sync_trees(local, usb, log=lambda *a, **k: None, rules=load_rules(local, 'configs'))
+        assert plan['profile'] == 'configs'
+        assert sorted(plan['to_usb']) == [RULES_FILE, 'configs/sw1.cfg']
+        assert not os.path.exists(os.path.join(usb, 'network_team.log'))
+        assert not os.path.exists(os.path.join(usb, 'Tools'))
+
+        # Profil complet : un fichier trop gros d'un côté n'est jamais supprimé de l'autre
+        sync_trees(local, usb, log=lambda *a, **k: None)
+        assert _read(usb, 'Images/ios.bin')
+        _write(local, 'Images/ios.bin', 'z' * (3 * 1024 * 1024), time.time() + 10)
+        plan = sync_engine.plan_sync(local, usb, rules=SyncRules(max_size=1024 * 1024))
+        assert plan['skipped_large'] == ['Images/ios.bin']
+        assert plan['delete_usb'] == [] and plan['delete_local'] == []
+
+    # Watcher : les chemins exclus ne déclenchent rien
+    watcher = sync_watcher.SyncWatcher('.', lambda: None, lambda paths, root: None,
+                                       rules=load_rules('.'))
+    watcher.touch('network_team.log')
+    assert watcher.first_event is None
+    watcher.touch('configs/sw1.cfg')
+    assert watcher.pending == {'configs/sw1.cfg'}
+    print("✅ Règles d'inclusion/exclusion et profils")
+
+
+def test_usb_discovery():
+    """Test de la table des montages en cache et de la synchro de plusieurs clés"""
+    import usb_discovery
+
+    with tempfile.TemporaryDirectory() as tmp:
+        kits = [os.path.join(tmp, f'kit {n}') for n in range(3)]
+        for kit in kits[:2]:
+            os.makedirs(os.path.join(kit, 'Network Team'))
+        os.makedirs(kits[2])
+        lines = ['22 1 8:1 / / rw,relatime shared:1 - ext4 /dev/sda1 rw',
+                 '23 22 0:5 / /proc rw - proc proc rw']
+        for n, kit in enumerate(kits):
+            escaped = kit.replace(' ', '\\040')
+            lines.append(f'{40 + n} 22 8:{17 + n} / {escaped} rw,nosuid shared:{9 + n} - vfat /dev/sd{"bcd"[n]}1 rw')
+        mountinfo = os.path.join(tmp, 'mountinfo')
+        with open(mountinfo, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+
+        mounts = usb_discovery.parse_mountinfo('\n'.join(lines))
+        assert [m['mount_point'] for m in mounts] == ['/', '/proc'] + kits
+        assert [m['mount_point'] for m in mounts if usb_discovery.is_removable_mount(m)] == kits
+
+        # Table en cache : une seule lecture tant que rien ne change
+        table = usb_discovery.MountTable(mountinfo, ttl=60)
+        assert table.get() == mounts and table.get() == mounts and table.reads == 1
+        table.invalidate()
+        table.get()
+        assert table.reads == 2
+
+        saved = usb_discovery._mount_table
+        usb_discovery._mount_table = table
+        try:
+            found = usb_discovery.find_sync_folders('Network Team')
+            assert found == [os.path.join(kit, 'Network Team') for kit in kits[:2]]
+            assert usb_discovery.find_sync_folders('Network Team', exclude=[found[0]]) == found[1:]
+        finally:
+            usb_discovery._mount_table = saved
+
+        # Plusieurs clés synchronisées en parallèle, chacune avec sa base
+        local = os.path.join(tmp, 'local')
+        _write(local, 'configs/sw1.cfg', 'hostname sw1')
+        results = sync_engine.sync_many(local, found, log=lambda *a, **k: None)
+        assert sorted(results) == sorted(found)
+        for usb in found:
+            assert results[usb]['to_usb'] == ['configs/sw1.cfg']
+            assert _read(usb, 'configs/sw1.cfg') == 'hostname sw1'
+    print("✅ Détection des clés et synchronisation multi-clés")
+
+
+if __name__ == '__main__':
+    test_manifest_scan()
+    test_diff_first_sync()
+    test_three_way_merge()
+    test_delta_copy()
+    test_interrupted_copy()
+    test_parallel_copy()
+    test_scoped_sync()
+    test_latest_mtime()
+    test_plan_sync()
+    test_watchers()
+    test_watcher_parallel_sticks()
+    test_state_file_not_synced()
+    test_sync_rules()
+    test_usb_discovery()
@@ -7,7 +7,8 @@ import os
 import subprocess
 import time
 import threading
-from tftp_server import SimpleTFTPServer
+from tftp_server import SimpleTFTPServer, ReadTransfer, WriteTransfer, BlockCache, DirectoryIndex, _UMASK
+from tftp_bench import bench_transfers
 
 def test_tftp_server():
     """Test le serveur TFTP"""
@@ -110,5 +111,460 @@ expect eof
     
     print("🏁 Test terminé")
 
+def test_tftp_windowsize():
+    """Test d'un transfert avec fenêtre RFC 7440 négociée"""
+    import socket
+
+    print("🧪 Test fenêtre TFTP (RFC 7440)")
+    test_file = "test_tftp_window.bin"
+    payload = os.urandom(512 * 20 + 100)
+    with open(test_file, 'wb') as f:
+        f.write(payload)
+
+    server = SimpleTFTPServer('127.0.0.1', 6971, '.', max_windowsize=8, cache_size=0)
+    threading.Thread(target=server.start, daemon=True).start()
+    time.sleep(0.5)
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.settimeout(5.0)
+    try:
+        rrq = b'\x00\x01' + test_file.encode() + b'\x00octet\x00windowsize\x0016\x00'
+        sock.sendto(rrq, ('127.0.0.1', 6971))
+
+        data, addr = sock.recvfrom(1024)
+        assert data[:2] == b'\x00\x06', f"OACK attendu, reçu {data.hex()}"
+        assert b'windowsize\x008\x00' in data, "La fenêtre doit être bornée à 8"
+        sock.sendto(b'\x00\x04\x00\x00', addr)
+
+        # Recevoir les fenêtres et n'acquitter que le dernier bloc de chacune
+        received = b''
+        expected = 1
+        while True:
+            data, addr = sock.recvfrom(1024)
+            block = int.from_bytes(data[2:4], 'big')
+            assert data[:2] == b'\x00\x03' and block == expected
+            received += data[4:]
+            expected += 1
+            if len(data) - 4 < 512:
+                sock.sendto(b'\x00\x04' + data[2:4], addr)
+                break
+            if block % 8 == 0:
+                sock.sendto(b'\x00\x04' + data[2:4], addr)
+
+        assert received == payload
+        print(f"✅ {len(received)} octets reçus en fenêtres de 8 blocs")
+    finally:
+        sock.close()
+        server.stop()
+        os.remove(test_file)
+
+
+def test_tftp_options():
+    """Test de la négociation blksize / tsize / timeout (RFC 2347-2349)"""
+    import socket
+
+    print("🧪 Test options TFTP")
+    test_file = "test_tftp_options.bin"
+    payload = os.urandom(20000)
+    with open(test_file, 'wb') as f:
+        f.write(payload)
+
+    server = SimpleTFTPServer('127.0.0.1', 6972, '.')
+    threading.Thread(target=server.start, daemon=True).start()
+    time.sleep(0.5)
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.settimeout(5.0)
+    try:
+        rrq = (b'\x00\x01' + test_file.encode() + b'\x00octet\x00'
+               b'blksize\x0070000\x00tsize\x000\x00timeout\x003\x00bogus\x001\x00')
+        sock.sendto(rrq, ('127.0.0.1', 6972))
+
+        data, addr = sock.recvfrom(1024)
+        assert data[:2] == b'\x00\x06', f"OACK attendu, reçu {data.hex()}"
+        fields = data[2:].split(b'\x00')
+        options = dict(zip(fields[0::2], fields[1::2]))
+        assert options[b'blksize'] == b'65464', "blksize doit être borné à 65464"
+        assert options[b'tsize'] == str(len(payload)).encode()
+        assert options[b'timeout'] == b'3'
+        assert b'bogus' not in options
+        sock.sendto(b'\x00\x04\x00\x00', addr)
+
+        data, addr = sock.recvfrom(65536)
+        assert data[:4] == b'\x00\x03\x00\x01' and data[4:] == payload
+        sock.sendto(b'\x00\x04\x00\x01', addr)
+        print(f"✅ Fichier reçu en un seul bloc de {len(payload)} octets")
+    finally:
+        sock.close()
+        server.stop()
+        os.remove(test_file)
+
+
+def test_tftp_concurrent_sessions():
+    """Test des sessions concurrentes sur ports éphémères"""
+    import socket
+
+    print("🧪 Test sessions TFTP concurrentes")
+    test_file = "test_tftp_sessions.bin"
+    payload = os.urandom(3000)
+    with open(test_file, 'wb') as f:
+        f.write(payload)
+
+    server = SimpleTFTPServer('127.0.0.1', 6973, '.', max_sessions=2)
+    threading.Thread(target=server.start, daemon=True).start()
+    time.sleep(0.5)
+
+    rrq = b'\x00\x01' + test_file.encode() + b'\x00octet\x00'
+    clients = [socket.socket(socket.AF_INET, socket.SOCK_DGRAM) for _ in range(3)]
+    try:
+        for sock in clients:
+            sock.settimeout(5.0)
+
+        # Le premier client reçoit son premier bloc puis ne répond plus
+        clients[0].sendto(rrq, ('127.0.0.1', 6973))
+        data, stalled_addr = clients[0].recvfrom(1024)
+        assert data[:4] == b'\x00\x03\x00\x01'
+        assert stalled_addr[1] != 6973, "La session doit utiliser un port éphémère"
+
+        # Le second client est servi pendant ce temps, sur un autre port
+        clients[1].sendto(rrq, ('127.0.0.1', 6973))
+        received = b''
+        while True:
+            data, addr = clients[1].recvfrom(1024)
+            assert addr[1] not in (6973, stalled_addr[1])
+            received += data[4:]
+            clients[1].sendto(b'\x00\x04' + data[2:4], addr)
+            if len(data) - 4 < 512:
+                break
+        assert received == payload
+
+        # Un paquet venant d'un TID inconnu est rejeté par la session
+        clients[2].sendto(b'\x00\x04\x00\x01', stalled_addr)
+        data, _ = clients[2].recvfrom(1024)
+        assert data[:4] == b'\x00\x05\x00\x05'
+        print("✅ Deux transferts simultanés sur des ports distincts")
+    finally:
+        for sock in clients:
+            sock.close()
+        server.stop()
+        os.remove(test_file)
+
+
+def test_tftp_write_request():
+    """Test d'un envoi WRQ : écriture en flux puis renommage atomique"""
+    import socket
+    import tempfile
+
+    print("🧪 Test écriture TFTP (WRQ)")
+    upload_dir = tempfile.mkdtemp()
+    payload = os.urandom(512 * 6 + 42)
+
+    server = SimpleTFTPServer('127.0.0.1', 6975, upload_dir, max_upload_size=4096)
+    threading.Thread(target=server.start, daemon=True).start()
+    time.sleep(0.3)
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.settimeout(5.0)
+    try:
+        # Upload avec fenêtre de 4 blocs
+        sock.sendto(b'\x00\x02config.txt\x00octet\x00windowsize\x004\x00', ('127.0.0.1', 6975))
+        data, addr = sock.recvfrom(1024)
+        assert data[:2] == b'\x00\x06' and b'windowsize\x004' in data
+
+        blocks = [payload[i:i + 512] for i in range(0, len(payload), 512)]
+        for n, block in enumerate(blocks, start=1):
+            sock.sendto(b'\x00\x03' + n.to_bytes(2, 'big') + block, addr)
+            if n % 4 == 0 or n == len(blocks):
+                data, _ = sock.recvfrom(1024)
+                assert data == b'\x00\x04' + n.to_bytes(2, 'big')
+                if n < len(blocks):
+                    # Aucun fichier partiel ne doit être visible avant la fin
+                    assert not os.path.exists(os.path.join(upload_dir, 'config.txt'))
+
+        with open(os.path.join(upload_dir, 'config.txt'), 'rb') as f:
+            assert f.read() == payload
+        print(f"✅ {len(payload)} octets reçus et renommés atomiquement")
+
+        # Quota dépassé en cours de transfert : erreur 3 et pas de fichier
+        sock.sendto(b'\x00\x02big.bin\x00octet\x00', ('127.0.0.1', 6975))
+        data, addr = sock.recvfrom(1024)
+        assert data == b'\x00\x04\x00\x00'
+        for n in range(1, 10):
+            sock.sendto(b'\x00\x03' + n.to_bytes(2, 'big') + b'x' * 512, addr)
+            data, _ = sock.recvfrom(1024)
+            if data[:2] == b'\x00\x05':
+                break
+        assert data[:4] == b'\x00\x05\x00\x03'
+        time.sleep(0.1)
+        assert sorted(os.listdir(upload_dir)) == ['config.txt']
+        print("✅ Quota appliqué, fichier temporaire supprimé")
+    finally:
+        sock.close()
+        server.stop()
+        for name in os.listdir(upload_dir):
+            os.remove(os.path.join(upload_dir, name))
+        os.rmdir(upload_dir)
+
+
+def test_tftp_stop_is_immediate():
+    """Test de l'arrêt immédiat du moteur asyncio"""
+    server = SimpleTFTPServer('127.0.0.1', 6974, '.')
+    server_thread = threading.Thread(target=server.start, daemon=True)
+    server_thread.start()
+    time.sleep(0.3)
+    assert server.running
+
+    started = time.monotonic()
+    server.stop()
+    server_thread.join(timeout=2.0)
+    elapsed = time.monotonic() - started
+    assert not server_thread.is_alive()
+    assert elapsed < 0.2, f"Arrêt trop lent: {elapsed:.3f}s"
+    print(f"✅ Serveur arrêté en {elapsed * 1000:.1f} ms")
+
+
+def test_tftp_headless_api():
+    """Test de l'API sans interface : start_background, sessions, stats"""
+    import socket
+
+    print("🧪 Test API TFTP headless")
+    test_file = "test_tftp_api.bin"
+    with open(test_file, 'wb') as f:
+        f.write(os.urandom(2048))
+
+    messages = []
+    server = SimpleTFTPServer('127.0.0.1', 0, '.', log_func=messages.append)
+    assert server.start_background(), "Le serveur doit être à l'écoute au retour"
+    assert server.port != 0
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.settimeout(5.0)
+    try:
+        sock.sendto(b'\x00\x01' + test_file.encode() + b'\x00octet\x00', ('127.0.0.1', server.port))
+        data, addr = sock.recvfrom(1024)
+        sessions = server.sessions()
+        assert len(sessions) == 1 and sessions[0]['filename'] == test_file
+        assert sessions[0]['direction'] == 'read' and sessions[0]['port'] == addr[1]
+
+        while True:
+            sock.sendto(b'\x00\x04' + data[2:4], addr)
+            if len(data) - 4 < 512:
+                break
+            data, addr = sock.recvfrom(1024)
+        time.sleep(0.1)
+
+        stats = server.stats()
+        assert stats['completed'] == 1 and stats['bytes_sent'] == 2048
+        assert stats['active_sessions'] == 0 and stats['running']
+        assert any('✅' in message for message in messages)
+        print(f"✅ Statistiques: {stats['completed']} transfert, {stats['bytes_sent']} octets")
+    finally:
+        sock.close()
+        server.stop()
+        os.remove(test_file)
+
+
+def test_block_cache():
+    """Test du cache partagé : une seule lecture disque pour plusieurs sessions"""
+    import io
+
+    print("🧪 Test cache de lecture TFTP")
+    payload = os.urandom(10000)
+    cache = BlockCache(budget=8192, chunk_size=4096)
+    key = ('image.bin', 1, len(payload))
+
+    for _ in range(3):
+        sent = []
+        transfer = ReadTransfer(io.BytesIO(payload), lambda p: sent.append(bytes(p)), blksize=1428,
+                                windowsize=16, cache=cache, cache_key=key)
+        transfer.start()
+        assert b''.join(p[4:] for p in sent) == payload
+
+    stats = cache.stats()
+    assert stats['used'] <= 8192, "Le budget mémoire doit être respecté"
+    assert stats['hits'] > stats['misses']
+
+    # Une nouvelle mtime invalide les morceaux existants
+    cache.read(('image.bin', 2, len(payload)), io.BytesIO(payload), 0, 512)
+    assert cache.stats()['misses'] == stats['misses'] + 1
+    print(f"✅ Cache: {stats['hits']} hits, {stats['misses']} miss")
+
+
+def test_read_transfer_retransmit():
+    """Test de la machine à états : reprise après perte d'un bloc"""
+    import io
+
+    sent = []
+    # Le paquet émis est une vue sur un tampon réutilisé : on le copie
+    transfer = ReadTransfer(io.BytesIO(b'x' * (512 * 5)), lambda p: sent.append(bytes(p)), windowsize=4)
+    transfer.start()
+    assert [int.from_bytes(p[2:4], 'big') for p in sent] == [1, 2, 3, 4]
+
+    # Le bloc 3 est perdu : le client acquitte 2, la fenêtre repart de 3
+    sent.clear()
+    assert transfer.handle_packet(b'\x00\x04\x00\x02')
+    assert [int.from_bytes(p[2:4], 'big') for p in sent] == [3, 4, 5, 6]
+    assert len(sent[-1]) == 4  # bloc final vide (taille multiple de 512)
+
+    # Timeout : retransmission de la même fenêtre
+    sent.clear()
+    transfer.handle_timeout()
+    assert [int.from_bytes(p[2:4], 'big') for p in sent] == [3, 4, 5, 6]
+    assert transfer.retransmits == 1
+
+    assert transfer.handle_packet(b'\x00\x04\x00\x06')
+    assert transfer.finished and transfer.error is None
+    print("✅ Retransmission sur perte correcte")
+
+
+def test_write_transfer_window_after_gap():
+    """Test WRQ : après un trou, la fenêtre se compte depuis le réACK"""
+    import tempfile
+
+    sent = []
+    with tempfile.TemporaryDirectory() as directory:
+        transfer = WriteTransfer(os.path.join(directory, 'upload.bin'),
+                                 lambda p: sent.append(bytes(p)), windowsize=4)
+        block = lambda n: b'\x00\x03' + n.to_bytes(2, 'big') + b'y' * 512
+
+        for n in (1, 2, 4):  # le bloc 3 est perdu
+            transfer.handle_packet(block(n))
+        assert sent == [b'\x00\x04\x00\x02']
+
+        # L'émetteur repart de 3 : prochain ACK quatre blocs plus loin (6),
+        # et non au multiple absolu suivant (4)
+        sent.clear()
+        for n in (3, 4, 5, 6):
+            transfer.handle_packet(block(n))
+        assert sent == [b'\x00\x04\x00\x06']
+
+        transfer.handle_packet(b'\x00\x03\x00\x07')
+        assert transfer.finished and os.path.getsize(os.path.join(directory, 'upload.bin')) == 6 * 512
+        transfer.close()
+        assert os.listdir(directory) == ['upload.bin']
+    print("✅ Fenêtre WRQ relative au dernier ACK")
+
+
+def test_write_transfer_mode():
+    """Test WRQ : droits du fichier remplacé, ou ceux d'une création normale"""
+    import stat
+    import tempfile
+
+    if not hasattr(os, 'fchmod'):
+        return
+    with tempfile.TemporaryDirectory() as directory:
+        def upload(name):
+            transfer = WriteTransfer(os.path.join(directory, name), lambda p: None)
+            transfer.handle_packet(b'\x00\x03\x00\x01data')
+            assert transfer.finished
+            transfer.close()
+            return stat.S_IMODE(os.stat(os.path.join(directory, name)).st_mode)
+
+        assert upload('new.cfg') == 0o666 & ~_UMASK
+
+        existing = os.path.join(directory, 'shared.cfg')
+        with open(existing, 'w') as f:
+            f.write('old')
+        os.chmod(existing, 0o664)
+        assert upload('shared.cfg') == 0o664
+    print("✅ Droits conservés à la réception WRQ")
+
+
+def test_write_transfer_disk_error():
+    """Test WRQ : erreur disque (ENOSPC) -> ERROR au client, temporaire supprimé"""
+    import errno
+    import tempfile
+
+    class FullFile:
+        """Fichier dont l'écriture échoue comme sur un disque plein"""
+        def __init__(self, file):
+            self.file = file
+            self.closed = False
+
+        def write(self, data):
+            raise OSError(errno.ENOSPC, os.strerror(errno.ENOSPC))
+
+        def close(self):
+            self.closed = True
+            self.file.close()
+
+    sent = []
+    with tempfile.TemporaryDirectory() as directory:
+        transfer = WriteTransfer(os.path.join(directory, 'upload.bin'), lambda p: sent.append(bytes(p)))
+        index = DirectoryIndex(directory, interval=0)
+        index.refresh()
+        assert index.stats()['files'] == 0 and index.lookup(transfer.tmp_path.name) is None  # temporaire invisible
+        assert index.target(transfer.tmp_path.name) == (None, "Access violation")
+        transfer.file = FullFile(transfer.file)
+        assert transfer.handle_packet(b'\x00\x03\x00\x01' + b'z' * 100) is False
+        assert transfer.finished and transfer.error.startswith("Disk full")
+        assert sent[-1][:4] == b'\x00\x05\x00\x03'
+        assert os.listdir(directory) == []
+    print("✅ Erreur disque WRQ signalée au client")
+
+
+def test_directory_index():
+    """Test de l'index : confinement, casse, liens et fichiers déposés"""
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as base:
+        root = os.path.join(base, 'tftp')
+        os.makedirs(os.path.join(root, 'pxelinux.cfg'))
+        os.makedirs(os.path.join(base, 'tftp2'))
+        for path in ('tftp/pxelinux.cfg/default', 'tftp/Boot.img', 'tftp2/secret'):
+            with open(os.path.join(base, path), 'w') as f:
+                f.write(path)
+        os.symlink(os.path.join(base, 'tftp2', 'secret'), os.path.join(root, 'lien'))
+
+        index = DirectoryIndex(root, interval=0)
+        index.refresh()
+        assert index.stats()['files'] == 2  # le lien vers l'extérieur est exclu
+
+        # Répertoire voisin : refusé quel que soit le préfixe commun
+        assert index.normalize('../tftp2/secret') is None
+        assert index.normalize('..\\tftp2\\secret') is None
+        assert index.lookup(index.normalize('lien')) is None
+
+        assert index.lookup(index.normalize('/pxelinux.cfg/default')).endswith('default')
+        assert index.lookup('BOOT.IMG') == os.path.join(os.path.realpath(root), 'Boot.img')
+        assert DirectoryIndex(root, case_insensitive=False).lookup('BOOT.IMG') is None
+
+        # Fichier déposé après la construction : trouvé au sondage suivant
+        time.sleep(0.15)
+        with open(os.path.join(root, 'pxelinux.cfg', '01-aa-bb'), 'w') as f:
+            f.write('new')
+        assert index.lookup('pxelinux.cfg/01-aa-bb') is not None
+
+        assert index.target('absent/fichier') == (None, "Directory not found")
+        assert index.target('pxelinux.cfg') == (None, "Access violation")
+    print("✅ Index des fichiers correct")
+
+
+def test_tftp_bench_loopback():
+    """Test du banc de mesure : transferts vérifiés malgré les pertes"""
+    print("🧪 Test banc TFTP sur la boucle locale (5% de pertes)")
+    for mode in ('read', 'write'):
+        results = bench_transfers(mode, clients=2, transfers=2, size=64 * 1024,
+                                  blksize=1024, windowsize=4, loss=0.05,
+                                  server_timeout=0.2, seed=1)
+        assert results['failed'] == 0, results
+        assert results['transfers'] == 4 and results['p50'] <= results['p99']
+        assert results['proxy']['dropped'] > 0
+        print(f"✅ {mode}: {results['mb_per_s']} MB/s, p99 {results['p99']}s, "
+              f"{results['client_retransmits']} retransmissions client")
+
 if __name__ == '__main__':
-    test_tftp_server()
\ No newline at end of file
+    test_tftp_server()
+    test_tftp_windowsize()
+    test_tftp_options()
+    test_tftp_concurrent_sessions()
+    test_tftp_write_request()
+    test_tftp_stop_is_immediate()
+    test_tftp_headless_api()
+    test_block_cache()
+    test_read_transfer_retransmit()
+    test_write_transfer_window_after_gap()
+    test_write_transfer_mode()
+    test_write_transfer_disk_error()
+    test_directory_index()
+    test_tftp_bench_loopback()
\ No newline at end of file
@@ -0,0 +1,600 @@
+#!/usr/bin/env python3
+"""
+Bancs de mesure du serveur TFTP
+Résultats au format JSON pour comparer les versions avant un déploiement
+
+- send : coût d'émission des paquets DATA (chemins legacy/readinto/sendmsg) ;
+- transfer : serveur complet sur la boucle locale, N clients RRQ/WRQ en
+  parallèle, pertes et latence injectées par un relais UDP local.
+"""
+
+import heapq
+import itertools
+import json
+import os
+import random
+import selectors
+import socket
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from tftp_server import (DATA_BLOCK, OPCODE_ACK, OPCODE_DATA, OPCODE_ERROR,
+                         OPCODE_OACK, OPCODE_RRQ, OPCODE_WRQ, RECV_BUFSIZE,
+                         SimpleTFTPServer, build_ack, build_data, build_error,
+                         set_socket_buffers)
+
+SOURCE_SIZE = 4 * 1024 * 1024
+CLIENT_TIMEOUT = 0.2
+CLIENT_RETRIES = 10
+
+
+def _make_source(size=SOURCE_SIZE):
+    """Crée un fichier source temporaire de `size` octets"""
+    fd, path = tempfile.mkstemp(prefix='tftp_bench_', suffix='.bin')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(os.urandom(size))
+    return path
+
+
+def _rate(count, blksize, elapsed):
+    return {
+        'seconds': round(elapsed, 4),
+        'packets_per_s': round(count / elapsed),
+        'mb_per_s': round(count * blksize / elapsed / (1024 * 1024), 2),
+    }
+
+
+def bench_send_path(count=100000, blksize=1428):
+    """Compare l'assemblage historique des paquets DATA aux chemins sans copie
+
+    - legacy : read() + concaténation en-tête/données + sendto() ;
+    - readinto : lecture directe derrière un en-tête préalloué + sendto()
+      d'une vue sur le paquet (chemin des sessions sans cache) ;
+    - sendmsg : données déjà en mémoire envoyées en deux segments, en-tête
+      et vue sur les données (chemin des blocs servis par le cache).
+
+    Seul le coût côté émetteur est mesuré : le récepteur ne lit pas, les
+    paquets en excès sont jetés par le noyau.
+    """
+    path = _make_source()
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(('127.0.0.1', 0))
+    target = receiver.getsockname()
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    set_socket_buffers(sender)
+    results = {'count': count, 'blksize': blksize}
+
+    try:
+        with open(path, 'rb') as f:
+            started = time.perf_counter()
+            for n in range(1, count + 1):
+                data = f.read(blksize)
+                if len(data) < blksize:
+                    f.seek(0)
+                    data = f.read(blksize)
+                sender.sendto(build_data(n, data), target)
+            results['legacy'] = _rate(count, blksize, time.perf_counter() - started)
+
+        with open(path, 'rb') as f:
+            packet = bytearray(4 + blksize)
+            packet[:2] = b'\x00\x03'
+            view = memoryview(packet)
+            body = view[4:]
+            started = time.perf_counter()
+            for n in range(1, count + 1):
+                size = f.readinto(body)
+                if size < blksize:
+                    f.seek(0)
+                    size = f.readinto(body)
+                DATA_BLOCK.pack_into(packet, 2, n & 0xFFFF)
+                sender.sendto(view[:4 + size], target)
+            results['readinto'] = _rate(count, blksize, time.perf_counter() - started)
+
+        if hasattr(sender, 'sendmsg'):
+            with open(path, 'rb') as f:
+                data = memoryview(f.read())
+            header = bytearray(b'\x00\x03\x00\x00')
+            offset = 0
+            started = time.perf_counter()
+            for n in range(1, count + 1):
+                if offset + blksize > len(data):
+                    offset = 0
+                DATA_BLOCK.pack_into(header, 2, n & 0xFFFF)
+                sender.sendmsg((header, data[offset:offset + blksize]), (), 0, target)
+                offset += blksize
+            results['sendmsg'] = _rate(count, blksize, time.perf_counter() - started)
+
+        legacy = results['legacy']['seconds']
+        results['speedup'] = {
+            mode: round(legacy / results[mode]['seconds'], 2)
+            for mode in ('readinto', 'sendmsg') if mode in results
+        }
+    finally:
+        sender.close()
+        receiver.close()
+        os.remove(path)
+
+    return results
+
+
+class TFTPError(Exception):
+    """Erreur TFTP renvoyée par le serveur, ou transfert abandonné"""
+
+
+def _parse_oack(data):
+    """Options d'un paquet OACK, sous forme de dictionnaire"""
+    fields = bytes(data[2:]).split(b'\x00')
+    return {fields[i].decode().lower(): fields[i + 1].decode()
+            for i in range(0, len(fields) - 1, 2)}
+
+
+class TFTPClient:
+    """Client TFTP bloquant en Python pur (RRQ/WRQ, blksize, windowsize)
+
+    Chaque transfert ouvre son propre socket, donc son propre TID : une
+    instance peut servir à plusieurs threads à la fois. Les méthodes
+    retournent un dictionnaire (data/bytes, seconds, retransmits) et lèvent
+    TFTPError sur erreur serveur ou abandon.
+    """
+
+    def __init__(self, host='127.0.0.1', port=69, timeout=CLIENT_TIMEOUT,
+                 retries=CLIENT_RETRIES):
+        self.server = (host, port)
+        self.timeout = timeout
+        self.retries = retries
+
+    def _open(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        set_socket_buffers(sock)
+        sock.settimeout(self.timeout)
+        return sock
+
+    @staticmethod
+    def _request(opcode, filename, options):
+        packet = opcode.to_bytes(2, 'big') + filename.encode() + b'\x00octet\x00'
+        for name, value in options.items():
+            packet += f"{name}\x00{value}\x00".encode()
+        return packet
+
+    @staticmethod
+    def _options(blksize, windowsize, **extra):
+        options = dict(extra)
+        if blksize != 512:
+            options['blksize'] = blksize
+        if windowsize != 1:
+            options['windowsize'] = windowsize
+        return options
+
+    def _receive(self, sock, peer, state):
+        """Attend un paquet du serveur ; None sur timeout (déjà compté)"""
+        while True:
+            try:
+                data, addr = sock.recvfrom(RECV_BUFSIZE)
+            except socket.timeout:
+                state['retries'] += 1
+                if state['retries'] > self.retries:
+                    raise TFTPError("Timeout")
+                state['retransmits'] += 1
+                return None, peer
+            if peer is None:
+                peer = addr  # Premier paquet : TID de la session serveur
+            elif addr != peer:
+                sock.sendto(build_error(5, "Unknown transfer ID"), addr)
+                continue
+            if int.from_bytes(data[:2], 'big') == OPCODE_ERROR:
+                raise TFTPError(data[4:].split(b'\x00')[0].decode('utf-8', errors='replace'))
+            return data, peer
+
+    def download(self, filename, blksize=512, windowsize=1):
+        """Télécharge `filename` (RRQ) et retourne son contenu"""
+        request = self._request(OPCODE_RRQ, filename, self._options(blksize, windowsize))
+        state = {'retries': 0, 'retransmits': 0}
+        received = bytearray()
+        expected = 1          # prochain bloc attendu (absolu)
+        in_window = 0
+        gap_acked = False
+        peer = None
+        last = request
+        negotiated = False
+
+        sock = self._open()
+        started = time.perf_counter()
+        try:
+            sock.sendto(request, self.server)
+            while True:
+                data, peer = self._receive(sock, peer, state)
+                if data is None:
+                    sock.sendto(last, peer or self.server)
+                    continue
+
+                opcode = int.from_bytes(data[:2], 'big')
+                if opcode == OPCODE_OACK and expected == 1:
+                    if not negotiated:
+                        options = _parse_oack(data)
+                        blksize = int(options.get('blksize', 512))
+                        windowsize = int(options.get('windowsize', 1))
+                        negotiated = True
+                    last = build_ack(0)
+                    sock.sendto(last, peer)
+                    continue
+                if opcode != OPCODE_DATA:
+                    continue
+                if expected == 1 and not negotiated:
+                    # Pas d'OACK : le serveur a ignoré les options
+                    blksize, windowsize, negotiated = 512, 1, True
+
+                if int.from_bytes(data[2:4], 'big') != expected & 0xFFFF:
+                    # Bloc dupliqué ou perdu avant lui : un seul réACK par trou,
+                    # le serveur repart du bloc qui suit (RFC 7440)
+                    if not gap_acked:
+                        gap_acked = True
+                        in_window = 0
+                        last = build_ack(expected - 1)
+                        sock.sendto(last, peer)
+                    continue
+
+                payload = data[4:]
+                received += payload
+                expected += 1
+                in_window += 1
+                state['retries'] = 0
+                gap_acked = False
+                if len(payload) < blksize or in_window >= windowsize:
+                    last = build_ack(expected - 1)
+                    in_window = 0
+                    sock.sendto(last, peer)
+                    if len(payload) < blksize:
+                        break
+        finally:
+            sock.close()
+
+        return {
+            'data': bytes(received),
+            'bytes': len(received),
+            'seconds': time.perf_counter() - started,
+            'retransmits': state['retransmits'],
+        }
+
+    def upload(self, filename, data, blksize=512, windowsize=1):
+        """Envoie `data` sous le nom `filename` (WRQ)
+
+        `confirmed` est faux si l'ACK final n'est jamais arrivé alors que le
+        dernier bloc est parti : la session serveur a pu se fermer entre-temps
+        et seul le fichier reçu dit si le transfert a abouti (RFC 1350).
+        """
+        options = self._options(blksize, windowsize, tsize=len(data))
+        request = self._request(OPCODE_WRQ, filename, options)
+        state = {'retries': 0, 'retransmits': 0}
+        view = memoryview(data)
+        peer = None
+        acked = 0             # dernier bloc acquitté (absolu)
+        sent = 0              # dernier bloc émis (absolu)
+        blocks = None
+
+        sock = self._open()
+        started = time.perf_counter()
+
+        def send_blocks(first, end):
+            for n in range(first, end + 1):
+                offset = (n - 1) * blksize
+                sock.sendto(build_data(n & 0xFFFF, view[offset:offset + blksize]), peer)
+
+        try:
+            sock.sendto(request, self.server)
+            confirmed = True
+            while blocks is None or acked < blocks:
+                try:
+                    packet, peer = self._receive(sock, peer, state)
+                except TFTPError:
+                    if blocks is not None and sent == blocks:
+                        confirmed = False
+                        break
+                    raise
+                if packet is None:
+                    if blocks is None:
+                        sock.sendto(request, self.server)
+                    else:
+                        send_blocks(acked + 1, sent)
+                    continue
+
+                opcode = int.from_bytes(packet[:2], 'big')
+                if blocks is None:
+                    if opcode == OPCODE_OACK:
+                        accepted = _parse_oack(packet)
+                        blksize = int(accepted.get('blksize', 512))
+                        windowsize = int(accepted.get('windowsize', 1))
+                    elif opcode == OPCODE_ACK and packet[2:4] == b'\x00\x00':
+                        blksize, windowsize = 512, 1
+                    else:
+                        continue
+                    blocks = len(data) // blksize + 1
+                elif opcode == OPCODE_ACK:
+                    delta = (int.from_bytes(packet[2:4], 'big') - acked) & 0xFFFF
+                    if delta == 0 or delta > sent - acked:
+                        continue
+                    acked += delta
+                else:
+                    continue
+
+                # Chaque ACK ouvre une nouvelle fenêtre à partir du bloc qui le
+                # suit : les blocs perdus après un trou sont réémis
+                state['retries'] = 0
+                sent = min(acked + windowsize, blocks)
+                send_blocks(acked + 1, sent)
+        finally:
+            sock.close()
+
+        return {
+            'bytes': len(data),
+            'seconds': time.perf_counter() - started,
+            'retransmits': state['retransmits'],
+            'confirmed': confirmed,
+        }
+
+
+class LossyProxy:
+    """Relais UDP local qui perd et retarde des paquets dans les deux sens
+
+    Chaque client reçoit son propre socket amont : le serveur voit un TID
+    distinct par client, et le relais suit le port éphémère de la session
+    dès sa première réponse. La perte et la latence (avec gigue, donc
+    réordonnancement possible) sont tirées d'un générateur initialisé par
+    `seed` pour des mesures reproductibles.
+    """
+
+    def __init__(self, target, loss=0.0, delay=0.0, jitter=0.0, seed=None):
+        self.target = target
+        self.loss = loss
+        self.delay = delay
+        self.jitter = jitter
+        self.random = random.Random(seed)
+        self.selector = selectors.DefaultSelector()
+        self.listen = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        set_socket_buffers(self.listen)
+        self.listen.bind(('127.0.0.1', 0))
+        self.address = self.listen.getsockname()
+        self.selector.register(self.listen, selectors.EVENT_READ)
+        self.upstreams = {}   # adresse client -> socket amont
+        self.peers = {}       # socket amont -> [adresse client, adresse serveur]
+        self.pending = []     # tas (échéance, n°, socket, données, adresse)
+        self.counter = itertools.count()
+        self.forwarded = 0
+        self.dropped = 0
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self.address
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+        for sock in [self.listen, *self.peers]:
+            sock.close()
+        self.selector.close()
+
+    def _upstream(self, client_addr):
+        sock = self.upstreams.get(client_addr)
+        if sock is None:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            set_socket_buffers(sock)
+            sock.bind(('127.0.0.1', 0))
+            self.upstreams[client_addr] = sock
+            self.peers[sock] = [client_addr, self.target]
+            self.selector.register(sock, selectors.EVENT_READ)
+        return sock
+
+    def _forward(self, sock, data, addr):
+        if self.loss and self.random.random() < self.loss:
+            self.dropped += 1
+            return
+        self.forwarded += 1
+        wait = self.delay + (self.random.uniform(0, self.jitter) if self.jitter else 0)
+        if wait <= 0:
+            self._send(sock, data, addr)
+        else:
+            heapq.heappush(self.pending, (time.monotonic() + wait, next(self.counter), sock, data, addr))
+
+    @staticmethod
+    def _send(sock, data, addr):
+        try:
+            sock.sendto(data, addr)
+        except OSError:
+            pass  # Session déjà fermée : équivalent à une perte
+
+    def _run(self):
+        while self.running:
+            timeout = 0.05
+            if self.pending:
+                timeout = max(0, min(timeout, self.pending[0][0] - time.monotonic()))
+            for key, _ in self.selector.select(timeout):
+                sock = key.fileobj
+                try:
+                    data, addr = sock.recvfrom(RECV_BUFSIZE)
+                except OSError:
+                    continue
+                if sock is self.listen:
+                    upstream = self._upstream(addr)
+                    self._forward(upstream, data, self.peers[upstream][1])
+                else:
+                    peer = self.peers[sock]
+                    peer[1] = addr  # Suivre le TID de la session serveur
+                    self._forward(self.listen, data, peer[0])
+
+            now = time.monotonic()
+            while self.pending and self.pending[0][0] <= now:
+                _, _, sock, data, addr = heapq.heappop(self.pending)
+                self._send(sock, data, addr)
+
+
+def _percentile(values, pct):
+    """Percentile au rang le plus proche (valeurs non triées)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def bench_transfers(mode='read', clients=4, transfers=1, size=1024 * 1024,
+                    blksize=1428, windowsize=8, loss=0.0, delay=0.0, jitter=0.0,
+                    server_timeout=0.5, seed=0):
+    """Transferts complets contre un serveur lancé sur la boucle locale
+
+    `clients` threads enchaînent chacun `transfers` transferts (RRQ pour
+    `read`, WRQ pour `write`) de `size` octets. Le contenu est vérifié :
+    un transfert corrompu compte comme un échec. Le débit agrégé est
+    calculé sur la durée totale ; p50/p99 portent sur chaque transfert.
+    """
+    directory = tempfile.mkdtemp(prefix='tftp_bench_')
+    payload = os.urandom(size)
+    source = 'source.bin'
+    with open(os.path.join(directory, source), 'wb') as f:
+        f.write(payload)
+
+    server = SimpleTFTPServer('127.0.0.1', 0, directory, timeout=server_timeout,
+                              max_sessions=max(clients, 1) * 2,
+                              max_upload_size=size + 1, log_func=lambda message: None)
+    if not server.start_background():
+        raise RuntimeError("Le serveur TFTP n'a pas démarré")
+
+    proxy = None
+    address = ('127.0.0.1', server.port)
+    if loss or delay or jitter:
+        proxy = LossyProxy(address, loss, delay, jitter, seed)
+        address = proxy.start()
+    client = TFTPClient(*address)
+
+    def worker(index):
+        outcomes = []
+        for n in range(transfers):
+            try:
+                if mode == 'read':
+                    result = client.download(source, blksize, windowsize)
+                    ok = result.pop('data') == payload
+                else:
+                    name = f"upload_{index}_{n}.bin"
+                    result = client.upload(name, payload, blksize, windowsize)
+                    path = os.path.join(directory, name)
+                    ok = os.path.exists(path) and os.path.getsize(path) == size
+                    if ok:
+                        os.remove(path)
+                result['ok'] = ok
+            except (TFTPError, OSError) as e:
+                result = {'ok': False, 'error': str(e), 'retransmits': 0}
+            outcomes.append(result)
+        return outcomes
+
+    try:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as pool:
+            outcomes = [r for rs in pool.map(worker, range(clients)) for r in rs]
+        elapsed = time.perf_counter() - started
+        time.sleep(0.05)  # Laisser le serveur clore les dernières sessions
+        stats = server.stats()
+    finally:
+        server.stop()
+        if proxy is not None:
+            proxy.stop()
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+        os.rmdir(directory)
+
+    done = [r for r in outcomes if r['ok']]
+    durations = [r['seconds'] for r in done]
+    total = len(done) * size
+    results = {
+        'mode': mode,
+        'clients': clients,
+        'transfers': len(outcomes),
+        'failed': len(outcomes) - len(done),
+        'size': size,
+        'blksize': blksize,
+        'windowsize': windowsize,
+        'loss': loss,
+        'delay': delay,
+        'jitter': jitter,
+        'seconds': round(elapsed, 4),
+        'mb_per_s': round(total / elapsed / (1024 * 1024), 2),
+        'p50': round(_percentile(durations, 50), 4) if durations else None,
+        'p99': round(_percentile(durations, 99), 4) if durations else None,
+        'client_retransmits': sum(r['retransmits'] for r in outcomes),
+        'server_retransmits': stats['retransmits'],
+        'server_failed': stats['failed'],
+    }
+    errors = sorted({r['error'] for r in outcomes if 'error' in r})
+    if errors:
+        results['errors'] = errors
+    if mode == 'write':
+        results['unconfirmed'] = sum(1 for r in done if not r.get('confirmed', True))
+    if proxy is not None:
+        results['proxy'] = {'forwarded': proxy.forwarded, 'dropped': proxy.dropped}
+    return results
+
+
+def _size(text):
+    """Taille avec suffixe optionnel K/M/G (puissances de 1024)"""
+    units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+    text = text.strip().upper().rstrip('B')
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def main():
+    """Lance un banc de mesure et affiche le résultat JSON"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Bancs de mesure du serveur TFTP')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    send_parser = commands.add_parser('send', help="Coût d'émission des paquets DATA")
+    send_parser.add_argument('--count', type=int, default=100000, help='Nombre de blocs (défaut: 100000)')
+    send_parser.add_argument('--blksize', type=int, default=1428, help='Taille de bloc (défaut: 1428)')
+
+    transfer_parser = commands.add_parser(
+        'transfer', help="Transferts complets sur la boucle locale (toutes les combinaisons)")
+    transfer_parser.add_argument('--mode', nargs='+', choices=('read', 'write'), default=['read'],
+                                 help='Sens des transferts (défaut: read)')
+    transfer_parser.add_argument('--clients', type=int, default=4, help='Clients simultanés (défaut: 4)')
+    transfer_parser.add_argument('--transfers', type=int, default=1,
+                                 help='Transferts par client (défaut: 1)')
+    transfer_parser.add_argument('--size', nargs='+', type=_size, default=[1024 * 1024],
+                                 help='Tailles de fichier, ex. 64K 4M (défaut: 1M)')
+    transfer_parser.add_argument('--blksize', nargs='+', type=int, default=[1428],
+                                 help='Tailles de bloc (défaut: 1428)')
+    transfer_parser.add_argument('--window', nargs='+', type=int, default=[8],
+                                 help='Fenêtres RFC 7440 (défaut: 8)')
+    transfer_parser.add_argument('--loss', type=float, default=0.0,
+                                 help='Probabilité de perte par paquet, ex. 0.01 (défaut: 0)')
+    transfer_parser.add_argument('--delay', type=float, default=0.0,
+                                 help='Latence ajoutée par paquet en secondes (défaut: 0)')
+    transfer_parser.add_argument('--jitter', type=float, default=0.0,
+                                 help='Gigue maximale en secondes (défaut: 0)')
+    transfer_parser.add_argument('--server-timeout', type=float, default=0.5,
+                                 help='Timeout de retransmission du serveur (défaut: 0.5)')
+    transfer_parser.add_argument('--seed', type=int, default=0, help='Graine du relais (défaut: 0)')
+
+    args = parser.parse_args()
+
+    if args.command == 'send':
+        results = bench_send_path(args.count, args.blksize)
+    elif args.command == 'transfer':
+        results = [
+            bench_transfers(mode, args.clients, args.transfers, size, blksize, window,
+                            args.loss, args.delay, args.jitter, args.server_timeout, args.seed)
+            for mode, size, blksize, window
+            in itertools.product(args.mode, args.size, args.blksize, args.window)
+        ]
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
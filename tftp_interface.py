@@ -8,7 +8,8 @@ from tkinter import filedialog
 import os
 import threading
 import socket
-import time
+
+from tftp_server import SimpleTFTPServer
 
 def create_tftp_interface(parent, colors, log_func):
     """Crée l'interface TFTP complète"""
@@ -18,9 +19,8 @@ def create_tftp_interface(parent, colors, log_func):
     tftp_win.geometry("700x600")
     tftp_win.configure(bg=colors['light'])
     
-    # Variables globales pour le serveur
+    # Instance du moteur TFTP commun
     tftp_server_instance = None
-    server_thread = None
     
     # En-tête
     header = tk.Frame(tftp_win, bg=colors['primary'], height=60)
@@ -83,130 +83,49 @@ def create_tftp_interface(parent, colors, log_func):
     files_label = tk.Label(stats_frame, text="📄 Fichiers: 0", bg=colors['light'])
     files_label.pack(side=tk.LEFT, padx=10)
     
-    # Contrôles
-    controls_frame = tk.Frame(tftp_win, bg=colors['light'])
-    controls_frame.pack(fill=tk.X, padx=15, pady=10)
-    
-    class IntegratedTFTPServer:
-        def __init__(self, host, port, directory):
-            self.host = host
-            self.port = port
-            self.directory = directory
-            self.socket = None
-            self.running = False
-            self.request_count = 0
-            self.file_count = 0
-            
-        def start(self):
-            try:
-                self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-                self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-                self.socket.bind((self.host, self.port))
-                self.socket.settimeout(1.0)
-                
-                self.running = True
-                log_func(f"🚀 Serveur TFTP démarré sur {self.host}:{self.port}")
-                log_func(f"📁 Dossier partagé: {self.directory}")
-                
-                status_label.config(text=f"🟢 Actif sur {self.host}:{self.port}", fg=colors['success'])
-                start_btn.config(state='disabled')
-                stop_btn.config(state='normal')
-                
-                while self.running:
-                    try:
-                        data, client_addr = self.socket.recvfrom(1024)
-                        self.request_count += 1
-                        requests_label.config(text=f"📥 Requêtes: {self.request_count}")
-                        self.handle_request(data, client_addr)
-                    except socket.timeout:
-                        continue
-                    except Exception as e:
-                        if self.running:
-                            log_func(f"❌ Erreur: {e}")
-                            
-            except Exception as e:
-                log_func(f"❌ Erreur démarrage serveur: {e}")
-                status_label.config(text="🔴 Erreur", fg=colors['danger'])
-            finally:
-                self.stop()
-        
-        def handle_request(self, data, client_addr):
-            try:
-                if len(data) < 4:
-                    return
-                    
-                opcode = int.from_bytes(data[:2], 'big')
-                
-                if opcode == 1:  # Read Request (RRQ)
-                    self.handle_read_request(data[2:], client_addr)
-                elif opcode == 2:  # Write Request (WRQ)
-                    self.send_error(0, "Write not supported", client_addr)
-                else:
-                    self.send_error(5, "Unknown opcode", client_addr)
-                    
-            except Exception as e:
-                log_func(f"❌ Erreur traitement requête: {e}")
-                self.send_error(0, str(e), client_addr)
-        
-        def handle_read_request(self, data, client_addr):
-            try:
-                parts = data.split(b'\x00')
-                if len(parts) < 2:
-                    self.send_error(4, "Invalid filename", client_addr)
-                    return
-                    
-                filename = parts[0].decode('utf-8')
-                filepath = os.path.join(self.directory, filename)
-                
-                log_func(f"📄 Demande de lecture: {filename} de {client_addr[0]}")
-                
-                if not os.path.exists(filepath):
-                    self.send_error(1, "File not found", client_addr)
-                    return
-                    
-                if not os.path.commonpath([self.directory, filepath]) == self.directory:
-                    self.send_error(2, "Access violation", client_addr)
-                    return
-                    
-                # Lire et envoyer le fichier
-                with open(filepath, 'rb') as f:
-                    block_num = 1
-                    while True:
-                        chunk = f.read(512)
-                        self.send_data(block_num, chunk, client_addr)
-                        
-                        if len(chunk) < 512:
-                            break
-                        block_num += 1
-                        
-                self.file_count += 1
-                files_label.config(text=f"📄 Fichiers: {self.file_count}")
-                log_func(f"✅ Fichier {filename} envoyé à {client_addr[0]}")
-                
-            except Exception as e:
-                log_func(f"❌ Erreur lecture fichier: {e}")
-                self.send_error(0, str(e), client_addr)
-        
-        def send_data(self, block_num, data, client_addr):
-            packet = b'\x00\x03' + block_num.to_bytes(2, 'big') + data
-            self.socket.sendto(packet, client_addr)
-        
-        def send_error(self, error_code, message, client_addr):
-            packet = b'\x00\x05' + error_code.to_bytes(2, 'big') + message.encode('utf-8') + b'\x00'
-            self.socket.sendto(packet, client_addr)
-            log_func(f"❌ Erreur envoyée à {client_addr[0]}: {message}")
-        
-        def stop(self):
-            self.running = False
-            if self.socket:
-                self.socket.close()
-            log_func("🛑 Serveur TFTP arrêté")
+    sessions_label = tk.Label(stats_frame, text="🔄 Sessions: 0", bg=colors['light'])
+    sessions_label.pack(side=tk.LEFT, padx=10)
+    
+    cache_label = tk.Label(stats_frame, text="💾 Cache: -", bg=colors['light'])
+    cache_label.pack(side=tk.LEFT, padx=10)
+    
+    def refresh_stats():
+        """Met à jour le statut et les compteurs depuis server.stats()"""
+        if not tftp_win.winfo_exists():
+            return
+        if tftp_server_instance:
+            stats = tftp_server_instance.stats()
+            requests_label.config(text=f"📥 Requêtes: {stats['requests']}")
+            files_label.config(text=f"📄 Fichiers: {stats['completed']}")
+            sessions_label.config(text=f"🔄 Sessions: {stats['active_sessions']}")
+            cache = stats['cache']
+            if cache:
+                total = cache['hits'] + cache['misses']
+                ratio = 100 * cache['hits'] / total if total else 0
+                cache_label.config(text=f"💾 Cache: {cache['hits']} hits / {cache['misses']} miss "
+                                        f"({ratio:.0f}%, {cache['used'] / (1024 * 1024):.0f} Mo)")
+            if not stats['running'] and stop_btn['state'] == 'normal':
+                # Arrêt côté moteur (erreur réseau, etc.)
+                update_status(False)
+        tftp_win.after(1000, refresh_stats)
+    
+    def update_status(running):
+        if running:
+            status_label.config(text=f"🟢 Actif sur {tftp_server_instance.host}:{tftp_server_instance.port}",
+                                fg=colors['success'])
+            start_btn.config(state='disabled')
+            stop_btn.config(state='normal')
+        else:
             status_label.config(text="🔴 Arrêté", fg=colors['danger'])
             start_btn.config(state='normal')
             stop_btn.config(state='disabled')
     
+    # Contrôles
+    controls_frame = tk.Frame(tftp_win, bg=colors['light'])
+    controls_frame.pack(fill=tk.X, padx=15, pady=10)
+    
     def start_server():
-        nonlocal tftp_server_instance, server_thread
+        nonlocal tftp_server_instance
         try:
             port = int(port_var.get())
             host = host_var.get()
@@ -216,10 +135,23 @@ def create_tftp_interface(parent, colors, log_func):
                 log_func("❌ Le dossier spécifié n'existe pas", level="ERROR")
                 return
             
-            # Créer et démarrer le serveur
-            tftp_server_instance = IntegratedTFTPServer(host, port, folder)
-            server_thread = threading.Thread(target=tftp_server_instance.start, daemon=True)
-            server_thread.start()
+            # Pour les ports < 1024, on utilise un port alternatif si pas administrateur
+            if port < 1024:
+                try:
+                    test_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                    test_socket.bind((host, port))
+                    test_socket.close()
+                except OSError:
+                    port = 6969
+                    port_var.set(str(port))
+                    log_func(f"⚠️ Utilisation du port alternatif {port} (permissions requises pour le port TFTP standard)")
+            
+            # Créer et démarrer le serveur (moteur commun tftp_server)
+            tftp_server_instance = SimpleTFTPServer(host, port, folder, log_func=log_func)
+            if tftp_server_instance.start_background():
+                update_status(True)
+            else:
+                status_label.config(text="🔴 Erreur", fg=colors['danger'])
             
         except ValueError:
             log_func("❌ Port invalide", level="ERROR")
@@ -228,10 +160,10 @@ def create_tftp_interface(parent, colors, log_func):
             status_label.config(text="🔴 Erreur", fg=colors['danger'])
     
     def stop_server():
-        nonlocal tftp_server_instance
         try:
             if tftp_server_instance:
                 tftp_server_instance.stop()
+            update_status(False)
         except Exception as e:
             log_func(f"❌ Erreur arrêt serveur: {e}", level="ERROR")
     
@@ -268,6 +200,7 @@ def create_tftp_interface(parent, colors, log_func):
 💡 Commandes de test:
 • curl -o fichier_local.txt tftp://IP:PORT/fichier_distant.txt
 • tftp IP PORT -c get fichier_distant.txt fichier_local.txt
+• tftp IP PORT -c put running-config.txt
 
 🔧 Test avec Python:
 import socket
@@ -277,8 +210,12 @@ sock.sendto(request, ('127.0.0.1', 6969))
 data, addr = sock.recvfrom(1024)
 print(f"Réponse: {data}")
 
-⚠️ Note: Ce serveur TFTP implémente le protocole TFTP basique (RFC 1350).
-Il supporte uniquement les requêtes de lecture (RRQ).
+⚠️ Note: Ce serveur TFTP implémente le protocole TFTP (RFC 1350) avec les
+options blksize, tsize, timeout (RFC 2347/2348/2349) et windowsize (RFC 7440).
+Il supporte les lectures (RRQ) et les écritures (WRQ) : les fichiers reçus
+sont écrits dans un fichier temporaire puis renommés une fois complets.
+
+💡 Gros fichiers (firmware): curl --tftp-blksize 65464 tftp://IP:PORT/image.bin
     """
     
     info_text.insert(tk.END, info_content)
@@ -365,12 +302,12 @@ Il supporte uniquement les requêtes de lecture (RRQ).
     
     # Fermeture propre de la fenêtre
     def on_closing():
-        nonlocal tftp_server_instance
         if tftp_server_instance and tftp_server_instance.running:
             stop_server()
-            time.sleep(0.5)  # Attendre l'arrêt
         tftp_win.destroy()
     
     tftp_win.protocol("WM_DELETE_WINDOW", on_closing)
     
+    refresh_stats()
+    
     return tftp_win
\ No newline at end of file
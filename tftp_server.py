@@ -1,137 +1,1151 @@
 #!/usr/bin/env python3
 """
 Serveur TFTP simple et robuste
-Peut être utilisé indépendamment ou intégré
+Moteur commun à l'interface graphique (tftp_interface), à network.py et à
+la ligne de commande : start()/start_background(), stop(), sessions(), stats()
 """
 
+import asyncio
 import socket
 import os
+import posixpath
+import struct
+import tempfile
 import threading
 import time
+from collections import OrderedDict
 from pathlib import Path
 
+# Opcodes TFTP (RFC 1350 / RFC 2347)
+OPCODE_RRQ = 1
+OPCODE_WRQ = 2
+OPCODE_DATA = 3
+OPCODE_ACK = 4
+OPCODE_ERROR = 5
+OPCODE_OACK = 6
+
+DEFAULT_BLKSIZE = 512
+DEFAULT_TIMEOUT = 1.0
+DEFAULT_RETRIES = 5
+MIN_BLKSIZE = 8        # RFC 2348
+MAX_BLKSIZE = 65464    # RFC 2348
+MIN_TIMEOUT = 1        # RFC 2349
+MAX_TIMEOUT = 255      # RFC 2349
+MAX_WINDOWSIZE = 64    # RFC 7440 autorise jusqu'à 65535, on borne côté serveur
+DEFAULT_MAX_SESSIONS = 64
+DEFAULT_MAX_UPLOAD = 100 * 1024 * 1024  # Quota par fichier reçu (WRQ)
+WRITE_BUFFER = 256 * 1024
+UPLOAD_SUFFIX = '.tftp-part'  # Temporaires des WRQ en cours (.nom.XXXX.tftp-part), jamais servis
+# umask lu une seule fois : os.umask() le modifie le temps de la lecture, pour tout le processus
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+DEFAULT_CACHE_BUDGET = 256 * 1024 * 1024  # Mémoire max du cache de lecture partagé
+CACHE_CHUNK_SIZE = 256 * 1024
+RECV_BUFSIZE = MAX_BLKSIZE + 4
+SOCKET_BUFFER = 4 * 1024 * 1024  # Tampons noyau pour les fenêtres de gros blocs
+DATA_BLOCK = struct.Struct('>H')
+SENDMSG_MIN_PAYLOAD = 8192  # En deçà, le coût de sendmsg dépasse celui d'une copie
+INDEX_POLL_INTERVAL = 1.0   # Sondage des mtime de répertoires de l'index
+INDEX_MISS_RECHECK = 0.1    # Sur fichier inconnu, sondage anticipé au plus tous les...
+
+
+def parse_request(data):
+    """Découpe une requête RRQ/WRQ (sans opcode) en (fichier, mode, options)"""
+    parts = data.split(b'\x00')
+    if len(parts) < 2 or not parts[0]:
+        return None
+
+    filename = parts[0].decode('utf-8')
+    mode = parts[1].decode('ascii', errors='ignore').lower()
+
+    # Les options (RFC 2347) suivent le mode sous forme de paires nom/valeur
+    options = {}
+    fields = parts[2:]
+    for i in range(0, len(fields) - 1, 2):
+        name = fields[i].decode('ascii', errors='ignore').lower()
+        if name:
+            options[name] = fields[i + 1].decode('ascii', errors='ignore')
+
+    return filename, mode, options
+
+
+def build_data(block_num, data):
+    """Construit un paquet DATA"""
+    return b'\x00\x03' + (block_num & 0xFFFF).to_bytes(2, 'big') + data
+
+
+def build_ack(block_num):
+    """Construit un paquet ACK"""
+    return b'\x00\x04' + (block_num & 0xFFFF).to_bytes(2, 'big')
+
+
+def build_error(error_code, message):
+    """Construit un paquet ERROR"""
+    return b'\x00\x05' + error_code.to_bytes(2, 'big') + message.encode('utf-8') + b'\x00'
+
+
+def set_socket_buffers(sock):
+    """Agrandit les tampons noyau (best effort) pour les fenêtres de gros blocs"""
+    for option in (socket.SO_SNDBUF, socket.SO_RCVBUF):
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, option, SOCKET_BUFFER)
+        except OSError:
+            pass
+
+
+def build_oack(options):
+    """Construit un paquet OACK à partir des options acceptées"""
+    packet = b'\x00\x06'
+    for name, value in options.items():
+        packet += name.encode('ascii') + b'\x00' + str(value).encode('ascii') + b'\x00'
+    return packet
+
+
+class BlockCache:
+    """Cache LRU de morceaux de fichiers, partagé par toutes les sessions
+
+    Les morceaux sont indexés par (chemin, mtime, taille) : un fichier
+    modifié sur disque obtient une nouvelle clé et ses anciens morceaux
+    sortent naturellement du cache. La mémoire occupée est bornée par
+    `budget` octets.
+    """
+
+    def __init__(self, budget=DEFAULT_CACHE_BUDGET, chunk_size=CACHE_CHUNK_SIZE):
+        self.budget = budget
+        self.chunk_size = chunk_size
+        self.chunks = OrderedDict()
+        self.used = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key_for(path, fileobj):
+        """Clé de cache d'un fichier ouvert"""
+        st = os.fstat(fileobj.fileno())
+        return (str(path), st.st_mtime_ns, st.st_size)
+
+    def _chunk(self, key, fileobj, index):
+        chunk_key = (key, index)
+        with self.lock:
+            chunk = self.chunks.get(chunk_key)
+            if chunk is not None:
+                self.chunks.move_to_end(chunk_key)
+                self.hits += 1
+                return chunk
+            self.misses += 1
+
+        fileobj.seek(index * self.chunk_size)
+        chunk = fileobj.read(self.chunk_size)
+
+        with self.lock:
+            if chunk_key not in self.chunks and len(chunk) <= self.budget:
+                self.chunks[chunk_key] = chunk
+                self.used += len(chunk)
+                while self.used > self.budget:
+                    _, evicted = self.chunks.popitem(last=False)
+                    self.used -= len(evicted)
+        return chunk
+
+    def read(self, key, fileobj, offset, length):
+        """Lit `length` octets à `offset` en passant par le cache"""
+        index, start = divmod(offset, self.chunk_size)
+        chunk = self._chunk(key, fileobj, index)
+        if start + length <= len(chunk) or len(chunk) < self.chunk_size:
+            # Cas courant : le bloc tient dans un seul morceau (pas de copie)
+            return memoryview(chunk)[start:start + length]
+
+        # Bloc à cheval sur deux morceaux (blksize non diviseur du morceau)
+        parts = [memoryview(chunk)[start:]]
+        remaining = length - len(parts[0])
+        while remaining > 0:
+            index += 1
+            chunk = self._chunk(key, fileobj, index)
+            if not chunk:
+                break
+            parts.append(memoryview(chunk)[:remaining])
+            remaining -= len(parts[-1])
+        return b''.join(parts)
+
+    def stats(self):
+        """Compteurs exposés aux interfaces"""
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'used': self.used,
+                'budget': self.budget,
+                'chunks': len(self.chunks),
+            }
+
+    def clear(self):
+        with self.lock:
+            self.chunks.clear()
+            self.used = 0
+
+
+class DirectoryIndex:
+    """Index des fichiers servis : nom demandé -> chemin résolu
+
+    Le répertoire est parcouru une fois (os.scandir), puis seuls les
+    répertoires dont le mtime a changé sont relus, au plus toutes les
+    `interval` secondes. Une requête coûte une recherche dans un dict au
+    lieu de stat() successifs ; un nom inconnu déclenche un sondage anticipé
+    pour trouver un fichier tout juste déposé.
+
+    Le confinement porte sur les chemins résolus (realpath + commonpath) :
+    un lien symbolique vers l'extérieur n'est pas indexé et un répertoire
+    voisin comme /srv/tftp2 ne passe plus pour /srv/tftp. Les liens vers
+    des répertoires ne sont pas suivis (pas de boucle possible).
+
+    Avec `case_insensitive`, un nom sans correspondance exacte est cherché
+    sans tenir compte de la casse (équipements qui demandent en majuscules).
+    """
+
+    def __init__(self, root, interval=INDEX_POLL_INTERVAL, case_insensitive=True):
+        self.root = os.path.realpath(root)
+        self.interval = interval
+        self.case_insensitive = case_insensitive
+        self.files = {}      # nom relatif (posix) -> chemin résolu
+        self.folded = {}     # nom replié (casefold) -> {noms relatifs}
+        self.dirs = {}       # répertoire relatif -> (mtime_ns, fichiers, sous-répertoires)
+        self.refreshes = 0
+        self.checked_at = 0.0
+
+    @staticmethod
+    def is_upload_temp(name):
+        """Temporaire d'un WRQ en cours (WriteTransfer) : ni indexé ni écrasable"""
+        base = posixpath.basename(name)
+        return base.startswith('.') and base.endswith(UPLOAD_SUFFIX)
+
+    @staticmethod
+    def normalize(filename):
+        """Nom relatif canonique, ou None s'il sort du répertoire servi
+
+        Les séparateurs Windows et le '/' initial (demandes PXE du type
+        /pxelinux.cfg/default) sont acceptés ; toute composante '..' est refusée.
+        """
+        parts = filename.replace('\\', '/').split('/')
+        if '..' in parts or '\x00' in filename:
+            return None
+        name = posixpath.normpath('/'.join(parts)).lstrip('/')
+        return name if name not in ('', '.') else None
+
+    def _contained(self, path):
+        try:
+            return os.path.commonpath([self.root, path]) == self.root
+        except ValueError:
+            return False
+
+    def _add(self, name, path):
+        self.files[name] = path
+        self.folded.setdefault(name.casefold(), set()).add(name)
+
+    def _remove(self, name):
+        self.files.pop(name, None)
+        names = self.folded.get(name.casefold())
+        if names is not None:
+            names.discard(name)
+            if not names:
+                del self.folded[name.casefold()]
+
+    def _drop_dir(self, rel):
+        entry = self.dirs.pop(rel, None)
+        if entry is None:
+            return
+        for name in entry[1]:
+            self._remove(name)
+        for sub in entry[2]:
+            self._drop_dir(sub)
+
+    def _scan_dir(self, rel):
+        """(Re)lit un répertoire et ses nouveaux sous-répertoires"""
+        path = os.path.join(self.root, rel) if rel else self.root
+        try:
+            mtime = os.stat(path).st_mtime_ns
+            with os.scandir(path) as it:
+                entries = list(it)
+        except OSError:
+            self._drop_dir(rel)
+            return
+
+        old = self.dirs.get(rel)
+        if old is not None:
+            for name in old[1]:
+                self._remove(name)
+
+        files = []
+        subdirs = []
+        for entry in entries:
+            name = f"{rel}/{entry.name}" if rel else entry.name
+            if self.is_upload_temp(name):
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(name)
+                elif entry.is_file():
+                    resolved = os.path.realpath(entry.path) if entry.is_symlink() else entry.path
+                    if self._contained(resolved):
+                        self._add(name, resolved)
+                        files.append(name)
+            except OSError:
+                continue
+
+        self.dirs[rel] = (mtime, files, subdirs)
+        for sub in (old[2] if old is not None else ()):
+            if sub not in subdirs:
+                self._drop_dir(sub)
+        for sub in subdirs:
+            if sub not in self.dirs:
+                self._scan_dir(sub)
+
+    def refresh(self):
+        """Reconstruit l'index complet"""
+        self.files.clear()
+        self.folded.clear()
+        self.dirs.clear()
+        self._scan_dir('')
+        self.refreshes += 1
+        self.checked_at = time.monotonic()
+
+    def poll(self, max_age=None):
+        """Relit les répertoires modifiés si le dernier sondage date de plus de `max_age`"""
+        now = time.monotonic()
+        if now - self.checked_at < (self.interval if max_age is None else max_age):
+            return
+        self.checked_at = now
+        changed = []
+        for rel, (mtime, _, _) in list(self.dirs.items()):
+            path = os.path.join(self.root, rel) if rel else self.root
+            try:
+                if os.stat(path).st_mtime_ns != mtime:
+                    changed.append(rel)
+            except OSError:
+                changed.append(rel)
+        for rel in changed:
+            if rel in self.dirs:
+                self._scan_dir(rel)
+        if changed:
+            self.refreshes += 1
+
+    def _find(self, name):
+        path = self.files.get(name)
+        if path is None and self.case_insensitive:
+            names = self.folded.get(name.casefold())
+            if names:
+                path = self.files[min(names)]
+        return path
+
+    def lookup(self, name):
+        """Chemin résolu du fichier `name` (normalisé), ou None"""
+        self.poll()
+        path = self._find(name)
+        if path is None:
+            self.poll(INDEX_MISS_RECHECK)
+            path = self._find(name)
+        return path
+
+    def target(self, name):
+        """Chemin d'écriture de `name` (normalisé) ; (None, erreur) si refusé
+
+        Le répertoire parent doit exister dans l'index ; un fichier existant
+        est remplacé à son chemin résolu, qui doit rester confiné.
+        """
+        self.poll(INDEX_MISS_RECHECK)
+        parent = posixpath.dirname(name)
+        if parent not in self.dirs:
+            return None, "Directory not found"
+        if name in self.dirs or self.is_upload_temp(name):
+            return None, "Access violation"
+        path = os.path.join(self.root, name)
+        if os.path.lexists(path):
+            path = os.path.realpath(path)
+            if not self._contained(path) or os.path.isdir(path):
+                return None, "Access violation"
+        return path, None
+
+    def invalidate(self):
+        """Force un sondage à la prochaine requête"""
+        self.checked_at = 0.0
+
+    def stats(self):
+        return {'files': len(self.files), 'dirs': len(self.dirs), 'refreshes': self.refreshes}
+
+
+class ReadTransfer:
+    """Transfert en lecture (RRQ) piloté par les ACK, avec fenêtre RFC 7440
+
+    La machine à états ne fait aucune E/S réseau : elle émet ses paquets via
+    `send` et avance sur handle_packet() / handle_timeout(). Les numéros de
+    bloc sont suivis en absolu et repliés sur 16 bits à l'émission.
+
+    Les paquets DATA sont assemblés dans un tampon préalloué : le fichier
+    est lu directement derrière l'en-tête (readinto), et les gros blocs
+    servis par le cache partent en deux segments via `send_parts` (sendmsg). Dans
+    les deux cas `send` reçoit une vue qui doit être émise ou copiée avant
+    de rendre la main.
+    """
+
+    def __init__(self, fileobj, send, blksize=DEFAULT_BLKSIZE, windowsize=1,
+                 timeout=DEFAULT_TIMEOUT, oack=None, max_retries=DEFAULT_RETRIES,
+                 cache=None, cache_key=None, send_parts=None, size=None):
+        self.file = fileobj
+        self.size = size              # taille du fichier, pour la progression
+        self.send = send
+        self.send_parts = send_parts or (lambda parts: send(b''.join(parts)))
+        self.cache = cache
+        self.cache_key = cache_key
+        self.blksize = blksize
+        self.windowsize = windowsize
+        self.timeout = timeout
+        self.oack = oack              # options à confirmer par OACK, ou None
+        self.max_retries = max_retries
+
+        self.acked = 0                # dernier bloc acquitté (absolu)
+        self.sent = 0                 # dernier bloc émis (absolu)
+        self.last_block = None        # bloc final (< blksize), une fois lu
+        self.waiting_oack = False
+        self.retries = 0
+        self.retransmits = 0
+        self.finished = False
+        self.error = None
+        self._pos = 0
+        self._packet = None
+
+    def start(self):
+        """Émet l'OACK ou la première fenêtre"""
+        if self.oack:
+            self.waiting_oack = True
+            self.send(build_oack(self.oack))
+        else:
+            self._send_window()
+
+    def _send_block(self, n):
+        """Émet le bloc `n` et retourne la taille de ses données"""
+        if self._packet is None:
+            self._packet = bytearray(4 + self.blksize)
+            self._packet[:2] = b'\x00\x03'
+        packet = memoryview(self._packet)
+        DATA_BLOCK.pack_into(self._packet, 2, n & 0xFFFF)
+        offset = (n - 1) * self.blksize
+
+        if self.cache is not None:
+            payload = self.cache.read(self.cache_key, self.file, offset, self.blksize)
+            size = len(payload)
+            if size >= SENDMSG_MIN_PAYLOAD:
+                # Gros bloc déjà en mémoire : en-tête + vue sur le cache, sans copie
+                self.send_parts((packet[:4], payload))
+            else:
+                # Petit bloc : une copie en place coûte moins qu'un sendmsg
+                packet[4:4 + size] = payload
+                self.send(packet[:4 + size])
+            return size
+
+        # Lecture directe derrière l'en-tête, puis envoi du paquet en place
+        if offset != self._pos:
+            self.file.seek(offset)
+        size = 0
+        while size < self.blksize:
+            count = self.file.readinto(packet[4 + size:])
+            if not count:
+                break
+            size += count
+        self._pos = offset + size
+        self.send(packet[:4 + size])
+        return size
+
+    def _send_window(self):
+        """(Ré)émet la fenêtre qui suit le dernier bloc acquitté"""
+        end = self.acked + self.windowsize
+        if self.last_block is not None:
+            end = min(end, self.last_block)
+
+        n = self.acked + 1
+        while n <= end:
+            if self._send_block(n) < self.blksize:
+                self.last_block = n
+                end = n
+            n += 1
+        self.sent = end
+
+    def handle_packet(self, data):
+        """Traite un paquet du client, retourne True si le transfert a progressé"""
+        if len(data) < 4:
+            return False
+
+        opcode = int.from_bytes(data[:2], 'big')
+        if opcode == OPCODE_ACK:
+            return self._handle_ack(int.from_bytes(data[2:4], 'big'))
+        if opcode == OPCODE_ERROR:
+            self.error = data[4:].split(b'\x00')[0].decode('utf-8', errors='replace') or "Client error"
+            self.finished = True
+        return False
+
+    def _handle_ack(self, block_num):
+        if self.waiting_oack:
+            if block_num != 0:
+                return False
+            self.waiting_oack = False
+        else:
+            # Replier le numéro 16 bits sur la fenêtre en vol
+            delta = (block_num - self.acked) & 0xFFFF
+            if delta == 0 or delta > self.sent - self.acked:
+                return False  # ACK dupliqué ou hors fenêtre : on attend le timeout
+            self.acked += delta
+
+        self.retries = 0
+        if self.last_block is not None and self.acked >= self.last_block:
+            self.finished = True
+        else:
+            self._send_window()
+        return True
+
+    @property
+    def transferred(self):
+        """Octets acquittés par le client"""
+        done = self.acked * self.blksize
+        return min(done, self.size) if self.size is not None else done
+
+    def close(self):
+        self.file.close()
+
+    def handle_timeout(self):
+        """Retransmet depuis le dernier bloc acquitté, ou abandonne"""
+        self.retries += 1
+        if self.retries > self.max_retries:
+            self.error = "Timeout"
+            self.finished = True
+            return
+
+        self.retransmits += 1
+        if self.waiting_oack:
+            self.send(build_oack(self.oack))
+        else:
+            self._send_window()
+
+
+class WriteTransfer:
+    """Transfert en écriture (WRQ) : les blocs sont écrits au fil de l'eau
+
+    Les données sont écrites dans un fichier temporaire du répertoire cible
+    via un writer bufferisé, puis synchronisées (fsync) et renommées
+    atomiquement sur le dernier bloc. Un transfert interrompu ne laisse
+    jamais de fichier tronqué à la place de la cible.
+    """
+
+    def __init__(self, path, send, blksize=DEFAULT_BLKSIZE, windowsize=1,
+                 timeout=DEFAULT_TIMEOUT, oack=None, max_retries=DEFAULT_RETRIES,
+                 max_size=DEFAULT_MAX_UPLOAD):
+        self.path = Path(path)
+        self.send = send
+        self.blksize = blksize
+        self.windowsize = windowsize
+        self.timeout = timeout
+        self.oack = oack
+        self.max_retries = max_retries
+        self.max_size = max_size
+
+        self.acked = 0                # dernier bloc reçu dans l'ordre (absolu)
+        self.last_ack = 0             # dernier bloc acquitté auprès du client
+        self.size = 0
+        self.retries = 0
+        self.retransmits = 0
+        self.finished = False
+        self.committed = False        # temporaire renommé en cible
+        self.error = None
+        self._gap_acked = False
+
+        fd, tmp_name = tempfile.mkstemp(prefix=f".{self.path.name}.", suffix=UPLOAD_SUFFIX,
+                                        dir=self.path.parent)
+        self.tmp_path = Path(tmp_name)
+        self.file = os.fdopen(fd, 'wb', buffering=WRITE_BUFFER)
+        if hasattr(os, 'fchmod'):
+            # mkstemp crée en 0600 : droits du fichier remplacé, sinon ceux d'une création normale
+            try:
+                mode = os.stat(self.path).st_mode & 0o7777
+            except FileNotFoundError:
+                mode = 0o666 & ~_UMASK
+            try:
+                os.fchmod(fd, mode)
+            except OSError:
+                pass  # Système de fichiers sans droits POSIX (FAT d'une clé USB)
+
+    def start(self):
+        """Accepte la requête : OACK ou ACK du bloc 0"""
+        self._send_ack()
+
+    def _send_ack(self):
+        self.last_ack = self.acked
+        if self.acked == 0 and self.oack:
+            self.send(build_oack(self.oack))
+        else:
+            self.send(build_ack(self.acked))
+
+    def handle_packet(self, data):
+        """Traite un paquet du client, retourne True si le transfert a progressé"""
+        if len(data) < 4:
+            return False
+
+        opcode = int.from_bytes(data[:2], 'big')
+        if opcode == OPCODE_ERROR:
+            self.error = data[4:].split(b'\x00')[0].decode('utf-8', errors='replace') or "Client error"
+            self._abort()
+            return False
+        if opcode != OPCODE_DATA:
+            return False
+
+        delta = (int.from_bytes(data[2:4], 'big') - self.acked) & 0xFFFF
+        if delta != 1:
+            # Bloc dupliqué ou hors séquence : réacquitter le dernier bloc reçu
+            # dans l'ordre, une seule fois par fenêtre (RFC 7440)
+            if delta == 0 or not self._gap_acked:
+                self._gap_acked = delta != 0
+                self._send_ack()
+            return False
+
+        payload = memoryview(data)[4:]
+        if len(payload) > self.blksize:
+            self._fail(4, "Block larger than negotiated blksize")
+            return False
+        if self.size + len(payload) > self.max_size:
+            self._fail(3, "Disk full or allocation exceeded")
+            return False
+
+        try:
+            self.file.write(payload)
+            if len(payload) < self.blksize:
+                self._commit()
+        except OSError as e:
+            # ENOSPC, EIO... : le client reçoit une ERROR, le temporaire est supprimé
+            self._fail(3, f"Disk full or allocation exceeded ({e.strerror or e})")
+            return False
+        self.size += len(payload)
+        self.acked += 1
+        self.retries = 0
+        self._gap_acked = False
+
+        if len(payload) < self.blksize:
+            self._send_ack()
+            self.finished = True
+        elif self.acked - self.last_ack >= self.windowsize:
+            # La fenêtre se compte depuis le dernier ACK, pas en multiples
+            # absolus : après un trou, l'émetteur repart du bloc réacquitté
+            self._send_ack()
+        return True
+
+    @property
+    def transferred(self):
+        """Octets reçus dans l'ordre"""
+        return self.size
+
+    def handle_timeout(self):
+        """Réacquitte le dernier bloc reçu, ou abandonne"""
+        self.retries += 1
+        if self.retries > self.max_retries:
+            self.error = "Timeout"
+            self._abort()
+            return
+        self.retransmits += 1
+        self._send_ack()
+
+    def _fail(self, error_code, message):
+        self.send(build_error(error_code, message))
+        self.error = message
+        self._abort()
+
+    def _commit(self):
+        """Vide le buffer, synchronise sur disque et remplace la cible"""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        os.replace(self.tmp_path, self.path)
+        self.committed = True
+
+    def _abort(self):
+        self.finished = True
+        self.close()
+
+    def close(self):
+        """Supprime le fichier temporaire d'un transfert non terminé"""
+        if self.committed:
+            return
+        try:
+            self.file.close()
+        except OSError:
+            pass
+        try:
+            self.tmp_path.unlink()
+        except OSError:
+            pass
+
+
+class TFTPSession(asyncio.DatagramProtocol):
+    """Session de transfert d'un client, sur son propre port éphémère (TID)
+
+    Conformément à la RFC 1350, chaque transfert utilise un nouveau socket :
+    le port d'écoute reste libre pour les requêtes des autres clients. La
+    session est pilotée par la boucle asyncio du serveur : réception des
+    paquets via datagram_received() et retransmissions via un timer.
+    """
+
+    def __init__(self, server, client_addr, opcode):
+        self.server = server
+        self.client_addr = client_addr
+        self.opcode = opcode
+        self.filename = None
+        self.transfer = None
+        self.transport = None
+        self.timer = None
+        self.closed = False
+        self.started = time.time()
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        set_socket_buffers(self.socket)
+        self.socket.bind((server.host, 0))
+        self.socket.setblocking(False)
+        self._sendmsg = getattr(self.socket, 'sendmsg', None)
+
+    @property
+    def port(self):
+        return self.socket.getsockname()[1]
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def send(self, packet):
+        self.transport.sendto(packet, self.client_addr)
+
+    def send_parts(self, parts):
+        """Envoie un paquet en plusieurs segments (sendmsg scatter-gather)"""
+        if self._sendmsg is not None and not self.transport.get_write_buffer_size():
+            # Envoi direct sur le socket, sauf si la boucle a déjà des paquets
+            # en attente (l'ordre d'émission doit être conservé)
+            try:
+                self._sendmsg(parts, (), 0, self.client_addr)
+                return
+            except (BlockingIOError, InterruptedError):
+                pass
+            except OSError:
+                return  # ICMP en retour, etc. : le timeout décidera de la suite
+        self.transport.sendto(b''.join(parts), self.client_addr)
+
+    def send_ack(self, block_num):
+        """Envoie un ACK"""
+        self.send(build_ack(block_num))
+
+    def send_error(self, error_code, message):
+        """Envoie une erreur au client de la session"""
+        self.send(build_error(error_code, message))
+        self.server.log(f"❌ Erreur envoyée à {self.client_addr[0]}: {message}")
+
+    def run_transfer(self, transfer):
+        """Démarre la machine à états ; la suite est pilotée par les événements"""
+        self.transfer = transfer
+        transfer.start()
+        self._check_progress(True)
+
+    def datagram_received(self, data, addr):
+        if addr != self.client_addr:
+            # Paquet d'un autre TID : erreur au seul expéditeur (RFC 1350)
+            self.transport.sendto(build_error(5, "Unknown transfer ID"), addr)
+            return
+        if self.transfer is not None and not self.closed:
+            self._check_progress(self.transfer.handle_packet(data))
+
+    def error_received(self, exc):
+        # ICMP port unreachable, etc. : le timeout décidera de la suite
+        pass
+
+    def _on_timeout(self):
+        self.timer = None
+        if not self.closed:
+            self.transfer.handle_timeout()
+            self._check_progress(True)
+
+    def _check_progress(self, progressed):
+        if self.transfer.finished:
+            self.server.end_session(self)
+        elif progressed or self.timer is None:
+            if self.timer is not None:
+                self.timer.cancel()
+            self.timer = self.server.loop.call_later(self.transfer.timeout, self._on_timeout)
+
+    def info(self):
+        """Résumé de la session pour les interfaces"""
+        transfer = self.transfer
+        return {
+            'client': f"{self.client_addr[0]}:{self.client_addr[1]}",
+            'port': self.port,
+            'direction': 'read' if self.opcode == OPCODE_RRQ else 'write',
+            'filename': self.filename,
+            'bytes': transfer.transferred if transfer else 0,
+            'size': transfer.size if transfer else None,
+            'blksize': transfer.blksize if transfer else None,
+            'windowsize': transfer.windowsize if transfer else None,
+            'retransmits': transfer.retransmits if transfer else 0,
+            'elapsed': time.time() - self.started,
+        }
+
+    def close(self):
+        self.closed = True
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if self.transport is not None:
+            self.transport.close()
+        else:
+            self.socket.close()
+        if self.transfer is not None:
+            self.transfer.close()
+
+
+class ListenProtocol(asyncio.DatagramProtocol):
+    """Port d'écoute : transmet les requêtes RRQ/WRQ au serveur"""
+
+    def __init__(self, server):
+        self.server = server
+
+    def datagram_received(self, data, addr):
+        self.server.handle_request(data, addr)
+
+    def error_received(self, exc):
+        pass
+
+
 class SimpleTFTPServer:
-    def __init__(self, host='0.0.0.0', port=6969, directory='.'):
+    def __init__(self, host='0.0.0.0', port=6969, directory='.',
+                 max_windowsize=MAX_WINDOWSIZE, timeout=DEFAULT_TIMEOUT,
+                 retries=DEFAULT_RETRIES, max_blksize=MAX_BLKSIZE,
+                 max_sessions=DEFAULT_MAX_SESSIONS, allow_write=True,
+                 max_upload_size=DEFAULT_MAX_UPLOAD, cache_size=DEFAULT_CACHE_BUDGET,
+                 case_insensitive=True, log_func=None):
         self.host = host
         self.port = port
         self.directory = Path(directory).resolve()
         self.socket = None
+        self.transport = None
+        self.loop = None
         self.running = False
+        self.max_windowsize = max_windowsize
+        self.max_blksize = max(MIN_BLKSIZE, min(max_blksize, MAX_BLKSIZE))
+        self.timeout = timeout
+        self.retries = retries
+        self.max_sessions = max_sessions
+        self.allow_write = allow_write
+        self.max_upload_size = max_upload_size
+        # Cache de lecture partagé entre sessions (désactivé si cache_size=0)
+        self.cache = BlockCache(cache_size) if cache_size else None
+        # Index des fichiers servis, construit au démarrage
+        self.index = DirectoryIndex(self.directory, case_insensitive=case_insensitive)
+        self.log_func = log_func
+        # Sessions actives, indexées par adresse client
+        self._sessions = {}
+        self.sessions_lock = threading.Lock()
+        self.counters = dict.fromkeys(
+            ('requests', 'reads', 'writes', 'completed', 'failed', 'rejected',
+             'bytes_sent', 'bytes_received', 'retransmits'), 0)
+        self.started_at = None
+        self._stop_event = None
+        self._ready = threading.Event()
         
     def start(self):
-        """Démarre le serveur TFTP"""
+        """Démarre le serveur TFTP (bloquant jusqu'à stop())"""
+        self._ready.clear()
+        try:
+            asyncio.run(self.serve())
+        except Exception as e:
+            self.log(f"❌ Erreur démarrage serveur: {e}")
+        finally:
+            self._ready.set()
+            self.stop()
+
+    def start_background(self, timeout=5.0):
+        """Démarre le serveur dans un thread ; retourne True une fois à l'écoute"""
+        self._ready.clear()
+        thread = threading.Thread(target=self.start, daemon=True, name='tftp-server')
+        thread.start()
+        self._ready.wait(timeout)
+        return self.running
+
+    async def serve(self):
+        """Boucle asyncio : port d'écoute et sessions sur une seule boucle"""
+        self.loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
         try:
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
             self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            set_socket_buffers(self.socket)
             self.socket.bind((self.host, self.port))
-            self.socket.settimeout(1.0)
+            self.port = self.socket.getsockname()[1]
+            self.index.refresh()
+            self.transport, _ = await self.loop.create_datagram_endpoint(
+                lambda: ListenProtocol(self), sock=self.socket)
             
             self.running = True
-            print(f"🚀 Serveur TFTP démarré sur {self.host}:{self.port}")
-            print(f"📁 Répertoire: {self.directory}")
-            
-            while self.running:
-                try:
-                    data, client_addr = self.socket.recvfrom(1024)
-                    self.handle_request(data, client_addr)
-                except socket.timeout:
-                    continue
-                except Exception as e:
-                    if self.running:
-                        print(f"❌ Erreur: {e}")
-                        
-        except Exception as e:
-            print(f"❌ Erreur démarrage serveur: {e}")
+            self.started_at = time.time()
+            self.log(f"🚀 Serveur TFTP démarré sur {self.host}:{self.port}")
+            self.log(f"📁 Répertoire: {self.directory} ({len(self.index.files)} fichiers indexés)")
+            self.on_started()
+            self._ready.set()
+
+            await self._stop_event.wait()
         finally:
-            self.stop()
+            self.running = False
+            with self.sessions_lock:
+                sessions = list(self._sessions.values())
+                self._sessions.clear()
+            for session in sessions:
+                session.close()
+            if self.transport is not None:
+                self.transport.close()
+            elif self.socket is not None:
+                self.socket.close()
+            self.loop = None
     
     def handle_request(self, data, client_addr):
-        """Traite une requête TFTP"""
+        """Traite une requête TFTP reçue sur le port d'écoute"""
         try:
             if len(data) < 4:
                 return
                 
             opcode = int.from_bytes(data[:2], 'big')
             
-            if opcode == 1:  # Read Request (RRQ)
-                self.handle_read_request(data[2:], client_addr)
-            elif opcode == 2:  # Write Request (WRQ)
-                self.handle_write_request(data[2:], client_addr)
-            else:
+            if opcode not in (OPCODE_RRQ, OPCODE_WRQ):
                 self.send_error(5, "Unknown opcode", client_addr)
+                return
+
+            with self.sessions_lock:
+                if client_addr in self._sessions:
+                    return  # Requête retransmise : la session est déjà en cours
+                self.counters['requests'] += 1
+                if len(self._sessions) >= self.max_sessions:
+                    self.counters['rejected'] += 1
+                    self.send_error(0, "Server busy, retry later", client_addr)
+                    return
+                self.counters['reads' if opcode == OPCODE_RRQ else 'writes'] += 1
+                session = TFTPSession(self, client_addr, opcode)
+                self._sessions[client_addr] = session
+
+            self.loop.create_task(self.open_session(session, data[2:]))
                 
         except Exception as e:
-            print(f"❌ Erreur traitement requête: {e}")
+            self.log(f"❌ Erreur traitement requête: {e}")
             self.send_error(0, str(e), client_addr)
+
+    async def open_session(self, session, data):
+        """Attache la session à la boucle puis traite la requête"""
+        try:
+            await self.loop.create_datagram_endpoint(lambda: session, sock=session.socket)
+            if session.opcode == OPCODE_RRQ:
+                self.handle_read_request(session, data)
+            else:
+                self.handle_write_request(session, data)
+        except Exception as e:
+            if self.running:
+                self.log(f"❌ Erreur session {session.client_addr[0]}: {e}")
+        if session.transfer is None:
+            # Requête refusée (erreur déjà envoyée) : rien à piloter
+            self.end_session(session)
+
+    def end_session(self, session):
+        """Ferme une session et journalise son résultat"""
+        if session.closed:
+            return
+        session.close()
+        transfer = session.transfer
+        with self.sessions_lock:
+            self._sessions.pop(session.client_addr, None)
+            if transfer is not None:
+                self.counters['failed' if transfer.error else 'completed'] += 1
+                self.counters['retransmits'] += transfer.retransmits
+                direction = 'bytes_sent' if session.opcode == OPCODE_RRQ else 'bytes_received'
+                self.counters[direction] += transfer.transferred
+
+        if transfer is None or not self.running:
+            return
+        client = session.client_addr[0]
+        if transfer.error:
+            self.log(f"❌ Transfert de {session.filename} avec {client} interrompu: {transfer.error}")
+        else:
+            direction = "envoyé à" if session.opcode == OPCODE_RRQ else "reçu de"
+            self.log(f"✅ Fichier {session.filename} {direction} {client} "
+                     f"({transfer.acked} blocs de {transfer.blksize} octets, "
+                     f"fenêtre {transfer.windowsize}, {transfer.retransmits} retransmissions)")
+            self.on_transfer_complete(session.filename, session.client_addr, transfer)
+
+    def sessions(self):
+        """Résumé des sessions en cours (voir TFTPSession.info)"""
+        with self.sessions_lock:
+            sessions = list(self._sessions.values())
+        return [session.info() for session in sessions]
+
+    def stats(self):
+        """Compteurs globaux du serveur, sessions actives et cache"""
+        with self.sessions_lock:
+            stats = dict(self.counters)
+            stats['active_sessions'] = len(self._sessions)
+        stats['running'] = self.running
+        stats['uptime'] = time.time() - self.started_at if self.running and self.started_at else 0
+        stats['cache'] = self.cache.stats() if self.cache else None
+        stats['index'] = self.index.stats()
+        return stats
     
-    def handle_read_request(self, data, client_addr):
+    def handle_read_request(self, session, data):
         """Traite une demande de lecture de fichier"""
+        client_addr = session.client_addr
         try:
-            # Parser le nom de fichier
-            parts = data.split(b'\x00')
-            if len(parts) < 2:
-                self.send_error(4, "Invalid filename", client_addr)
+            request = parse_request(data)
+            if request is None:
+                session.send_error(4, "Invalid filename")
                 return
-                
-            filename = parts[0].decode('utf-8')
-            filepath = self.directory / filename
+
+            filename, mode, options = request
+            session.filename = filename
             
-            print(f"📄 Demande de lecture: {filename} de {client_addr[0]}")
+            self.log(f"📄 Demande de lecture: {filename} de {client_addr[0]} (port {session.port})")
             
-            # Vérifier que le fichier existe et est dans le répertoire autorisé
-            if not filepath.exists():
-                self.send_error(1, "File not found", client_addr)
+            # Résolution par l'index : confinement vérifié sur le chemin résolu
+            name = self.index.normalize(filename)
+            if name is None:
+                session.send_error(2, "Access violation")
                 return
-                
-            if not str(filepath).startswith(str(self.directory)):
-                self.send_error(2, "Access violation", client_addr)
+            filepath = self.index.lookup(name)
+            if filepath is None:
+                session.send_error(1, "File not found")
                 return
-                
-            # Lire et envoyer le fichier
-            with open(filepath, 'rb') as f:
-                block_num = 1
-                while True:
-                    chunk = f.read(512)
-                    self.send_data(block_num, chunk, client_addr)
-                    
-                    if len(chunk) < 512:
-                        break
-                    block_num += 1
-                    
-            print(f"✅ Fichier {filename} envoyé à {client_addr[0]}")
+
+            # Envoyer le fichier en avançant au rythme des ACK ; le fichier est
+            # fermé avec la session
+            try:
+                f = open(filepath, 'rb')
+            except FileNotFoundError:
+                self.index.invalidate()  # Supprimé depuis le dernier sondage
+                session.send_error(1, "File not found")
+                return
+            size = os.fstat(f.fileno()).st_size
+
+            accepted = self.negotiate_options(options, file_size=size)
+            blksize = int(accepted.get('blksize', DEFAULT_BLKSIZE))
+            windowsize = int(accepted.get('windowsize', 1))
+            timeout = float(accepted.get('timeout', self.timeout))
+
+            session.run_transfer(ReadTransfer(
+                f, session.send, size=size,
+                blksize=blksize, windowsize=windowsize, timeout=timeout,
+                oack=accepted or None, max_retries=self.retries,
+                cache=self.cache,
+                cache_key=BlockCache.key_for(filepath, f) if self.cache else None,
+                send_parts=session.send_parts))
             
         except Exception as e:
-            print(f"❌ Erreur lecture fichier: {e}")
-            self.send_error(0, str(e), client_addr)
-    
-    def handle_write_request(self, data, client_addr):
-        """Traite une demande d'écriture de fichier"""
-        # Envoyer ACK pour dire qu'on accepte (implémentation basique)
-        self.send_ack(0, client_addr)
-        print(f"📝 Demande d'écriture de {client_addr[0]} (non implémentée)")
-    
-    def send_data(self, block_num, data, client_addr):
-        """Envoie un bloc de données"""
-        packet = b'\x00\x03' + block_num.to_bytes(2, 'big') + data
-        self.socket.sendto(packet, client_addr)
-    
-    def send_ack(self, block_num, client_addr):
-        """Envoie un ACK"""
-        packet = b'\x00\x04' + block_num.to_bytes(2, 'big')
-        self.socket.sendto(packet, client_addr)
+            self.log(f"❌ Erreur lecture fichier: {e}")
+            session.send_error(0, str(e))
+
+    def negotiate_options(self, options, file_size=None):
+        """Retourne les options acceptées (à renvoyer dans l'OACK)
+
+        Les options invalides ou inconnues sont ignorées, comme le permet la
+        RFC 2347 : le client retombe alors sur les valeurs par défaut.
+        """
+        values = {}
+        for name in ('blksize', 'timeout', 'tsize', 'windowsize'):
+            if name in options:
+                try:
+                    values[name] = int(options[name])
+                except ValueError:
+                    pass
+
+        accepted = {}
+        if values.get('blksize', 0) >= MIN_BLKSIZE:
+            accepted['blksize'] = min(values['blksize'], self.max_blksize)
+        if MIN_TIMEOUT <= values.get('timeout', 0) <= MAX_TIMEOUT:
+            accepted['timeout'] = values['timeout']
+        if 'tsize' in values and file_size is not None:
+            accepted['tsize'] = file_size
+        if values.get('windowsize', 0) >= 1:
+            accepted['windowsize'] = min(values['windowsize'], self.max_windowsize)
+        return accepted
+
+    def handle_write_request(self, session, data):
+        """Traite une demande d'écriture de fichier (WRQ)"""
+        client_addr = session.client_addr
+        try:
+            if not self.allow_write:
+                session.send_error(2, "Write not allowed")
+                return
+
+            request = parse_request(data)
+            if request is None:
+                session.send_error(4, "Invalid filename")
+                return
+
+            filename, mode, options = request
+            session.filename = filename
+
+            self.log(f"📝 Demande d'écriture: {filename} de {client_addr[0]} (port {session.port})")
+
+            name = self.index.normalize(filename)
+            if name is None:
+                session.send_error(2, "Access violation")
+                return
+            filepath, error = self.index.target(name)
+            if filepath is None:
+                session.send_error(1 if error == "Directory not found" else 2, error)
+                return
+
+            accepted = self.negotiate_options(options)
+            if 'tsize' in options:
+                # Taille annoncée par le client : refusée d'emblée si hors quota
+                try:
+                    tsize = int(options['tsize'])
+                except ValueError:
+                    tsize = 0
+                if tsize > self.max_upload_size:
+                    session.send_error(3, "Disk full or allocation exceeded")
+                    return
+                accepted['tsize'] = tsize
+
+            session.run_transfer(WriteTransfer(
+                filepath, session.send,
+                blksize=int(accepted.get('blksize', DEFAULT_BLKSIZE)),
+                windowsize=int(accepted.get('windowsize', 1)),
+                timeout=float(accepted.get('timeout', self.timeout)),
+                oack=accepted or None, max_retries=self.retries,
+                max_size=self.max_upload_size))
+
+        except Exception as e:
+            self.log(f"❌ Erreur écriture fichier: {e}")
+            session.send_error(0, str(e))
     
     def send_error(self, error_code, message, client_addr):
-        """Envoie une erreur"""
-        packet = b'\x00\x05' + error_code.to_bytes(2, 'big') + message.encode('utf-8') + b'\x00'
-        self.socket.sendto(packet, client_addr)
-        print(f"❌ Erreur envoyée à {client_addr[0]}: {message}")
+        """Envoie une erreur depuis le port d'écoute"""
+        self.transport.sendto(build_error(error_code, message), client_addr)
+        self.log(f"❌ Erreur envoyée à {client_addr[0]}: {message}")
     
+    def log(self, message):
+        """Journalise un message via log_func, ou sur la sortie standard"""
+        if self.log_func is not None:
+            self.log_func(message)
+        else:
+            print(message)
+
+    def on_started(self):
+        """Appelé une fois le socket lié, avant la boucle de réception"""
+
+    def on_transfer_complete(self, filename, client_addr, transfer):
+        """Appelé après chaque transfert réussi"""
+
     def stop(self):
-        """Arrête le serveur"""
+        """Arrête le serveur (immédiat, appelable depuis n'importe quel thread)"""
+        was_running = self.running
         self.running = False
-        if self.socket:
-            self.socket.close()
-        print("🛑 Serveur TFTP arrêté")
+        loop, stop_event = self.loop, self._stop_event
+        if loop is not None and stop_event is not None:
+            try:
+                loop.call_soon_threadsafe(stop_event.set)
+            except RuntimeError:
+                pass  # Boucle déjà fermée
+        if was_running:
+            self.log("🛑 Serveur TFTP arrêté")
 
 def main():
     """Lance le serveur TFTP en mode standalone"""
@@ -141,10 +1155,31 @@ def main():
     parser.add_argument('--host', default='0.0.0.0', help='Adresse IP (défaut: 0.0.0.0)')
     parser.add_argument('--port', type=int, default=6969, help='Port (défaut: 6969)')
     parser.add_argument('--dir', default='.', help='Répertoire à partager (défaut: .)')
+    parser.add_argument('--window', type=int, default=MAX_WINDOWSIZE,
+                        help=f'Taille de fenêtre maximale RFC 7440 (défaut: {MAX_WINDOWSIZE})')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+                        help=f'Délai de retransmission en secondes (défaut: {DEFAULT_TIMEOUT})')
+    parser.add_argument('--max-blksize', type=int, default=MAX_BLKSIZE,
+                        help=f'Taille de bloc maximale RFC 2348 (défaut: {MAX_BLKSIZE})')
+    parser.add_argument('--max-sessions', type=int, default=DEFAULT_MAX_SESSIONS,
+                        help=f'Transferts simultanés maximum (défaut: {DEFAULT_MAX_SESSIONS})')
+    parser.add_argument('--read-only', action='store_true', help='Refuser les écritures (WRQ)')
+    parser.add_argument('--case-sensitive', action='store_true',
+                        help='Noms de fichiers sensibles à la casse (défaut: recherche insensible en repli)')
+    parser.add_argument('--cache-mb', type=int, default=DEFAULT_CACHE_BUDGET // (1024 * 1024),
+                        help='Mémoire du cache de lecture partagé en Mo, 0 pour désactiver '
+                             f'(défaut: {DEFAULT_CACHE_BUDGET // (1024 * 1024)})')
+    parser.add_argument('--max-upload', type=int, default=DEFAULT_MAX_UPLOAD,
+                        help=f'Taille maximale d\'un fichier reçu en octets (défaut: {DEFAULT_MAX_UPLOAD})')
     
     args = parser.parse_args()
     
-    server = SimpleTFTPServer(args.host, args.port, args.dir)
+    server = SimpleTFTPServer(args.host, args.port, args.dir,
+                              max_windowsize=args.window, timeout=args.timeout,
+                              max_blksize=args.max_blksize, max_sessions=args.max_sessions,
+                              allow_write=not args.read_only, max_upload_size=args.max_upload,
+                              cache_size=args.cache_mb * 1024 * 1024,
+                              case_insensitive=not args.case_sensitive)
     
     try:
         server.start()
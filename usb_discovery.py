@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Détection des clés USB contenant le dossier synchronisé
+Sous Linux, la table des montages (/proc/self/mountinfo) est lue une fois
+puis gardée en cache jusqu'au prochain montage/démontage (signalé par poll) ;
+toutes les clés présentes sont retournées, pas seulement la première.
+"""
+
+import getpass
+import os
+import platform
+import select
+import threading
+import time
+
+MOUNTINFO = '/proc/self/mountinfo'
+MOUNT_TTL = 5.0     # Relecture périodique quand poll n'est pas disponible
+
+# Points de montage des supports amovibles (udisks, montages manuels)
+MOUNT_PREFIXES = ('/media/', '/run/media/', '/mnt/', '/Volumes/')
+# Systèmes de fichiers des clés, retenus quel que soit le point de montage
+REMOVABLE_FS = {'vfat', 'msdos', 'exfat', 'ntfs', 'ntfs3', 'fuseblk', 'hfsplus', 'apfs', 'udf'}
+
+
+def _unescape(field):
+    """Décodage des champs de mountinfo (espace = \\040, etc.)"""
+    if '\\' not in field:
+        return field
+    out, i = [], 0
+    while i < len(field):
+        if field[i] == '\\' and field[i + 1:i + 4].isdigit():
+            out.append(chr(int(field[i + 1:i + 4], 8)))
+            i += 4
+        else:
+            out.append(field[i])
+            i += 1
+    return ''.join(out)
+
+
+def parse_mountinfo(text):
+    """Liste des montages : dicts mount_point, fstype, source, options
+
+    Format (proc(5)) : id parent maj:min racine point options [optionnels...]
+    - type source super-options
+    """
+    mounts = []
+    for line in text.splitlines():
+        fields = line.split()
+        try:
+            separator = fields.index('-', 6)
+        except ValueError:
+            continue
+        if len(fields) < separator + 3:
+            continue
+        mounts.append({
+            'mount_point': _unescape(fields[4]),
+            'options': fields[5],
+            'fstype': fields[separator + 1],
+            'source': _unescape(fields[separator + 2]),
+        })
+    return mounts
+
+
+def is_removable_mount(mount):
+    """Montage susceptible d'être une clé (point de montage ou type de FS)"""
+    mount_point = mount['mount_point']
+    return (mount_point.startswith(MOUNT_PREFIXES) or mount['fstype'] in REMOVABLE_FS) \
+        and mount_point not in ('/', '/boot', '/boot/efi')
+
+
+class MountTable:
+    """Table des montages en cache
+
+    Le noyau signale tout changement de la table par POLLPRI/POLLERR sur
+    /proc/self/mountinfo : tant que poll ne signale rien, la liste en cache
+    est servie sans relire le fichier. Ailleurs (fichier de test, noyau
+    ancien), relecture au plus toutes les `ttl` secondes.
+    """
+
+    def __init__(self, path=MOUNTINFO, ttl=MOUNT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.mounts = None
+        self.loaded = 0.0
+        self.reads = 0
+        self.lock = threading.Lock()
+        self.file = None
+        self.poller = None
+        if path == MOUNTINFO and hasattr(select, 'poll'):
+            try:
+                self.file = open(path, 'rb')
+                self.poller = select.poll()
+                self.poller.register(self.file, select.POLLPRI | select.POLLERR)
+            except OSError:
+                self.file = self.poller = None
+
+    def _changed(self):
+        if self.mounts is None:
+            return True
+        if self.poller is not None:
+            return bool(self.poller.poll(0))
+        return time.monotonic() - self.loaded >= self.ttl
+
+    def invalidate(self):
+        with self.lock:
+            self.mounts = None
+
+    def get(self):
+        """Montages courants (relus seulement après un changement)"""
+        with self.lock:
+            if self._changed():
+                try:
+                    if self.file is not None:
+                        # Relire jusqu'au bout acquitte l'événement poll
+                        self.file.seek(0)
+                        data = self.file.read()
+                    else:
+                        with open(self.path, 'rb') as f:
+                            data = f.read()
+                except OSError:
+                    data = b''
+                self.mounts = parse_mountinfo(data.decode('utf-8', 'replace'))
+                self.loaded = time.monotonic()
+                self.reads += 1
+            return self.mounts
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = self.poller = None
+
+
+_mount_table = None
+
+
+def _candidate_roots():
+    """Racines des supports amovibles montés, selon le système"""
+    global _mount_table
+    system = platform.system()
+    if system == "Windows":
+        try:
+            import psutil
+            return [part.mountpoint for part in psutil.disk_partitions() if "removable" in part.opts]
+        except ImportError:
+            return []
+    if os.path.exists(MOUNTINFO):
+        if _mount_table is None:
+            _mount_table = MountTable()
+        return [mount['mount_point'] for mount in _mount_table.get() if is_removable_mount(mount)]
+    # macOS et autres : dossiers de montage usuels, sans os.getlogin()
+    # (indisponible sans terminal : systemd, cron)
+    roots = []
+    for base in ('/Volumes', f'/media/{getpass.getuser()}', '/media'):
+        try:
+            roots += [os.path.join(base, name) for name in sorted(os.listdir(base))]
+        except OSError:
+            continue
+    return roots
+
+
+def find_sync_folders(folder, exclude=()):
+    """Dossiers `folder` à la racine de toutes les clés montées
+
+    `exclude` : chemins à ignorer (dossier local, par exemple quand
+    l'application est lancée depuis la clé elle-même).
+    """
+    excluded = {os.path.realpath(path) for path in exclude}
+    found = []
+    for root in _candidate_roots():
+        candidate = os.path.join(root, folder)
+        if os.path.isdir(candidate) and os.path.realpath(candidate) not in excluded \
+                and candidate not in found:
+            found.append(candidate)
+    return found